@@ -0,0 +1,102 @@
+"""Compare the indicator engine against the original pandas implementation
+
+Run from the repository root:
+
+    python -m benchmarks.indicator_benchmark --symbols 500 --bars 252
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from utils import indicator_kernels as kernels
+from utils.indicators import DEFAULT_INDICATORS, compute_indicators, compute_panel
+
+def legacy_indicators(data: pd.DataFrame) -> pd.DataFrame:
+    """MarketDataService._add_technical_indicators before the shared engine"""
+    data['SMA_20'] = data['Close'].rolling(window=20).mean()
+    data['SMA_50'] = data['Close'].rolling(window=50).mean()
+    data['EMA_12'] = data['Close'].ewm(span=12, adjust=False).mean()
+    data['EMA_26'] = data['Close'].ewm(span=26, adjust=False).mean()
+    data['MACD'] = data['EMA_12'] - data['EMA_26']
+    data['Signal_Line'] = data['MACD'].ewm(span=9, adjust=False).mean()
+    delta = data['Close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    data['RSI'] = 100 - (100 / (1 + gain / loss))
+    data['BB_middle'] = data['Close'].rolling(window=20).mean()
+    std = data['Close'].rolling(window=20).std()
+    data['BB_upper'] = data['BB_middle'] + (std * 2)
+    data['BB_lower'] = data['BB_middle'] - (std * 2)
+    data['Volume_SMA'] = data['Volume'].rolling(window=20).mean()
+    data['Volume_Ratio'] = data['Volume'] / data['Volume_SMA']
+    data['ROC'] = data['Close'].pct_change(periods=12) * 100
+    data['MOM'] = data['Close'].diff(periods=10)
+    tr1 = data['High'] - data['Low']
+    tr2 = abs(data['High'] - data['Close'].shift())
+    tr3 = abs(data['Low'] - data['Close'].shift())
+    data['ATR'] = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1).rolling(window=14).mean()
+    return data.ffill()
+
+def synthetic_frames(symbols: int, bars: int) -> dict:
+    rng = np.random.default_rng(42)
+    index = pd.date_range('2020-01-01', periods=bars, freq='B')
+    frames = {}
+    for i in range(symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+        spread = np.abs(rng.normal(0, 0.01, bars)) * close
+        frames[f"SYM{i}"] = pd.DataFrame({
+            'Open': close,
+            'High': close + spread,
+            'Low': close - spread,
+            'Close': close,
+            'Volume': rng.integers(100_000, 10_000_000, bars).astype(float)
+        }, index=index)
+    return frames
+
+def timed(label: str, fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<32} {elapsed * 1000:10.2f} ms")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--bars', type=int, default=252)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    frames = synthetic_frames(args.symbols, args.bars)
+    print(f"{args.symbols} symbols x {args.bars} bars, numba available: {kernels.NUMBA_AVAILABLE}")
+    
+    baseline = timed("pandas (legacy, per symbol)",
+                     lambda: [legacy_indicators(frame.copy()) for frame in frames.values()], args.repeat)
+    
+    numba_available = kernels.NUMBA_AVAILABLE
+    kernels.NUMBA_AVAILABLE = False
+    try:
+        numpy_symbol = timed("numpy engine (per symbol)",
+                             lambda: [compute_indicators(frame, DEFAULT_INDICATORS) for frame in frames.values()],
+                             args.repeat)
+        numpy_panel = timed("numpy engine (panel)", lambda: compute_panel(frames), args.repeat)
+    finally:
+        kernels.NUMBA_AVAILABLE = numba_available
+    
+    results = [("numpy per symbol", numpy_symbol), ("numpy panel", numpy_panel)]
+    if numba_available:
+        kernels.warm_up()
+        results.append(("numba per symbol", timed(
+            "numba engine (per symbol)",
+            lambda: [compute_indicators(frame, DEFAULT_INDICATORS) for frame in frames.values()],
+            args.repeat)))
+        results.append(("numba panel", timed("numba engine (panel)", lambda: compute_panel(frames), args.repeat)))
+    
+    print()
+    for label, elapsed in results:
+        print(f"{label:<32} {baseline / elapsed:8.1f}x faster than pandas")
+
+if __name__ == '__main__':
+    main()
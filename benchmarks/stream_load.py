@@ -0,0 +1,121 @@
+"""Load-test the server's /ws fan-out with many clients, reporting tick latency and throughput
+
+Start the replay feed, point the server at it (websocket.url: "ws://localhost:8765")
+and start the server, then run from the repository root:
+
+    python -m services.replay_feed --speed 10 --rate 2
+    python server.py
+    python -m benchmarks.stream_load --clients 500 --symbols 2000 --per-client 20 --duration 30
+
+Latency is measured from the trade time the feed stamps on each trade to the
+moment a client receives the update, so it covers the feed socket, the ingest
+pipeline, fan-out and the client socket. Run everything on one host so the
+clocks agree.
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+import numpy as np
+import websockets
+from services.broadcaster import DELTA_RECORD, FRAME_HEADER, FULL, FULL_RECORD
+
+class LoadStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.updates = 0
+        self.messages = 0
+        self.bytes = 0
+        self.connected = 0
+        self.failed = 0
+
+def frame_times(frame: bytes) -> List[int]:
+    """Trade times (epoch millis) of the records in a binary frame"""
+    (base,) = FRAME_HEADER.unpack_from(frame)
+    times = []
+    offset = FRAME_HEADER.size
+    while offset < len(frame):
+        record = FULL_RECORD if frame[offset] == FULL else DELTA_RECORD
+        _, _, millis, _ = record.unpack_from(frame, offset)
+        times.append(base + millis)
+        offset += record.size
+    return times
+
+def message_times(text: str) -> List[int]:
+    """Trade times of a JSON update, or of every update in a conflated batch"""
+    data = json.loads(text)
+    updates = data if isinstance(data, list) else [data]
+    return [update['trade_time'] for update in updates if 'trade_time' in update]
+
+async def run_client(url: str, client_id: str, symbols: List[str], args, stats: LoadStats,
+                     connect_limit: asyncio.Semaphore, deadline: float) -> None:
+    try:
+        async with connect_limit:
+            websocket = await websockets.connect(f"{url}/{client_id}", max_queue=None)
+            await websocket.send(json.dumps({'subscribe': symbols, 'conflate': args.conflate, 'format': args.format}))
+        stats.connected += 1
+    except Exception:
+        stats.failed += 1
+        return
+    
+    async with websocket:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(websocket.recv(), remaining)
+            except (asyncio.TimeoutError, websockets.exceptions.ConnectionClosed):
+                break
+            received = time.time() * 1000
+            times = frame_times(message) if isinstance(message, bytes) else message_times(message)
+            stats.messages += 1
+            stats.bytes += len(message)
+            stats.updates += len(times)
+            stats.latencies.extend(received - trade_time for trade_time in times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='ws://localhost:8000/ws')
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--symbols', type=int, default=1000, help='size of the synthetic symbol universe')
+    parser.add_argument('--per-client', type=int, default=20, help='symbols each client subscribes to')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to measure')
+    parser.add_argument('--conflate', action='store_true')
+    parser.add_argument('--format', choices=('json', 'binary'), default='json')
+    parser.add_argument('--connect-concurrency', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    universe = [f"SYN{i:05d}" for i in range(args.symbols)]
+    rng = np.random.default_rng(args.seed)
+    subscriptions: Dict[str, List[str]] = {
+        f"load-{i}": list(rng.choice(universe, size=min(args.per_client, len(universe)), replace=False))
+        for i in range(args.clients)
+    }
+    
+    async def run() -> LoadStats:
+        stats = LoadStats()
+        connect_limit = asyncio.Semaphore(args.connect_concurrency)
+        deadline = time.monotonic() + args.duration
+        await asyncio.gather(*(run_client(args.url, client_id, symbols, args, stats, connect_limit, deadline)
+                               for client_id, symbols in subscriptions.items()))
+        return stats
+    
+    started = time.monotonic()
+    stats = asyncio.run(run())
+    elapsed = time.monotonic() - started
+    
+    print(f"{stats.connected} clients connected, {stats.failed} failed, "
+          f"{len(set(s for symbols in subscriptions.values() for s in symbols))} symbols streamed")
+    print(f"{stats.updates:,} updates in {stats.messages:,} messages, {stats.bytes / 1e6:.1f} MB over {elapsed:.1f} s")
+    print(f"{stats.updates / elapsed:,.0f} updates/s, {stats.messages / elapsed:,.0f} messages/s, "
+          f"{stats.bytes / elapsed / 1e6:.2f} MB/s")
+    if stats.latencies:
+        latencies = np.array(stats.latencies)
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        print(f"tick latency ms: p50 {p50:.1f}  p90 {p90:.1f}  p99 {p99:.1f}  max {latencies.max():.1f}")
+
+if __name__ == '__main__':
+    main()
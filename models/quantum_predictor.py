@@ -8,8 +8,9 @@ import xgboost as xgb
 import lightgbm as lgb
 from sklearn.preprocessing import StandardScaler
 import logging
-import yfinance as yf
 from datetime import datetime, timedelta
+from services.market_data import MarketDataService
+from utils.indicators import PREDICTOR_INDICATORS, indicator_engine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -42,6 +43,7 @@ class QuantumPredictor:
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.scaler = StandardScaler()
         self.models = self._initialize_models()
+        self.market_data = MarketDataService()
         
     def _initialize_models(self) -> Dict:
         models = {}
@@ -83,24 +85,19 @@ class QuantumPredictor:
     def _get_market_data(self, symbol: str) -> pd.DataFrame:
         """Get market data with technical indicators"""
         try:
-            # Get historical data
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period='1y')
+            # Get historical data, refreshed incrementally through the shared bar cache
+            data = self.market_data.get_historical_data(symbol, period='1y')
             
             if data.empty:
                 return None
             
-            # Calculate technical indicators
-            data['SMA_20'] = data['Close'].rolling(window=20).mean()
-            data['SMA_50'] = data['Close'].rolling(window=50).mean()
-            data['RSI'] = self._calculate_rsi(data['Close'])
-            data['MACD'] = self._calculate_macd(data['Close'])
-            data['Volume_MA'] = data['Volume'].rolling(window=20).mean()
-            data['Returns'] = data['Close'].pct_change()
-            data['Volatility'] = data['Returns'].rolling(window=20).std()
+            # SMA, RSI and MACD come with the cached bars; copy before adding predictor features
+            data = data.copy()
+            data['Volume_MA'] = data['Volume_SMA']
+            indicator_engine.add_indicators(data, PREDICTOR_INDICATORS, symbol)
             
             # Forward fill NaN values
-            data = data.fillna(method='ffill')
+            data = data.ffill()
             
             return data
             
@@ -108,20 +105,6 @@ class QuantumPredictor:
             logger.error(f"Error getting market data for {symbol}: {e}")
             return None
     
-    def _calculate_rsi(self, prices: pd.Series, period: int = 14) -> pd.Series:
-        """Calculate RSI"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
-    
-    def _calculate_macd(self, prices: pd.Series) -> pd.Series:
-        """Calculate MACD"""
-        exp1 = prices.ewm(span=12, adjust=False).mean()
-        exp2 = prices.ewm(span=26, adjust=False).mean()
-        return exp1 - exp2
-    
     def _prepare_features(self, data: pd.DataFrame) -> torch.Tensor:
         """Prepare features for prediction"""
         features = np.column_stack([
@@ -47,13 +47,10 @@ def show_dashboard():
     # Create metrics grid
     cols = st.columns(4)
     
-    # Sample market indices with real-time data
-    indices = {
-        "S&P 500": market_data.get_real_time_stock_data(['^GSPC'])['^GSPC'],
-        "NASDAQ": market_data.get_real_time_stock_data(['^IXIC'])['^IXIC'],
-        "DOW": market_data.get_real_time_stock_data(['^DJI'])['^DJI'],
-        "VIX": market_data.get_real_time_stock_data(['^VIX'])['^VIX']
-    }
+    # Market indices, served from the same quote snapshot as the watchlists
+    index_names = {"^GSPC": "S&P 500", "^IXIC": "NASDAQ", "^DJI": "DOW", "^VIX": "VIX"}
+    index_data = market_data.get_real_time_stock_data(list(index_names))
+    indices = {name: index_data[symbol] for symbol, name in index_names.items() if symbol in index_data}
     
     for i, (index, data) in enumerate(indices.items()):
         change = data['change']
@@ -73,6 +70,7 @@ def show_dashboard():
     stock_cols = st.columns(3)
     for i, (symbol, data) in enumerate(stock_data.items()):
         change_color = "status-up" if data['change'] > 0 else "status-down"
+        market_cap = f"${data['market_cap']/1e9:.1f}B" if data['market_cap'] else "N/A"
         with stock_cols[i % 3]:
             st.markdown(f"""
                 <div class="tesla-card">
@@ -83,7 +81,7 @@ def show_dashboard():
                     <div style="font-size: 1.5rem; margin: 1rem 0;">${data['price']:.2f}</div>
                     <div style="color: #888;">
                         Volume: {data['volume']:,.0f}<br>
-                        Market Cap: ${data['market_cap']/1e9:.1f}B
+                        Market Cap: {market_cap}
                     </div>
                 </div>
             """, unsafe_allow_html=True)
@@ -16,6 +16,7 @@ def show_market_regime():
     
     # Get market data
     stock_data = market_data.get_real_time_stock_data()
+    breadth = market_data.get_market_breadth()
     
     # Current Regime
     st.subheader("Current Market Regime")
@@ -104,33 +105,51 @@ def show_market_regime():
     
     with col1:
         # Technical indicators
+        ad_ratio = breadth['advance_decline_ratio']
+        high_low_ratio = breadth['new_highs'] / breadth['new_lows'] if breadth['new_lows'] else None
         indicators = pd.DataFrame({
             'Indicator': ['VIX', 'Put/Call Ratio', 'Advance/Decline', 'New Highs/Lows'],
-            'Value': ['22.5', '0.85', '1.2', '2.5'],
-            'Signal': ['Elevated', 'Neutral', 'Bullish', 'Bullish']
+            'Value': [
+                '22.5',
+                '0.85',
+                f"{ad_ratio:.2f}" if ad_ratio is not None else f"{breadth['advancing']}/0",
+                f"{high_low_ratio:.2f}" if high_low_ratio is not None else f"{breadth['new_highs']}/0"
+            ],
+            'Signal': [
+                'Elevated',
+                'Neutral',
+                'Bullish' if breadth['advancing'] > breadth['declining'] else 'Bearish',
+                'Bullish' if breadth['new_highs'] > breadth['new_lows'] else 'Bearish'
+            ]
         })
         
         st.dataframe(indicators, hide_index=True)
     
     with col2:
         # Market breadth
-        breadth = pd.DataFrame({
+        def percent(value):
+            return f"{value:.0f}%" if value is not None else 'N/A'
+        
+        breadth_table = pd.DataFrame({
             'Metric': ['Stocks Above 200 MA', 'Stocks Above 50 MA', 'RSI > 70', 'RSI < 30'],
-            'Value': ['65%', '55%', '15%', '10%']
+            'Value': [
+                percent(breadth['above_200ma_pct']),
+                percent(breadth['above_50ma_pct']),
+                percent(breadth['rsi_overbought_pct']),
+                percent(breadth['rsi_oversold_pct'])
+            ]
         })
         
-        st.dataframe(breadth, hide_index=True)
+        st.dataframe(breadth_table, hide_index=True)
     
     # Sector Analysis
     st.subheader("Sector Performance")
     
-    # Sample sector data
-    sectors = ['Technology', 'Healthcare', 'Financials', 'Energy', 'Consumer', 'Industrials']
-    performance = np.random.uniform(-5, 8, size=len(sectors))
-    
+    # Equal-weighted daily return of each sector in the breadth universe
+    sectors = breadth['sectors']
     sector_data = pd.DataFrame({
-        'Sector': sectors,
-        'Performance': performance
+        'Sector': list(sectors),
+        'Performance': [stats['return'] for stats in sectors.values()]
     })
     
     fig = px.bar(
@@ -28,7 +28,8 @@ def show_technical_analysis():
         )
     
     # Get technical data
-    technical_data = market_data.get_technical_indicators(symbol)
+    technical_data = market_data.get_technical_indicators(symbol, timeframe)
+    patterns_data = market_data.get_patterns(symbol)
     
     if technical_data is not None:
         # Price Chart with Indicators
@@ -117,16 +118,24 @@ def show_technical_analysis():
         # Support and Resistance Levels
         st.subheader("Support & Resistance Levels")
         
+        # Nearest levels clustered from pivot highs/lows, furthest resistance first
+        resistance = patterns_data.get('resistance', [])[:2][::-1]
+        support = patterns_data.get('support', [])[:2]
+        
+        def strength(touches):
+            return 'High' if touches >= 3 else 'Medium' if touches == 2 else 'Low'
+        
         levels = pd.DataFrame({
-            'Level': ['Strong Resistance', 'Resistance', 'Current Price', 'Support', 'Strong Support'],
-            'Price': [
-                f"${technical_data['High'].max():.2f}",
-                f"${technical_data['Close'].iloc[-1] * 1.02:.2f}",
-                f"${technical_data['Close'].iloc[-1]:.2f}",
-                f"${technical_data['Close'].iloc[-1] * 0.98:.2f}",
-                f"${technical_data['Low'].min():.2f}"
-            ],
-            'Strength': ['High', 'Medium', '-', 'Medium', 'High']
+            'Level': (['Resistance'] * len(resistance) + ['Current Price'] + ['Support'] * len(support)),
+            'Price': (
+                [f"${level['price']:.2f}" for level in resistance] +
+                [f"${technical_data['Close'].iloc[-1]:.2f}"] +
+                [f"${level['price']:.2f}" for level in support]
+            ),
+            'Strength': (
+                [strength(level['touches']) for level in resistance] + ['-'] +
+                [strength(level['touches']) for level in support]
+            )
         })
         
         st.dataframe(levels, hide_index=True)
@@ -134,15 +143,18 @@ def show_technical_analysis():
         # Pattern Recognition
         st.subheader("Pattern Recognition")
         
-        # Sample patterns (in real implementation, use pattern recognition algorithms)
-        patterns = pd.DataFrame({
-            'Pattern': ['Double Bottom', 'Golden Cross', 'RSI Divergence'],
-            'Timeframe': ['4H', '1D', '1H'],
-            'Reliability': ['High', 'Medium', 'Medium'],
-            'Signal': ['Buy', 'Buy', 'Sell']
-        })
-        
-        st.dataframe(patterns, hide_index=True)
+        recent = patterns_data.get('patterns', [])
+        if recent:
+            patterns = pd.DataFrame({
+                'Pattern': [pattern['pattern'] for pattern in recent],
+                'Date': [pattern['date'].strftime('%Y-%m-%d') for pattern in recent],
+                'Timeframe': ['1D'] * len(recent),
+                'Reliability': [pattern['reliability'] for pattern in recent],
+                'Signal': [pattern['signal'] for pattern in recent]
+            })
+            st.dataframe(patterns, hide_index=True)
+        else:
+            st.info("No patterns detected in recent bars.")
         
         # Volume Analysis
         st.subheader("Volume Analysis")
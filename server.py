@@ -1,12 +1,18 @@
-from fastapi import FastAPI, WebSocket, HTTPException
+from fastapi import FastAPI, WebSocket, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Dict, Optional
 import uvicorn
 import asyncio
 import logging
+import math
 from datetime import datetime
 import yaml
 from services.market_data import MarketDataService
+from services.broadcaster import Broadcaster
+from services.executor import run_blocking
+from services.quote_table import quote_table
+from services.screener import Screener
+from utils.indicator_kernels import warm_up as warm_up_indicator_kernels
 from models.quantum_predictor import QuantumPredictor
 
 # Configure logging
@@ -36,91 +42,166 @@ app.add_middleware(
 # Initialize services
 market_data = MarketDataService()
 predictor = QuantumPredictor()
+screener = Screener(market_data)
 
-# WebSocket connections store
-connections: Dict[str, List[WebSocket]] = {}
+# Websocket clients and the symbols each one subscribed to
+broadcaster = Broadcaster()
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
     logger.info("Starting Quantum Trading API server...")
+    await run_blocking(warm_up_indicator_kernels)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down Quantum Trading API server...")
     await market_data.stop_streaming()
+    await market_data.provider.aclose()
 
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    """WebSocket endpoint for real-time market data"""
-    await websocket.accept()
+    """WebSocket endpoint for real-time market data
     
-    if client_id not in connections:
-        connections[client_id] = []
-    connections[client_id].append(websocket)
+    Clients send {"subscribe": [...]} and {"unsubscribe": [...]}. A subscribe may
+    also set "conflate" (one frame per ui.update_interval with each symbol's
+    latest price) and "format": "json" or "binary" (compact frames, see
+    services.broadcaster); binary clients are sent the symbol ids in reply.
+    """
+    await websocket.accept()
+    session = broadcaster.register(websocket, client_id)
     
     try:
         while True:
             data = await websocket.receive_json()
             
             if 'subscribe' in data:
-                # Start streaming for new symbols
-                symbols = data['subscribe']
-                await market_data.start_streaming(symbols)
+                try:
+                    broadcaster.configure(session, data.get('conflate'), data.get('format'))
+                except ValueError as e:
+                    await websocket.send_json({'error': str(e)})
+                    continue
+                # Only symbols nobody streamed yet need an upstream subscription
+                new = broadcaster.subscribe(session, data['subscribe'])
+                if session.format == 'binary':
+                    await websocket.send_json({
+                        'format': 'binary',
+                        'symbols': {symbol: broadcaster.symbol_ids[symbol] for symbol in session.symbols}
+                    })
+                if new:
+                    await market_data.start_streaming(new, broadcast_market_data)
                 
             elif 'unsubscribe' in data:
-                # Stop streaming for symbols
-                symbols = data['unsubscribe']
-                for symbol in symbols:
-                    await market_data.stop_streaming()
+                # Stop streaming only symbols no other client still wants
+                idle = broadcaster.unsubscribe(session, data['unsubscribe'])
+                if idle:
+                    await market_data.stop_streaming(idle)
                     
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
-        connections[client_id].remove(websocket)
-        if not connections[client_id]:
-            del connections[client_id]
+        idle = broadcaster.unregister(session)
+        if idle:
+            await market_data.stop_streaming(idle)
 
-async def broadcast_market_data(symbol: str, price: float):
-    """Broadcast market data to all connected clients"""
+async def broadcast_market_data(symbol: str, price: float, indicators: Optional[Dict[str, float]] = None):
+    """Send market data to the clients subscribed to the symbol"""
+    now = datetime.now()
+    quote = quote_table.get(symbol)
+    # Epoch millis of the trade behind this price, so clients can measure end-to-end latency
+    trade_time = int(quote['timestamp'] * 1000) if quote and quote['timestamp'] else int(now.timestamp() * 1000)
     message = {
         'symbol': symbol,
         'price': price,
-        'timestamp': datetime.now().isoformat()
+        'timestamp': now.isoformat(),
+        'trade_time': trade_time
     }
+    if indicators:
+        # Live RSI/MACD come from the streaming indicator state at no extra cost
+        message['indicators'] = {
+            name: value for name, value in indicators.items() if not math.isnan(value)
+        }
     
-    for client_connections in connections.values():
-        for connection in client_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to client: {e}")
+    # Serialized once and queued per client; never waits on a client's socket
+    broadcaster.publish(symbol, message, trade_time)
+
+@app.get("/api/v1/stream/stats")
+async def get_stream_stats():
+    """Get ingest pipeline and client fan-out metrics"""
+    try:
+        return {"ingest": market_data.get_stream_stats(), "fanout": broadcaster.stats()}
+    except Exception as e:
+        logger.error(f"Error getting stream stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/v1/market/summary")
 async def get_market_summary(symbols: List[str]):
     """Get market summary for multiple symbols"""
     try:
-        return market_data.get_market_summary(symbols)
+        return await market_data.get_market_summary_async(symbols)
     except Exception as e:
         logger.error(f"Error getting market summary: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/market/breadth")
+async def get_market_breadth():
+    """Get market breadth across the configured universe"""
+    try:
+        return await market_data.get_market_breadth_async()
+    except Exception as e:
+        logger.error(f"Error getting market breadth: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/market/patterns/{symbol}")
+async def get_patterns(symbol: str, period: str = "1y", interval: str = "1d"):
+    """Get support/resistance levels and recent chart patterns"""
+    try:
+        return await market_data.get_patterns_async(symbol, period, interval)
+    except Exception as e:
+        logger.error(f"Error getting patterns: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/v1/market/historical/{symbol}")
 async def get_historical_data(symbol: str, period: str = "1y"):
     """Get historical market data"""
     try:
-        data = market_data.get_historical_data(symbol, period)
-        return data.to_dict(orient='records')
+        data = await market_data.get_historical_data_async(symbol, period)
+        return await run_blocking(data.to_dict, orient='records')
     except Exception as e:
         logger.error(f"Error getting historical data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/market/intraday/{symbol}")
+async def get_intraday_data(symbol: str, interval: str = "1m", period: str = "1d"):
+    """Get intraday bars ending in the bar still forming from streamed trades"""
+    try:
+        data = await market_data.get_intraday_data_async(symbol, interval, period)
+        data = data.reset_index(names='Datetime') if not data.empty else data
+        return await run_blocking(data.to_dict, orient='records')
+    except Exception as e:
+        logger.error(f"Error getting intraday data: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/screener")
+async def screen_market(filter: str, sort_by: Optional[str] = None, descending: bool = True,
+                        page: int = 1, page_size: int = Screener.DEFAULT_PAGE_SIZE,
+                        symbols: Optional[List[str]] = Query(None)):
+    """Screen cached symbols with a filter such as RSI<30 & Close>SMA_50 & Volume_Ratio>2"""
+    try:
+        return await screener.screen_async(filter, symbols, sort_by, descending, page, page_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error screening market: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/v1/predictions")
 async def get_predictions(symbols: List[str]):
     """Get AI predictions for multiple symbols"""
     try:
-        return predictor.get_predictions(symbols)
+        # Model inference is CPU-bound; keep it off the event loop
+        return await run_blocking(predictor.get_predictions, symbols)
     except Exception as e:
         logger.error(f"Error getting predictions: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -129,10 +210,16 @@ async def get_predictions(symbols: List[str]):
 async def get_real_time_price(symbol: str):
     """Get real-time price for a symbol"""
     try:
-        price = market_data.get_real_time_price(symbol)
+        # Served from the shared quote table while fresh; only a miss goes to the provider
+        price = await market_data.get_real_time_price_async(symbol)
         if price is None:
             raise HTTPException(status_code=404, detail=f"Price not found for {symbol}")
-        return {"symbol": symbol, "price": price}
+        quote = quote_table.get(symbol) or {}
+        return {
+            "symbol": symbol,
+            "price": price,
+            **{field: quote.get(field) for field in ("bid", "ask", "volume", "change", "timestamp")}
+        }
     except Exception as e:
         logger.error(f"Error getting price: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,238 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional
+import logging
+import threading
+import time
+from services.shared_segment import BAR_COLUMNS
+from utils.cache_manager import cache_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Closed bars kept per symbol and interval when config.yaml does not say
+DEFAULT_CAPACITY = {'1s': 3600, '1m': 1440, '5m': 576}
+UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600}
+
+def interval_seconds(interval: str) -> int:
+    """Length of a bar interval such as '1s', '1m' or '5m' in seconds"""
+    try:
+        return int(interval[:-1]) * UNIT_SECONDS[interval[-1]]
+    except (KeyError, ValueError):
+        raise ValueError(f"Unsupported bar interval {interval!r}, expected a number followed by s, m or h")
+
+class BarRing:
+    """Closed bars of one symbol and interval in a fixed-size ring, plus the bar still forming
+    
+    Rows are epoch seconds of the bar start followed by OHLCV, like the shared
+    segment's bars. Once the ring is full each closed bar overwrites the oldest.
+    """
+
+    def __init__(self, seconds: int, capacity: int):
+        self.seconds = seconds
+        self.capacity = capacity
+        self.bars = np.empty((capacity, 1 + len(BAR_COLUMNS)))
+        # Row the next closed bar goes to, and how many rows hold bars
+        self.head = 0
+        self.count = 0
+        # [start, open, high, low, close, volume] of the bar trades currently go into
+        self.forming: Optional[List[float]] = None
+        # Start of the first bar built; it may have missed the trades before streaming began
+        self.first_start: Optional[float] = None
+        # Start of the newest bar, forming or closed; older trades arrive too late
+        self.last_start: Optional[float] = None
+    
+    def add(self, timestamp: float, price: float, volume: float) -> bool:
+        """Fold a trade into its bar; returns False for a trade whose bar has already closed"""
+        start = timestamp - timestamp % self.seconds
+        if self.last_start is not None and start < self.last_start:
+            return False
+        bar = self.forming
+        if bar is None and start == self.last_start:
+            return False
+        if bar is not None and start > bar[0]:
+            self._close()
+            bar = None
+        if bar is None:
+            self.forming = [start, price, price, price, price, volume]
+            self.last_start = start
+            if self.first_start is None:
+                self.first_start = start
+            return True
+        if price > bar[2]:
+            bar[2] = price
+        elif price < bar[3]:
+            bar[3] = price
+        bar[4] = price
+        bar[5] += volume
+        return True
+    
+    def roll(self, now: float, grace: float) -> bool:
+        """Close the forming bar once its interval plus grace has passed; returns whether it closed"""
+        if self.forming is None or self.forming[0] + self.seconds + grace > now:
+            return False
+        self._close()
+        return True
+    
+    def _close(self) -> None:
+        self.bars[self.head] = self.forming
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.forming = None
+    
+    def closed(self) -> np.ndarray:
+        """Copy of the closed bars, oldest first"""
+        if self.count < self.capacity:
+            return self.bars[:self.count].copy()
+        return np.concatenate((self.bars[self.head:], self.bars[:self.head]))
+    
+    def oldest_start(self) -> Optional[float]:
+        if self.count == 0:
+            return None
+        return float(self.bars[0 if self.count < self.capacity else self.head, 0])
+    
+    def complete_since(self, start: float) -> bool:
+        """Whether the ring holds every bar from start onwards that had trades"""
+        if self.first_start is None or self.first_start >= start:
+            return False
+        # Once the ring wraps, bars older than its oldest row are gone
+        return self.count < self.capacity or self.oldest_start() <= start
+
+def _frame(rows: np.ndarray) -> pd.DataFrame:
+    index = pd.to_datetime((rows[:, 0] * 1e9).round().astype(np.int64), utc=True)
+    return pd.DataFrame(rows[:, 1:], index=index, columns=list(BAR_COLUMNS))
+
+class BarAggregator:
+    """Builds OHLCV bars of several intervals per symbol from streamed trades
+    
+    Every trade updates the forming bar of each interval in O(1). A bar closes
+    when the first trade of a later bar arrives, or when it is read after its
+    interval (plus a grace period for delayed trades) has ended. Closed bars
+    stay in the symbol's ring buffer for that interval until overwritten;
+    MarketDataService merges them into cached intraday history, so streamed
+    symbols never have to download bars again once seeded.
+    """
+
+    def __init__(self, capacity: Optional[Dict[str, int]] = None, grace: Optional[float] = None):
+        config = cache_manager.config.get('bar_aggregator', {})
+        capacity = capacity or config.get('capacity', DEFAULT_CAPACITY)
+        self.capacity = {interval: int(size) for interval, size in capacity.items()}
+        self.seconds = {interval: interval_seconds(interval) for interval in self.capacity}
+        self.grace = grace if grace is not None else config.get('late_trade_grace', 1.0)
+        # symbol -> interval -> ring
+        self.rings: Dict[str, Dict[str, BarRing]] = {}
+        # symbol -> (price, epoch seconds) of its latest trade
+        self.last_trades: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.trades = 0
+        self.late = 0
+    
+    @property
+    def intervals(self) -> List[str]:
+        return list(self.capacity)
+    
+    @property
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return list(self.rings)
+    
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.rings
+    
+    def add_trade(self, symbol: str, price: float, volume: float = 0.0, timestamp: Optional[float] = None) -> None:
+        """Fold one trade (epoch seconds, now if None) into every interval's bars for the symbol"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        volume = float(volume or 0.0)
+        with self._lock:
+            rings = self.rings.get(symbol)
+            if rings is None:
+                rings = self.rings[symbol] = {
+                    interval: BarRing(self.seconds[interval], size) for interval, size in self.capacity.items()
+                }
+            late = False
+            for ring in rings.values():
+                late |= not ring.add(timestamp, price, volume)
+            self.trades += 1
+            self.late += late
+            last = self.last_trades.get(symbol)
+            if last is None or timestamp >= last[1]:
+                self.last_trades[symbol] = (price, timestamp)
+    
+    def mark_gap(self, symbols: Iterable[str]) -> None:
+        """Record that trades may have been missed, so bars before now no longer count as complete"""
+        with self._lock:
+            for symbol in symbols:
+                for ring in self.rings.get(symbol, {}).values():
+                    ring.first_start = None
+    
+    def drop(self, symbol: str) -> None:
+        """Forget a symbol's bars, e.g. once it is no longer streamed"""
+        with self._lock:
+            self.rings.pop(symbol, None)
+            self.last_trades.pop(symbol, None)
+    
+    def _ring(self, symbol: str, interval: str, now: Optional[float] = None) -> Optional[BarRing]:
+        if interval not in self.capacity:
+            raise ValueError(f"No {interval} bars are aggregated, expected one of {', '.join(self.capacity)}")
+        rings = self.rings.get(symbol)
+        if rings is None:
+            return None
+        ring = rings[interval]
+        ring.roll(now if now is not None else time.time(), self.grace)
+        return ring
+    
+    def get_bars(self, symbol: str, interval: str, since: Optional[pd.Timestamp] = None,
+                 include_forming: bool = False) -> Optional[pd.DataFrame]:
+        """Closed bars (UTC index) starting at or after since, optionally followed by the forming bar"""
+        with self._lock:
+            ring = self._ring(symbol, interval)
+            if ring is None:
+                return None
+            rows = ring.closed()
+            if include_forming and ring.forming is not None:
+                rows = np.vstack((rows, ring.forming))
+        if since is not None:
+            rows = rows[rows[:, 0] >= since.timestamp()]
+        return _frame(rows)
+    
+    def get_forming_bar(self, symbol: str, interval: str) -> Optional[Dict[str, float]]:
+        """The bar still forming for a symbol, with its start as epoch seconds"""
+        with self._lock:
+            ring = self._ring(symbol, interval)
+            if ring is None or ring.forming is None:
+                return None
+            return {'start': ring.forming[0], **dict(zip(BAR_COLUMNS, ring.forming[1:]))}
+    
+    def complete_since(self, symbol: str, interval: str, start: pd.Timestamp) -> bool:
+        """Whether the symbol's bars hold every bar of the interval from start onwards"""
+        with self._lock:
+            ring = self._ring(symbol, interval)
+            return ring is not None and ring.complete_since(start.timestamp())
+    
+    def next_close(self, symbol: str, interval: str) -> Optional[float]:
+        """Epoch seconds when the forming bar will be read as closed, or None if nothing is forming"""
+        with self._lock:
+            ring = self._ring(symbol, interval)
+            if ring is None or ring.forming is None:
+                return None
+            return ring.forming[0] + ring.seconds + self.grace
+    
+    def last_price(self, symbol: str, max_age: Optional[float] = None) -> Optional[float]:
+        """Price of the symbol's latest trade, if it is not older than max_age seconds"""
+        last = self.last_trades.get(symbol)
+        if last is None or (max_age is not None and time.time() - last[1] > max_age):
+            return None
+        return last[0]
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'symbols': len(self.rings),
+                'intervals': self.intervals,
+                'trades': self.trades,
+                'late': self.late,
+                'bytes': sum(ring.bars.nbytes for rings in self.rings.values() for ring in rings.values())
+            }
+
+# Process-wide aggregator fed by every stream in the process
+bar_aggregator = BarAggregator()
@@ -0,0 +1,133 @@
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional
+import pandas as pd
+import yaml
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def align_tz(data: pd.DataFrame, index: pd.Index) -> pd.DataFrame:
+    """Convert a frame's DatetimeIndex to the timezone (or naivety) of another index"""
+    if not isinstance(data.index, pd.DatetimeIndex) or not isinstance(index, pd.DatetimeIndex):
+        return data
+    if index.tz is not None:
+        if data.index.tz is None:
+            return data.tz_localize(index.tz)
+        return data.tz_convert(index.tz)
+    if data.index.tz is not None:
+        # Naive indexes hold exchange-local wall time
+        return data.tz_localize(None)
+    return data
+
+class BarStore:
+    """Persistent OHLCV store, one Arrow IPC file per symbol and interval"""
+    
+    def __init__(self, root: Optional[str] = None, enabled: bool = True):
+        self.config = self._load_config()
+        storage_config = self.config.get('storage', {})
+        path = root or storage_config.get('bar_store', 'data/bars')
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(__file__), '..', path)
+        self.root = os.path.normpath(path)
+        self.enabled = enabled and pa is not None and storage_config.get('bar_store_enabled', True)
+        self._lock = threading.Lock()
+        
+        if pa is None:
+            logger.warning("pyarrow is not installed, on-disk bar store disabled")
+    
+    def _load_config(self) -> dict:
+        config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
+        with open(config_path, 'r') as f:
+            return yaml.safe_load(f)
+    
+    def _path(self, symbol: str, interval: str) -> str:
+        """Get the file holding bars for a symbol and interval"""
+        filename = symbol.replace('/', '_').replace(os.sep, '_') + '.arrow'
+        return os.path.join(self.root, interval, filename)
+    
+    def read(self, symbol: str, interval: str = '1d') -> Optional[pd.DataFrame]:
+        """Read stored bars as views of a memory map where possible, or None if nothing is stored"""
+        if not self.enabled:
+            return None
+        
+        path = self._path(symbol, interval)
+        if not os.path.exists(path):
+            return None
+        
+        try:
+            with pa.memory_map(path, 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+            # One block per column lets numeric columns without nulls stay zero-copy views of
+            # the mapped file, so their pages are shared by every process reading it rather
+            # than copied. Those columns are read-only: add columns or copy, never write in place
+            return table.to_pandas(split_blocks=True, self_destruct=True)
+        except Exception as e:
+            logger.error(f"Error reading stored bars for {symbol} ({interval}): {e}")
+            return None
+    
+    @contextmanager
+    def _file_lock(self, path: str):
+        """Hold an exclusive lock on a sidecar file of path, shared with every process writing the store"""
+        with self._lock:
+            if fcntl is None:
+                # No flock on this platform; only writers within this process are serialized
+                yield
+                return
+            with open(f"{path}.lock", 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def write(self, symbol: str, interval: str, data: pd.DataFrame) -> None:
+        """Merge bars into the stored file, replacing it atomically
+        
+        The ingest process and server workers write the same files, so the
+        whole read-merge-replace runs under an inter-process file lock;
+        otherwise the last writer would drop the other's bars.
+        """
+        if not self.enabled or data is None or data.empty:
+            return
+        
+        path = self._path(symbol, interval)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with self._file_lock(path):
+                existing = self.read(symbol, interval)
+                if existing is not None and not existing.empty:
+                    data = pd.concat([existing, align_tz(data, existing.index)])
+                    data = data[~data.index.duplicated(keep='last')].sort_index()
+                
+                table = pa.Table.from_pandas(data, preserve_index=True)
+                
+                # Readers keep their mapping of the old file until they reopen it
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with pa.OSFile(tmp_path, 'wb') as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Error storing bars for {symbol} ({interval}): {e}")
+    
+    def delete(self, symbol: str, interval: str = '1d') -> None:
+        """Remove stored bars for a symbol and interval"""
+        path = self._path(symbol, interval)
+        if os.path.exists(path):
+            os.remove(path)
+
+# Process-wide bar store shared by every MarketDataService instance
+bar_store = BarStore()
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+from collections import Counter
+from typing import Dict, Hashable, List, Mapping, Optional, Tuple
+from datetime import datetime
+import logging
+import threading
+from utils.cache_manager import cache_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# RSI distribution buckets as (label, lower bound inclusive)
+RSI_BUCKETS = (('<30', 0.0), ('30-50', 30.0), ('50-70', 50.0), ('>70', 70.0))
+
+class BreadthEngine:
+    """Market breadth over a configured universe, maintained as running totals
+    
+    Each symbol contributes a handful of counts (above its 50/200-bar average,
+    advancing, at a new high, its RSI bucket, its sector's return). The totals
+    are the sum of those contributions, so when a symbol gets a new bar only its
+    old contribution is subtracted and the new one added.
+    """
+
+    def __init__(self, universe: Optional[Mapping[str, List[str]]] = None, period: Optional[str] = None,
+                 interval: Optional[str] = None, high_low_window: Optional[int] = None):
+        config = cache_manager.config.get('breadth', {})
+        universe = universe if universe is not None else config.get('universe', {})
+        self.sectors = {symbol: sector for sector, symbols in universe.items() for symbol in symbols}
+        self.period = period or config.get('period', '1y')
+        self.interval = interval or config.get('interval', '1d')
+        self.high_low_window = high_low_window or config.get('high_low_window', 252)
+        self._lock = threading.Lock()
+        # symbol -> (fingerprint of the bars it was computed from, contribution)
+        self._contributions: Dict[str, Tuple[Hashable, Counter]] = {}
+        self._totals: Counter = Counter()
+        self.updated_at: Optional[datetime] = None
+    
+    @property
+    def symbols(self) -> List[str]:
+        return list(self.sectors)
+    
+    @staticmethod
+    def _fingerprint(data: pd.DataFrame) -> Hashable:
+        # The last bar may still be forming, so its close is part of the identity
+        return (len(data), data.index[-1], float(data['Close'].iloc[-1]))
+    
+    def update(self, frames: Mapping[str, pd.DataFrame]) -> int:
+        """Fold in bar frames, recomputing contributions only for symbols whose bars changed
+        
+        Returns how many symbols were recomputed.
+        """
+        changed = 0
+        with self._lock:
+            for symbol, data in frames.items():
+                if symbol not in self.sectors or data is None or data.empty:
+                    continue
+                try:
+                    fingerprint = self._fingerprint(data)
+                    previous = self._contributions.get(symbol)
+                    if previous is not None and previous[0] == fingerprint:
+                        continue
+                    contribution = self._contribution(symbol, data)
+                    if previous is not None:
+                        self._totals.subtract(previous[1])
+                    self._totals.update(contribution)
+                    self._contributions[symbol] = (fingerprint, contribution)
+                    changed += 1
+                except Exception as e:
+                    logger.error(f"Error updating breadth for {symbol}: {e}")
+            if changed:
+                self.updated_at = datetime.now()
+        return changed
+    
+    def remove(self, symbol: str) -> None:
+        """Drop a symbol's contribution, e.g. when it leaves the universe"""
+        with self._lock:
+            previous = self._contributions.pop(symbol, None)
+            if previous is not None:
+                self._totals.subtract(previous[1])
+    
+    def _contribution(self, symbol: str, data: pd.DataFrame) -> Counter:
+        close = data['Close'].to_numpy(dtype=float)
+        high = data['High'].to_numpy(dtype=float) if 'High' in data else close
+        low = data['Low'].to_numpy(dtype=float) if 'Low' in data else close
+        last = close[-1]
+        counts = Counter(symbols=1)
+        
+        for window in (50, 200):
+            if len(close) >= window:
+                counts[f'ma{window}_count'] = 1
+                counts[f'above_ma{window}'] = int(last > close[-window:].mean())
+        
+        if len(close) > 1 and not np.isnan(close[-2]):
+            change = last / close[-2] - 1
+            counts['advancing'] = int(change > 0)
+            counts['declining'] = int(change < 0)
+            counts['unchanged'] = int(change == 0)
+            sector = self.sectors[symbol]
+            counts[('sector_count', sector)] = 1
+            counts[('sector_return', sector)] = change
+            counts[('sector_advancing', sector)] = int(change > 0)
+        
+        window = min(self.high_low_window, len(close))
+        counts['new_highs'] = int(high[-1] >= np.nanmax(high[-window:]))
+        counts['new_lows'] = int(low[-1] <= np.nanmin(low[-window:]))
+        
+        rsi = float(data['RSI'].iloc[-1]) if 'RSI' in data else np.nan
+        if not np.isnan(rsi):
+            counts['rsi_count'] = 1
+            counts['rsi_sum'] = rsi
+            label = next(label for label, lower in reversed(RSI_BUCKETS) if rsi >= lower)
+            counts[('rsi', label)] = 1
+        
+        return counts
+    
+    def snapshot(self) -> Dict:
+        """Current breadth aggregates"""
+        with self._lock:
+            totals = Counter(self._totals)
+            updated_at = self.updated_at
+        
+        def pct(part, whole):
+            return round(totals[part] / totals[whole] * 100, 2) if totals[whole] else None
+        
+        sectors = {}
+        for sector in dict.fromkeys(self.sectors.values()):
+            count = totals[('sector_count', sector)]
+            if count:
+                sectors[sector] = {
+                    'return': round(totals[('sector_return', sector)] / count * 100, 3),
+                    'advancing': int(totals[('sector_advancing', sector)]),
+                    'count': int(count)
+                }
+        
+        declining = totals['declining']
+        return {
+            'universe': int(totals['symbols']),
+            'above_50ma_pct': pct('above_ma50', 'ma50_count'),
+            'above_200ma_pct': pct('above_ma200', 'ma200_count'),
+            'advancing': int(totals['advancing']),
+            'declining': int(declining),
+            'unchanged': int(totals['unchanged']),
+            'advance_decline_ratio': round(totals['advancing'] / declining, 3) if declining else None,
+            'new_highs': int(totals['new_highs']),
+            'new_lows': int(totals['new_lows']),
+            'rsi_distribution': {label: int(totals[('rsi', label)]) for label, _ in RSI_BUCKETS},
+            'rsi_average': round(totals['rsi_sum'] / totals['rsi_count'], 2) if totals['rsi_count'] else None,
+            'rsi_overbought_pct': pct(('rsi', '>70'), 'rsi_count'),
+            'rsi_oversold_pct': pct(('rsi', '<30'), 'rsi_count'),
+            'sectors': sectors,
+            'timestamp': (updated_at or datetime.now()).isoformat()
+        }
+
+# Process-wide so every MarketDataService instance shares one set of running totals
+breadth_engine = BreadthEngine()
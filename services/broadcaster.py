@@ -0,0 +1,312 @@
+import asyncio
+import json
+import logging
+import struct
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+from utils.cache_manager import cache_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# What to do when a client's outbound queue is full
+SLOW_CLIENT_POLICIES = ('drop_oldest', 'disconnect')
+# Wire formats a client can ask for when it subscribes
+FORMATS = ('json', 'binary')
+
+# Binary frames are a little-endian base timestamp in epoch millis followed by one
+# record per symbol: kind, symbol id, millis after the base, then either the full
+# price (kind 0) or its change since the client's previous frame in PRICE_TICK units (kind 1,
+# only for prices of at least MIN_DELTA_PRICE)
+FRAME_HEADER = struct.Struct('<q')
+# Symbol ids are 32-bit: they are never reused, so a long-lived server can hand out more than 65535
+FULL_RECORD = struct.Struct('<BIId')
+DELTA_RECORD = struct.Struct('<BIIi')
+FULL, DELTA = 0, 1
+PRICE_TICK = 1e-4
+MAX_DELTA_TICKS = 2 ** 31 - 1
+# Below this a tick is too coarse a fraction of the price (sub-cent crypto would never move),
+# so such prices always go out in full records
+MIN_DELTA_PRICE = PRICE_TICK * 10_000
+
+class ClientSession:
+    """One websocket client: a bounded outbound queue drained by its own writer task
+    
+    A conflating session is not sent every update: the broadcaster keeps the
+    latest value per symbol and sends the session one frame per interval.
+    """
+
+    def __init__(self, websocket, client_id: str, queue_size: int, policy: str):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.policy = policy
+        self.conflate = False
+        self.format = 'json'
+        self.symbols: Set[str] = set()
+        # Symbols whose last price this binary session holds, so it can be sent deltas
+        self.keyed: Set[str] = set()
+        # Set when conflated frames were dropped; the next flush resends all the session's symbols
+        self.resync = False
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sent = 0
+        self.sent_bytes = 0
+        self.dropped = 0
+        self.closed = False
+        self._writer = asyncio.create_task(self._write_loop())
+    
+    def offer(self, payload: Union[str, bytes]) -> None:
+        """Queue a serialized message without waiting; a full queue is handled per the slow client policy"""
+        if self.closed:
+            return
+        if self.queue.full():
+            if self.policy == 'disconnect':
+                logger.warning(f"Disconnecting slow client {self.client_id}")
+                self.close()
+                return
+            if self.conflate:
+                # Queued frames carry deltas on top of each other, so all of them go and
+                # the next flush brings the client up to date with full prices instead
+                while not self.queue.empty():
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                self.dropped += 1
+                self.keyed.clear()
+                self.resync = True
+                return
+            # Newer prices supersede older ones, so the oldest queued message goes
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(payload)
+    
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                payload = await self.queue.get()
+                if isinstance(payload, bytes):
+                    await self.websocket.send_bytes(payload)
+                else:
+                    await self.websocket.send_text(payload)
+                self.sent += 1
+                self.sent_bytes += len(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending to client {self.client_id}: {e}")
+            self.closed = True
+    
+    def close(self) -> None:
+        self.closed = True
+        self._writer.cancel()
+        # Closing the socket ends the endpoint's receive loop, which unregisters the session
+        asyncio.ensure_future(self._close_socket())
+    
+    async def _close_socket(self) -> None:
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'client_id': self.client_id,
+            'symbols': sorted(self.symbols),
+            'conflate': self.conflate,
+            'format': self.format,
+            'queued': self.queue.qsize(),
+            'sent': self.sent,
+            'sent_bytes': self.sent_bytes,
+            'dropped': self.dropped
+        }
+
+class Broadcaster:
+    """Maps symbols to the client sessions subscribed to them and fans messages out
+    
+    publish serializes a message once per wire format and hands the same
+    payload to every subscriber's queue without awaiting any socket, so a slow
+    client only ever delays itself. Updates for conflating sessions are only
+    recorded as the symbol's latest value; a flush task encodes each symbol
+    changed since the last flush once and sends every conflating session one
+    frame with its symbols every interval.
+    """
+
+    def __init__(self, queue_size: Optional[int] = None, policy: Optional[str] = None,
+                 interval: Optional[float] = None):
+        config = cache_manager.config.get('fanout', {})
+        self.queue_size = queue_size or config.get('client_queue_size', 256)
+        self.policy = policy or config.get('slow_client_policy', 'drop_oldest')
+        if self.policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"Unknown slow client policy {self.policy!r}, expected one of {SLOW_CLIENT_POLICIES}")
+        # Conflated frames go out at the rate the UI refreshes
+        self.interval = interval or cache_manager.config.get('ui', {}).get('update_interval', 1000) / 1000
+        self.conflate_default = config.get('conflate', False)
+        self.subscribers: Dict[str, Set[ClientSession]] = {}
+        self.sessions: Set[ClientSession] = set()
+        # Stable ids for the binary format, never reassigned to another symbol
+        self.symbol_ids: Dict[str, int] = {}
+        # symbol -> (message, epoch millis) of the latest update not yet flushed to conflating sessions
+        self._latest: Dict[str, Tuple[Dict[str, Any], int]] = {}
+        # symbol -> (message, epoch millis) and price in ticks as of the last flush; the ticks are
+        # the base of the next frame's deltas
+        self._flushed: Dict[str, Tuple[Dict[str, Any], int]] = {}
+        self._flushed_ticks: Dict[str, int] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.flushes = 0
+    
+    def register(self, websocket, client_id: str) -> ClientSession:
+        """Start a session for an accepted websocket"""
+        session = ClientSession(websocket, client_id, self.queue_size, self.policy)
+        session.conflate = self.conflate_default
+        self.sessions.add(session)
+        return session
+    
+    def configure(self, session: ClientSession, conflate: Optional[bool] = None, format: Optional[str] = None) -> None:
+        """Apply the delivery options a client asked for when subscribing"""
+        if format is not None:
+            if format not in FORMATS:
+                raise ValueError(f"Unknown format {format!r}, expected one of {FORMATS}")
+            session.format = format
+        if conflate is not None:
+            session.conflate = bool(conflate)
+        # Deltas assume the client saw every flush since it was keyed
+        session.keyed.clear()
+        if session.conflate and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    def unregister(self, session: ClientSession) -> List[str]:
+        """End a session; returns the symbols nobody is subscribed to any more"""
+        idle = self.unsubscribe(session, list(session.symbols))
+        self.sessions.discard(session)
+        if not session.closed:
+            session.closed = True
+            session._writer.cancel()
+        return idle
+    
+    def subscribe(self, session: ClientSession, symbols: Iterable[str]) -> List[str]:
+        """Subscribe a session to symbols; returns the ones that had no subscribers before"""
+        new = []
+        for symbol in symbols:
+            subscribers = self.subscribers.setdefault(symbol, set())
+            if not subscribers:
+                new.append(symbol)
+            subscribers.add(session)
+            session.symbols.add(symbol)
+            self.symbol_ids.setdefault(symbol, len(self.symbol_ids))
+        return new
+    
+    def unsubscribe(self, session: ClientSession, symbols: Iterable[str]) -> List[str]:
+        """Unsubscribe a session from symbols; returns the ones left without subscribers"""
+        idle = []
+        for symbol in symbols:
+            session.symbols.discard(symbol)
+            session.keyed.discard(symbol)
+            subscribers = self.subscribers.get(symbol)
+            if subscribers is None:
+                continue
+            subscribers.discard(session)
+            if not subscribers:
+                del self.subscribers[symbol]
+                self._latest.pop(symbol, None)
+                self._flushed.pop(symbol, None)
+                self._flushed_ticks.pop(symbol, None)
+                idle.append(symbol)
+        return idle
+    
+    def publish(self, symbol: str, message: Dict[str, Any], timestamp_ms: Optional[int] = None) -> int:
+        """Send a message with a 'price' to the symbol's subscribers; returns how many it was queued or held for"""
+        subscribers = self.subscribers.get(symbol)
+        if not subscribers:
+            return 0
+        timestamp_ms = timestamp_ms if timestamp_ms is not None else int(time.time() * 1000)
+        payloads: Dict[str, Union[str, bytes]] = {}
+        for session in list(subscribers):
+            if session.conflate:
+                # Overwrites any update still waiting for the next flush
+                self._latest[symbol] = (message, timestamp_ms)
+                continue
+            payload = payloads.get(session.format)
+            if payload is None:
+                payload = payloads[session.format] = self._encode_one(symbol, message, timestamp_ms, session.format)
+            session.offer(payload)
+        self.published += 1
+        return len(subscribers)
+    
+    def _encode_one(self, symbol: str, message: Dict[str, Any], timestamp_ms: int, format: str) -> Union[str, bytes]:
+        if format == 'json':
+            return json.dumps(message)
+        return FRAME_HEADER.pack(timestamp_ms) + FULL_RECORD.pack(FULL, self.symbol_ids[symbol], 0, message['price'])
+    
+    async def _flush_loop(self) -> None:
+        while any(session.conflate for session in self.sessions):
+            await asyncio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing conflated updates: {e}")
+    
+    def flush(self) -> None:
+        """Send every conflating session one frame with its symbols' latest values since the last flush"""
+        latest, self._latest = self._latest, {}
+        if not latest and not any(session.resync for session in self.sessions):
+            return
+        base = min((timestamp_ms for _, timestamp_ms in latest.values()), default=0)
+        
+        # Each changed symbol is encoded once per form, then shared by every session that wants it
+        fragments: Dict[str, str] = {}
+        full: Dict[str, bytes] = {}
+        delta: Dict[str, bytes] = {}
+        for symbol, (message, timestamp_ms) in latest.items():
+            fragments[symbol] = json.dumps(message)
+            sid, offset, price = self.symbol_ids[symbol], timestamp_ms - base, message['price']
+            full[symbol] = FULL_RECORD.pack(FULL, sid, offset, price)
+            ticks = int(round(price / PRICE_TICK))
+            previous = self._flushed_ticks.get(symbol)
+            if previous is not None and price >= MIN_DELTA_PRICE and abs(ticks - previous) <= MAX_DELTA_TICKS:
+                delta[symbol] = DELTA_RECORD.pack(DELTA, sid, offset, ticks - previous)
+            self._flushed_ticks[symbol] = ticks
+        self._flushed.update(latest)
+        
+        header = FRAME_HEADER.pack(base)
+        for session in list(self.sessions):
+            if not session.conflate or session.closed:
+                continue
+            if session.resync:
+                self._resync(session)
+                continue
+            symbols = [symbol for symbol in session.symbols if symbol in latest]
+            if not symbols:
+                continue
+            if session.format == 'json':
+                session.offer('[' + ','.join(fragments[symbol] for symbol in symbols) + ']')
+            else:
+                records = [delta[symbol] if symbol in session.keyed and symbol in delta else full[symbol]
+                           for symbol in symbols]
+                session.keyed.update(symbols)
+                session.offer(header + b''.join(records))
+        self.flushes += 1
+    
+    def _resync(self, session: ClientSession) -> None:
+        """Send a session that lost frames the last flushed value of every symbol it follows"""
+        values = {symbol: self._flushed[symbol] for symbol in session.symbols if symbol in self._flushed}
+        session.resync = False
+        if not values:
+            return
+        if session.format == 'json':
+            session.offer('[' + ','.join(json.dumps(message) for message, _ in values.values()) + ']')
+            return
+        base = min(timestamp_ms for _, timestamp_ms in values.values())
+        records = [FULL_RECORD.pack(FULL, self.symbol_ids[symbol], timestamp_ms - base, message['price'])
+                   for symbol, (message, timestamp_ms) in values.items()]
+        session.keyed.update(values)
+        session.offer(FRAME_HEADER.pack(base) + b''.join(records))
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'clients': len(self.sessions),
+            'conflating': sum(session.conflate for session in self.sessions),
+            'symbols': len(self.subscribers),
+            'published': self.published,
+            'flushes': self.flushes,
+            'sent_bytes': sum(session.sent_bytes for session in self.sessions),
+            'dropped': sum(session.dropped for session in self.sessions)
+        }
@@ -0,0 +1,491 @@
+import asyncio
+import os
+import time
+import zlib
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+import httpx
+import numpy as np
+import pandas as pd
+import yfinance as yf
+import yaml
+from services.bar_store import BarStore
+from services.executor import run_blocking
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PERIOD_OFFSETS = {
+    '1d': pd.DateOffset(days=1),
+    '5d': pd.DateOffset(days=5),
+    '60d': pd.DateOffset(days=60),
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10)
+}
+
+def _load_config() -> dict:
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f)
+
+class MarketDataProvider(ABC):
+    """Source of OHLCV bars and last-trade quotes for batches of symbols"""
+    
+    name = 'base'
+    # Whether fetched bars are real market data worth persisting in the bar store
+    persist = True
+    
+    def __init__(self, config: Optional[dict] = None):
+        self.config = config or {}
+        # Upper bound on requests this provider has in flight from async callers
+        self.max_concurrency = int(self.config.get('max_concurrency', 8))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    @property
+    def limiter(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+    
+    @abstractmethod
+    def get_bars(self, symbols: List[str], period: Optional[str] = '1y', interval: str = '1d',
+                 start: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+        """Get OHLCV bars per symbol for a period, or from start if given"""
+    
+    @abstractmethod
+    def get_quotes(self, symbols: List[str]) -> Dict[str, float]:
+        """Get the latest traded price per symbol"""
+    
+    async def fetch_bars(self, symbols: List[str], period: Optional[str] = '1y', interval: str = '1d',
+                         start: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+        """Async variant of get_bars, run on the worker pool"""
+        async with self.limiter:
+            return await run_blocking(self.get_bars, symbols, period, interval, start)
+    
+    async def fetch_quotes(self, symbols: List[str]) -> Dict[str, float]:
+        """Async variant of get_quotes, run on the worker pool"""
+        async with self.limiter:
+            return await run_blocking(self.get_quotes, symbols)
+    
+    def get_snapshot(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Get price, previous close, % change and volume per symbol from one batched daily bar request"""
+        return self._snapshot_from_bars(self.get_bars(symbols, period='5d', interval='1d'))
+    
+    async def fetch_snapshot(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Async variant of get_snapshot"""
+        return self._snapshot_from_bars(await self.fetch_bars(symbols, period='5d', interval='1d'))
+    
+    @staticmethod
+    def _snapshot_from_bars(frames: Dict[str, pd.DataFrame]) -> Dict[str, Dict]:
+        # Today's bar is still forming during the session, so its close is the latest price
+        snapshot = {}
+        for symbol, data in frames.items():
+            try:
+                close = data['Close'].dropna()
+                if close.empty:
+                    continue
+                price = float(close.iloc[-1])
+                previous_close = float(close.iloc[-2]) if len(close) > 1 else price
+                volume = data['Volume'].iloc[-1] if 'Volume' in data else 0.0
+                snapshot[symbol] = {
+                    'price': price,
+                    'previous_close': previous_close,
+                    'change': (price / previous_close - 1) * 100 if previous_close else 0.0,
+                    'volume': float(volume) if pd.notna(volume) else 0.0,
+                    'timestamp': close.index[-1]
+                }
+            except Exception as e:
+                logger.error(f"Error building quote for {symbol}: {e}")
+        return snapshot
+    
+    def get_market_caps(self, symbols: List[str]) -> Dict[str, float]:
+        """Get market capitalization per symbol where the provider knows it"""
+        return {}
+    
+    def get_news(self, symbols: List[str], limit: int = 20) -> List[Dict]:
+        """Get recent news items with headline, summary, url and datetime (epoch seconds)"""
+        return []
+    
+    async def aclose(self) -> None:
+        """Release pooled connections"""
+
+class YFinanceProvider(MarketDataProvider):
+    """Yahoo Finance bars and quotes through grouped yf.download requests"""
+    
+    name = 'yfinance'
+    
+    CHART_URL = 'https://query1.finance.yahoo.com/v8/finance/chart/{symbol}'
+    # yf.download returns these intervals with naive, date-only indexes
+    DAILY_INTERVALS = ('1d', '5d', '1wk', '1mo', '3mo')
+    
+    def __init__(self, config: Optional[dict] = None):
+        super().__init__(config)
+        self.timeout = float(self.config.get('timeout', 10))
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _download(self, symbols: List[str], **kwargs) -> Dict[str, pd.DataFrame]:
+        """Download bars for several symbols in one grouped request"""
+        frames = {}
+        if not symbols:
+            return frames
+        
+        try:
+            data = yf.download(
+                symbols,
+                group_by='ticker',
+                auto_adjust=True,
+                threads=True,
+                progress=False,
+                **kwargs
+            )
+        except Exception as e:
+            logger.error(f"Error downloading batch for {len(symbols)} symbols: {e}")
+            return frames
+        
+        if data is None or data.empty:
+            return frames
+        
+        for symbol in symbols:
+            try:
+                if isinstance(data.columns, pd.MultiIndex):
+                    if symbol not in data.columns.get_level_values(0):
+                        continue
+                    frame = data[symbol]
+                elif len(symbols) == 1:
+                    frame = data
+                else:
+                    continue
+                
+                frame = frame.dropna(how='all')
+                if not frame.empty:
+                    frames[symbol] = frame.copy()
+            except Exception as e:
+                logger.error(f"Error splitting batch data for {symbol}: {e}")
+        
+        return frames
+    
+    def get_bars(self, symbols: List[str], period: Optional[str] = '1y', interval: str = '1d',
+                 start: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+        if start is not None:
+            return self._download(symbols, start=start, interval=interval)
+        return self._download(symbols, period=period, interval=interval)
+    
+    def get_quotes(self, symbols: List[str]) -> Dict[str, float]:
+        quotes = {}
+        for symbol, data in self._download(symbols, period='1d', interval='1m').items():
+            try:
+                close = data['Close'].dropna()
+                if not close.empty:
+                    quotes[symbol] = float(close.iloc[-1])
+            except Exception as e:
+                logger.error(f"Error reading quote for {symbol}: {e}")
+        return quotes
+
+    def get_market_caps(self, symbols: List[str]) -> Dict[str, float]:
+        caps = {}
+        for symbol in symbols:
+            try:
+                cap = yf.Ticker(symbol).fast_info['marketCap']
+                if cap:
+                    caps[symbol] = float(cap)
+            except Exception as e:
+                logger.debug(f"No market cap for {symbol}: {e}")
+        return caps
+    
+    def get_news(self, symbols: List[str], limit: int = 20) -> List[Dict]:
+        items = {}
+        for symbol in symbols:
+            try:
+                for raw in yf.Ticker(symbol).news or []:
+                    item = self._parse_news(raw)
+                    if item is not None:
+                        items.setdefault(item['url'] or item['headline'], item)
+            except Exception as e:
+                logger.error(f"Error fetching news for {symbol}: {e}")
+        return sorted(items.values(), key=lambda item: item['datetime'], reverse=True)[:limit]
+    
+    @staticmethod
+    def _parse_news(raw: dict) -> Optional[Dict]:
+        # Newer yfinance nests articles under 'content' with ISO dates; older releases are flat
+        content = raw.get('content', raw)
+        headline = content.get('title')
+        if not headline:
+            return None
+        if 'pubDate' in content:
+            published = int(pd.Timestamp(content['pubDate']).timestamp())
+        else:
+            published = int(content.get('providerPublishTime', 0))
+        url = (content.get('canonicalUrl') or {}).get('url') or content.get('link', '')
+        return {
+            'headline': headline,
+            'summary': content.get('summary') or content.get('description') or '',
+            'url': url,
+            'datetime': published,
+            'source': (content.get('provider') or {}).get('displayName') or content.get('publisher', '')
+        }
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client shared by every async request"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                headers={'User-Agent': 'Mozilla/5.0'},
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+        return self._client
+    
+    async def _fetch_chart(self, symbol: str, params: dict) -> Optional[dict]:
+        """Fetch one symbol's chart payload from the Yahoo chart API"""
+        async with self.limiter:
+            response = await self.client.get(self.CHART_URL.format(symbol=symbol), params=params)
+        response.raise_for_status()
+        results = response.json().get('chart', {}).get('result') or []
+        return results[0] if results else None
+    
+    def _parse_chart(self, result: dict, interval: str) -> Optional[pd.DataFrame]:
+        """Convert a chart payload to an adjusted OHLCV frame shaped like yf.download output"""
+        timestamps = result.get('timestamp')
+        quote = (result.get('indicators', {}).get('quote') or [{}])[0]
+        if not timestamps or not quote:
+            return None
+        
+        index = pd.to_datetime(timestamps, unit='s', utc=True)
+        timezone = result.get('meta', {}).get('exchangeTimezoneName')
+        if timezone:
+            index = index.tz_convert(timezone)
+        if interval in self.DAILY_INTERVALS:
+            index = index.tz_localize(None).normalize()
+        
+        frame = pd.DataFrame({
+            'Open': quote.get('open'),
+            'High': quote.get('high'),
+            'Low': quote.get('low'),
+            'Close': quote.get('close'),
+            'Volume': quote.get('volume')
+        }, index=index, dtype=float)
+        
+        # Match auto_adjust=True by scaling prices to the adjusted close
+        adjclose = (result.get('indicators', {}).get('adjclose') or [{}])[0].get('adjclose')
+        if adjclose:
+            ratio = np.asarray(adjclose, dtype=float) / frame['Close'].to_numpy()
+            for column in ('Open', 'High', 'Low'):
+                frame[column] = frame[column] * ratio
+            frame['Close'] = np.asarray(adjclose, dtype=float)
+        
+        frame = frame.dropna(subset=['Open', 'High', 'Low', 'Close'], how='all')
+        frame = frame[~frame.index.duplicated(keep='last')]
+        return frame if not frame.empty else None
+    
+    async def _fetch_symbol_bars(self, symbol: str, params: dict, interval: str) -> Optional[pd.DataFrame]:
+        try:
+            result = await self._fetch_chart(symbol, params)
+            return self._parse_chart(result, interval) if result else None
+        except Exception as e:
+            logger.error(f"Error fetching bars for {symbol}: {e}")
+            return None
+    
+    async def fetch_bars(self, symbols: List[str], period: Optional[str] = '1y', interval: str = '1d',
+                         start: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+        params = {'interval': interval, 'includePrePost': 'false', 'events': 'div,splits'}
+        if start is not None:
+            start = pd.Timestamp(start)
+            if start.tz is None:
+                start = start.tz_localize('UTC')
+            params['period1'] = int(start.timestamp())
+            params['period2'] = int(time.time())
+        else:
+            params['range'] = period
+        
+        frames = await asyncio.gather(*(self._fetch_symbol_bars(symbol, params, interval) for symbol in symbols))
+        return {symbol: frame for symbol, frame in zip(symbols, frames) if frame is not None}
+    
+    async def _fetch_symbol_quote(self, symbol: str) -> Optional[float]:
+        try:
+            result = await self._fetch_chart(symbol, {'range': '1d', 'interval': '1d'})
+            price = (result or {}).get('meta', {}).get('regularMarketPrice')
+            return float(price) if price is not None else None
+        except Exception as e:
+            logger.error(f"Error fetching quote for {symbol}: {e}")
+            return None
+    
+    async def fetch_quotes(self, symbols: List[str]) -> Dict[str, float]:
+        prices = await asyncio.gather(*(self._fetch_symbol_quote(symbol) for symbol in symbols))
+        return {symbol: price for symbol, price in zip(symbols, prices) if price is not None}
+    
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+class ReplayProvider(MarketDataProvider):
+    """Offline provider replaying recorded bars, or deterministic synthetic ones, on a sped-up clock
+    
+    Recordings are read from a bar store directory ({path}/{interval}/{symbol}.arrow).
+    Symbols without a recording get a random walk seeded from the symbol name, so
+    every run sees the same prices. Recorded timestamps are shifted by whole days so
+    that bar number warmup_bars lands on the day the provider was created; after that
+    one wall-clock second advances the replay by `speed` seconds.
+    """
+    
+    name = 'replay'
+    persist = False
+    
+    INTERVAL_FREQ = {
+        '1m': 'min', '2m': '2min', '5m': '5min', '15m': '15min', '30m': '30min',
+        '60m': 'h', '1h': 'h', '1d': 'B', '1wk': 'W-FRI'
+    }
+    
+    def __init__(self, config: Optional[dict] = None):
+        super().__init__(config)
+        path = self.config.get('path', 'data/replay')
+        self.recordings = BarStore(root=path)
+        self.speed = float(self.config.get('speed', 60))
+        self.warmup_bars = int(self.config.get('warmup_bars', 252))
+        self.synthetic_bars = int(self.config.get('synthetic_bars', 1000))
+        self.latency = float(self.config.get('latency_ms', 0)) / 1000
+        
+        self.started_at = pd.Timestamp.now(tz='UTC')
+        self._started_monotonic = time.monotonic()
+        self._series: Dict[tuple, pd.DataFrame] = {}
+    
+    def now(self) -> pd.Timestamp:
+        """Current position of the replay clock"""
+        elapsed = (time.monotonic() - self._started_monotonic) * self.speed
+        return self.started_at + pd.Timedelta(seconds=elapsed)
+    
+    def _synthetic(self, symbol: str, interval: str) -> pd.DataFrame:
+        """Generate a deterministic random walk for a symbol"""
+        rng = np.random.default_rng(zlib.crc32(f"{symbol}:{interval}".encode()))
+        n = self.synthetic_bars
+        freq = self.INTERVAL_FREQ.get(interval, 'B')
+        index = pd.date_range('2000-01-03', periods=n, freq=freq, tz='UTC')
+        
+        base = rng.uniform(20, 500)
+        close = base * np.exp(np.cumsum(rng.normal(0.0003, 0.015, n)))
+        open_ = np.concatenate(([base], close[:-1]))
+        spread = np.abs(rng.normal(0, 0.008, n)) * close
+        
+        return pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) + spread,
+            'Low': np.minimum(open_, close) - spread,
+            'Close': close,
+            'Volume': rng.integers(100_000, 10_000_000, n).astype(float)
+        }, index=index)
+    
+    def _get_series(self, symbol: str, interval: str) -> pd.DataFrame:
+        """Get the full replay series for a symbol, anchored to the replay clock"""
+        key = (symbol, interval)
+        if key not in self._series:
+            data = self.recordings.read(symbol, interval)
+            if data is None or data.empty or not isinstance(data.index, pd.DatetimeIndex):
+                data = self._synthetic(symbol, interval)
+            if data.index.tz is None:
+                data = data.tz_localize('UTC')
+            
+            anchor = data.index[min(self.warmup_bars, len(data) - 1)]
+            shift = self.started_at.normalize() - anchor.tz_convert('UTC').normalize()
+            data = data.copy()
+            data.index = data.index + pd.Timedelta(days=shift.days)
+            self._series[key] = data
+        return self._series[key]
+    
+    def _bars(self, symbols: List[str], period: Optional[str], interval: str,
+              start: Optional[pd.Timestamp]) -> Dict[str, pd.DataFrame]:
+        now = self.now()
+        frames = {}
+        
+        for symbol in symbols:
+            try:
+                data = self._get_series(symbol, interval)
+                data = data[data.index <= now]
+                if start is not None:
+                    data = data[data.index >= start]
+                elif period in PERIOD_OFFSETS:
+                    data = data[data.index >= now - PERIOD_OFFSETS[period]]
+                if not data.empty:
+                    frames[symbol] = data.copy()
+            except Exception as e:
+                logger.error(f"Error replaying bars for {symbol}: {e}")
+        
+        return frames
+    
+    def _quotes(self, symbols: List[str]) -> Dict[str, float]:
+        now = self.now()
+        quotes = {}
+        
+        for symbol in symbols:
+            try:
+                close = self._get_series(symbol, '1d')['Close']
+                close = close[close.index <= now]
+                if not close.empty:
+                    quotes[symbol] = float(close.iloc[-1])
+            except Exception as e:
+                logger.error(f"Error replaying quote for {symbol}: {e}")
+        
+        return quotes
+    
+    def get_bars(self, symbols: List[str], period: Optional[str] = '1y', interval: str = '1d',
+                 start: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+        # Optional artificial latency stands in for the network round trip
+        if self.latency:
+            time.sleep(self.latency)
+        return self._bars(symbols, period, interval, start)
+    
+    def get_quotes(self, symbols: List[str]) -> Dict[str, float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._quotes(symbols)
+    
+    async def fetch_bars(self, symbols: List[str], period: Optional[str] = '1y', interval: str = '1d',
+                         start: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._bars(symbols, period, interval, start)
+    
+    async def fetch_quotes(self, symbols: List[str]) -> Dict[str, float]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._quotes(symbols)
+
+PROVIDERS = {
+    'yfinance': YFinanceProvider,
+    'replay': ReplayProvider
+}
+
+_provider: Optional[MarketDataProvider] = None
+
+def create_provider(name: Optional[str] = None, config: Optional[dict] = None) -> MarketDataProvider:
+    """Create a provider by name, defaulting to data_provider.name in config.yaml"""
+    config = config or _load_config()
+    provider_config = config.get('data_provider', {})
+    
+    if name is None:
+        name = provider_config.get('name')
+    if name is None:
+        # Fall back to the first configured market data source we can serve
+        sources = config.get('apis', {}).get('market_data', [])
+        name = next((source for source in sources if source in PROVIDERS), 'yfinance')
+    
+    if name not in PROVIDERS:
+        logger.warning(f"Unknown market data provider '{name}', using yfinance")
+        name = 'yfinance'
+    
+    return PROVIDERS[name](provider_config.get(name, {}))
+
+def get_provider() -> MarketDataProvider:
+    """Get the process-wide provider selected in config.yaml"""
+    global _provider
+    if _provider is None:
+        _provider = create_provider()
+    return _provider
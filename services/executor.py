@@ -0,0 +1,38 @@
+import asyncio
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+import yaml
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _load_config() -> dict:
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f)
+
+_worker = threading.local()
+
+def _mark_worker() -> None:
+    _worker.active = True
+
+# Bounded pool for blocking work (sync provider calls, indicator math, model
+# inference) so it never runs on, or starves, the event loop
+executor = ThreadPoolExecutor(
+    max_workers=_load_config().get('optimization', {}).get('workers', 4),
+    thread_name_prefix='quantum-worker',
+    initializer=_mark_worker
+)
+
+def on_worker_thread() -> bool:
+    """Whether the caller is running on the shared worker pool"""
+    return getattr(_worker, 'active', False)
+
+async def run_blocking(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking callable on the shared worker pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
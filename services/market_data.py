@@ -1,144 +1,730 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from datetime import datetime, timedelta
 import logging
-from functools import lru_cache
 import asyncio
+import time
+from utils.cache_manager import bar_cache, cache_manager
+from utils.compact_bars import CompactBars
+from utils.single_flight import SingleFlight
+from services.executor import on_worker_thread, run_blocking
+from utils.indicators import (
+    DEFAULT_INDICATORS, MACD_FAST, MACD_SIGNAL, MACD_SLOW, PANEL_INDICATORS,
+    IndicatorPanel, compute_panel, indicator_engine
+)
+from utils.patterns import pattern_engine
+from services.bar_aggregator import bar_aggregator, interval_seconds
+from services.bar_store import BarStore, align_tz, bar_store
+from services.breadth import breadth_engine
+from services.timeframes import TimeframeEngine
+from services.quote_snapshot import page_quote, quote_snapshot
+from services.shared_segment import get_shared_segment
+from services.quote_table import quote_table
+from services.websocket import DataStreamManager
+from services.data_providers import MarketDataProvider, PERIOD_OFFSETS, get_provider
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Process-wide so concurrent fetches are deduplicated across service instances
+_flights = SingleFlight()
+
 class MarketDataService:
-    def __init__(self):
-        self.price_cache = {}
-        self.data_cache = {}
+    # Rows of history needed before a bar for every windowed indicator to be valid
+    INDICATOR_WARMUP = 50
+    INDICATOR_COLUMNS = list(DEFAULT_INDICATORS)
+    
+    # Slack allowed between a period's start and the first stored bar (weekends, holidays)
+    STORE_COVERAGE_SLACK = pd.Timedelta(days=4)
+    
+    def __init__(self, incremental: bool = True, provider: Optional[MarketDataProvider] = None,
+                 compact: Optional[bool] = None):
+        # Bars and quotes come from the provider configured in config.yaml
+        self.provider = provider or get_provider()
+        # Historical bars live in the process-wide cache so every instance shares them
+        self.bar_cache = bar_cache
+        # Bars persisted on disk survive restarts and are shared between processes
+        self.bar_store = bar_store if self.provider.persist else BarStore(enabled=False)
+        # Refresh expired entries by fetching only bars after the last cached one
+        self.incremental = incremental
+        # Cache bars as float32 CompactBars instead of float64 frames, roughly halving their memory
+        if compact is None:
+            compact = cache_manager.config.get('cache', {}).get('compact_bars', False)
+        self.compact = compact
+        # Coarser intraday timeframes are rolled up from the finest cached bars
+        self.timeframes = TimeframeEngine(self)
+        # Symbols every refresh of the shared quote snapshot covers
+        self.watchlists = cache_manager.config.get('watchlists', {})
+        # Live trades, started on the first subscription
+        self.stream: Optional[DataStreamManager] = None
+        self.stream_callback: Optional[Callable] = None
+        self._stream_task: Optional[asyncio.Task] = None
         
-    @lru_cache(maxsize=100)
-    def get_historical_data(self, symbol: str, period: str = '1y') -> pd.DataFrame:
+    def get_historical_data(self, symbol: str, period: str = '1y', interval: str = '1d') -> pd.DataFrame:
         """Get historical market data with caching"""
         try:
-            stock = yf.Ticker(symbol)
-            data = stock.history(period=period)
-            
-            if data.empty:
-                return pd.DataFrame()
-            
-            # Calculate technical indicators
-            data = self._add_technical_indicators(data)
-            
-            # Cache the data
-            self.data_cache[symbol] = {
-                'data': data,
-                'timestamp': datetime.now()
-            }
-            
-            return data
-            
+            data = self.get_historical_data_batch([symbol], period, interval).get(symbol)
+            return data if data is not None else pd.DataFrame()
         except Exception as e:
             logger.error(f"Error fetching historical data for {symbol}: {e}")
             return pd.DataFrame()
     
-    def _add_technical_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
+    def _add_technical_indicators(self, data: pd.DataFrame, symbol: Optional[str] = None) -> pd.DataFrame:
         """Add technical indicators to the dataset"""
-        # Moving averages
-        data['SMA_20'] = data['Close'].rolling(window=20).mean()
-        data['SMA_50'] = data['Close'].rolling(window=50).mean()
-        data['EMA_12'] = data['Close'].ewm(span=12, adjust=False).mean()
-        data['EMA_26'] = data['Close'].ewm(span=26, adjust=False).mean()
-        
-        # MACD
-        data['MACD'] = data['EMA_12'] - data['EMA_26']
-        data['Signal_Line'] = data['MACD'].ewm(span=9, adjust=False).mean()
-        
-        # RSI
-        delta = data['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        data['RSI'] = 100 - (100 / (1 + rs))
-        
-        # Bollinger Bands
-        data['BB_middle'] = data['Close'].rolling(window=20).mean()
-        std = data['Close'].rolling(window=20).std()
-        data['BB_upper'] = data['BB_middle'] + (std * 2)
-        data['BB_lower'] = data['BB_middle'] - (std * 2)
-        
-        # Volume indicators
-        data['Volume_SMA'] = data['Volume'].rolling(window=20).mean()
-        data['Volume_Ratio'] = data['Volume'] / data['Volume_SMA']
-        
-        # Momentum indicators
-        data['ROC'] = data['Close'].pct_change(periods=12) * 100
-        data['MOM'] = data['Close'].diff(periods=10)
-        
-        # Volatility
-        data['ATR'] = self._calculate_atr(data)
-        
-        # Fill NaN values
-        data = data.fillna(method='ffill').fillna(method='bfill')
+        data = indicator_engine.add_indicators(data, self.INDICATOR_COLUMNS, symbol)
+        
+        # Carry values over gaps; never backfill, which would leak later values into earlier bars
+        data = data.ffill()
+        
+        return data
+    
+    def _get_previous_bars(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+        """Get expired cached bars or stored bars that only need their tail refreshed"""
+        if not self.incremental:
+            return None
+        
+        # Indicator updates continue from the cached values, so work on them in float64
+        previous = self._as_frame(self.bar_cache.get_stale((symbol, period, interval)), dtype=float)
+        if previous is not None and not previous.empty:
+            return previous
+        
+        return self._load_from_store(symbol, period, interval)
+    
+    def _load_from_store(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+        """Load stored bars covering the requested period, with indicators"""
+        stored = self.bar_store.read(symbol, interval)
+        if stored is None or len(stored) < 2 or not isinstance(stored.index, pd.DatetimeIndex):
+            return None
+        
+        now = pd.Timestamp.now(tz=stored.index.tz)
+        if period == 'ytd':
+            start = now.normalize().replace(month=1, day=1)
+        elif period in PERIOD_OFFSETS:
+            start = now - PERIOD_OFFSETS[period]
+        else:
+            start = None
+        
+        if start is not None:
+            # Stored history that starts too late cannot serve the period, fetch it in full
+            if stored.index[0] > start + self.STORE_COVERAGE_SLACK:
+                return None
+            stored = stored[stored.index >= start]
+            if len(stored) < 2:
+                return None
+        
+        return self._add_technical_indicators(stored, symbol)
+    
+    def _merge_new_bars(self, cached: pd.DataFrame, new_bars: pd.DataFrame, period: str) -> pd.DataFrame:
+        """Merge freshly fetched bars into a cached frame and update indicators on the tail"""
+        if new_bars is None or new_bars.empty:
+            return cached
+        
+        new_bars = align_tz(new_bars, cached.index)
+        
+        # New bars replace any cached rows they overlap, e.g. a bar that was still forming
+        start = int(cached.index.searchsorted(new_bars.index[0]))
+        data = pd.concat([cached.iloc[:start], new_bars])
+        data = data[~data.index.duplicated(keep='last')]
+        data = self._update_technical_indicators(data, start)
+        
+        # Slide the window forward so the frame keeps covering the requested period
+        if period not in ('max', 'ytd') and len(cached) > 1:
+            span = cached.index[-1] - cached.index[0]
+            data = data[data.index >= data.index[-1] - span]
         
         return data
     
-    def _calculate_atr(self, data: pd.DataFrame, period: int = 14) -> pd.Series:
-        """Calculate Average True Range"""
-        high = data['High']
-        low = data['Low']
-        close = data['Close']
+    def _update_technical_indicators(self, data: pd.DataFrame, start: int) -> pd.DataFrame:
+        """Recompute indicators only for rows from position start onwards"""
+        if start <= 0 or not set(self.INDICATOR_COLUMNS).issubset(data.columns):
+            return self._add_technical_indicators(data)
+        
+        prev = data.iloc[start - 1]
+        if pd.isna(prev[['EMA_12', 'EMA_26', 'Signal_Line']]).any():
+            return self._add_technical_indicators(data)
         
-        tr1 = high - low
-        tr2 = abs(high - close.shift())
-        tr3 = abs(low - close.shift())
+        # Windowed indicators only look back INDICATOR_WARMUP rows
+        lookback = max(start - self.INDICATOR_WARMUP, 0)
+        raw_columns = [c for c in data.columns if c not in self.INDICATOR_COLUMNS]
+        tail = self._add_technical_indicators(data.iloc[lookback:][raw_columns].copy())
+        tail = tail.iloc[start - lookback:].copy()
         
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        atr = tr.rolling(window=period).mean()
+        # Exponential averages depend on the full history, so continue them from the last cached values
+        close = tail['Close'].to_numpy(dtype=float)
+        tail['EMA_12'] = self._extend_ema(prev['EMA_12'], close, MACD_FAST)
+        tail['EMA_26'] = self._extend_ema(prev['EMA_26'], close, MACD_SLOW)
+        tail['MACD'] = tail['EMA_12'] - tail['EMA_26']
+        tail['Signal_Line'] = self._extend_ema(prev['Signal_Line'], tail['MACD'].to_numpy(), MACD_SIGNAL)
         
-        return atr
+        data = data.copy()
+        columns = data.columns.get_indexer(self.INDICATOR_COLUMNS)
+        data.iloc[start:, columns] = tail[self.INDICATOR_COLUMNS].to_numpy()
+        data.iloc[start - 1:, columns] = data.iloc[start - 1:, columns].ffill()
+        
+        return data
+    
+    @staticmethod
+    def _extend_ema(prev: float, values: np.ndarray, span: int) -> np.ndarray:
+        """Continue an adjust=False EMA from its previous value over new observations"""
+        alpha = 2 / (span + 1)
+        out = np.empty(len(values))
+        ema = prev
+        for i, value in enumerate(values):
+            ema = alpha * value + (1 - alpha) * ema
+            out[i] = ema
+        return out
     
     def get_real_time_price(self, symbol: str) -> Optional[float]:
         """Get real-time price from cache"""
-        try:
-            # Check cache first
-            if symbol in self.price_cache:
-                cache_entry = self.price_cache[symbol]
-                if datetime.now() - cache_entry['timestamp'] < timedelta(seconds=5):
-                    return cache_entry['price']
-            
-            # Get latest price from yfinance
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period='1d', interval='1m')
+        return self.get_real_time_prices([symbol]).get(symbol)
+    
+    def get_historical_data_batch(self, symbols: List[str], period: str = '1y',
+                                  interval: str = '1d') -> Dict[str, pd.DataFrame]:
+        """Get historical market data for several symbols, downloading cache misses together"""
+        result, missing = self._split_cached(symbols, period, interval)
+        
+        if missing:
+            # Symbols another caller is already fetching are waited on, not refetched, except that
+            # pool threads never wait on an async fetch that may itself need a pool thread
+            fetched = _flights.do_batch(
+                [(symbol, period, interval) for symbol in missing],
+                lambda keys: self._keyed(self._fetch_historical([key[0] for key in keys], period, interval),
+                                         period, interval),
+                wait_for_async=not on_worker_thread()
+            )
+            result.update(self._unkeyed(fetched))
+        
+        return result
+    
+    async def get_historical_data_batch_async(self, symbols: List[str], period: str = '1y',
+                                              interval: str = '1d') -> Dict[str, pd.DataFrame]:
+        """Async variant of get_historical_data_batch that never blocks the event loop"""
+        result, missing = self._split_cached(symbols, period, interval)
+        
+        if missing:
+            async def fetch(keys):
+                fetched = await self._fetch_historical_async([key[0] for key in keys], period, interval)
+                return self._keyed(fetched, period, interval)
             
-            if data.empty:
+            fetched = await _flights.do_batch_async([(symbol, period, interval) for symbol in missing], fetch)
+            result.update(self._unkeyed(fetched))
+        
+        return result
+    
+    async def get_historical_data_async(self, symbol: str, period: str = '1y', interval: str = '1d') -> pd.DataFrame:
+        """Async variant of get_historical_data"""
+        try:
+            data = (await self.get_historical_data_batch_async([symbol], period, interval)).get(symbol)
+            return data if data is not None else pd.DataFrame()
+        except Exception as e:
+            logger.error(f"Error fetching historical data for {symbol}: {e}")
+            return pd.DataFrame()
+    
+    def _split_cached(self, symbols: List[str], period: str, interval: str):
+        """Split symbols into fresh cached frames and cache misses"""
+        result = {}
+        missing = []
+        for symbol in symbols:
+            cached = self._as_frame(self.bar_cache.get((symbol, period, interval)))
+            if cached is None:
+                cached = self._get_shared_bars(symbol, period, interval)
+            if cached is None:
+                cached = self._get_streamed_bars(symbol, period, interval)
+            if cached is not None:
+                result[symbol] = cached
+            else:
+                missing.append(symbol)
+        return result, missing
+    
+    def _cache_bars(self, key, data: pd.DataFrame, ttl: Optional[float] = None):
+        """Cache a bar frame, packed as CompactBars when compact caching is on"""
+        if self.compact:
+            try:
+                data = CompactBars.from_frame(data)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Caching {key[0]} bars uncompacted: {e}")
+        self.bar_cache.set(key, data, ttl)
+    
+    def _get_shared_bars(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+        """Bars with indicators from the ingest process's shared segment, if it publishes this period and interval"""
+        segment = get_shared_segment()
+        if segment is None:
+            return None
+        bars = segment.bars_for(symbol, period, interval)
+        if bars is None:
+            return None
+        
+        try:
+            key = (symbol, period, interval)
+            previous = self._as_frame(self.bar_cache.get_stale(key), dtype=float)
+            if previous is not None and not previous.empty and previous.index[-1] >= bars.index[0]:
+                # Only the bars from the last cached one onwards need indicators
+                data = self._merge_new_bars(previous, bars[bars.index >= previous.index[-1]], period)
+            else:
+                data = self._add_technical_indicators(bars, symbol)
+            # Cached only until the next publish, which is when the shared bars can change
+            self._cache_bars(key, data, cache_manager.config.get('shared_memory', {}).get('refresh', 5))
+            return data
+        except Exception as e:
+            logger.error(f"Error reading shared bars for {symbol}: {e}")
+            return None
+    
+    def _get_streamed_bars(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+        """Expired cached bars brought up to date with the bars closed from streamed trades since
+        
+        Only used when the live bars hold every bar after the last cached one;
+        otherwise the history is refreshed from the provider as usual.
+        """
+        if interval not in bar_aggregator.intervals or symbol not in bar_aggregator:
+            return None
+        key = (symbol, period, interval)
+        previous = self._as_frame(self.bar_cache.get_stale(key), dtype=float)
+        if previous is None or previous.empty or previous.index.tz is None:
+            return None
+        
+        try:
+            last = previous.index[-1]
+            if not bar_aggregator.complete_since(symbol, interval, last):
                 return None
+            # The last cached bar may still have been forming, so it is replaced too
+            data = self._merge_new_bars(previous, bar_aggregator.get_bars(symbol, interval, since=last), period)
+            # Cached until the forming bar closes, when there is a new bar to merge
+            next_close = bar_aggregator.next_close(symbol, interval)
+            ttl = max(next_close - time.time(), 0.5) if next_close is not None else bar_aggregator.seconds[interval]
+            self._cache_bars(key, data, ttl)
+            return data
+        except Exception as e:
+            logger.error(f"Error merging streamed bars for {symbol}: {e}")
+            return None
+    
+    @staticmethod
+    def _as_frame(cached, dtype=None) -> Optional[pd.DataFrame]:
+        """Cached bars as a DataFrame; CompactBars come back as a zero-copy float32 view unless dtype is given"""
+        return cached.to_frame(dtype) if isinstance(cached, CompactBars) else cached
+    
+    @staticmethod
+    def _keyed(frames: Dict[str, pd.DataFrame], period: str, interval: str) -> Dict:
+        return {(symbol, period, interval): data for symbol, data in frames.items()}
+    
+    @staticmethod
+    def _unkeyed(fetched: Dict) -> Dict[str, pd.DataFrame]:
+        return {key[0]: data for key, data in fetched.items() if data is not None}
+    
+    def _fetch_historical(self, symbols: List[str], period: str, interval: str) -> Dict[str, pd.DataFrame]:
+        """Fetch bars for cache misses, refreshing known history incrementally"""
+        stale, missing = self._find_previous_bars(symbols, period, interval)
+        
+        updates = {}
+        if stale:
+            updates = self.provider.get_bars(list(stale), interval=interval, start=self._refresh_start(stale))
+        frames = self.provider.get_bars(missing, period=period, interval=interval) if missing else {}
+        
+        return self._apply_fetched(period, interval, stale, updates, frames)
+    
+    async def _fetch_historical_async(self, symbols: List[str], period: str,
+                                      interval: str) -> Dict[str, pd.DataFrame]:
+        """Async variant of _fetch_historical; disk reads and indicator math run on the worker pool"""
+        stale, missing = await run_blocking(self._find_previous_bars, symbols, period, interval)
+        
+        async def no_bars():
+            return {}
+        
+        updates, frames = await asyncio.gather(
+            self.provider.fetch_bars(list(stale), interval=interval, start=self._refresh_start(stale))
+            if stale else no_bars(),
+            self.provider.fetch_bars(missing, period=period, interval=interval) if missing else no_bars()
+        )
+        
+        return await run_blocking(self._apply_fetched, period, interval, stale, updates, frames)
+    
+    def _find_previous_bars(self, symbols: List[str], period: str, interval: str):
+        """Split cache misses into symbols with refreshable history and ones to fetch in full"""
+        stale = {}
+        missing = []
+        for symbol in symbols:
+            previous = self._get_previous_bars(symbol, period, interval)
+            if previous is not None:
+                stale[symbol] = previous
+            else:
+                missing.append(symbol)
+        return stale, missing
+    
+    @staticmethod
+    def _refresh_start(stale: Dict[str, pd.DataFrame]) -> pd.Timestamp:
+        """One download covers every stale symbol from its oldest last bar, which may still have been forming"""
+        return min(frame.index[-1] for frame in stale.values())
+    
+    def _apply_fetched(self, period: str, interval: str, stale: Dict[str, pd.DataFrame],
+                       updates: Dict[str, pd.DataFrame], frames: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        """Merge downloaded bars into cache and store, computing indicators"""
+        result = {}
+        
+        for symbol, previous in stale.items():
+            try:
+                data = self._merge_new_bars(previous, updates.get(symbol), period)
+                self._cache_bars((symbol, period, interval), data)
+                self.bar_store.write(symbol, interval, updates.get(symbol))
+                result[symbol] = data
+            except Exception as e:
+                logger.error(f"Error refreshing bars for {symbol}: {e}")
+        
+        for symbol, data in frames.items():
+            try:
+                self.bar_store.write(symbol, interval, data)
+                data = self._add_technical_indicators(data, symbol)
+                self._cache_bars((symbol, period, interval), data)
+                result[symbol] = data
+            except Exception as e:
+                logger.error(f"Error calculating indicators for {symbol}: {e}")
+        
+        return result
+    
+    def get_indicator_panel(self, symbols: List[str], period: str = '1y', interval: str = '1d',
+                            names: Optional[List[str]] = None) -> IndicatorPanel:
+        """Get indicators for many symbols as one (indicator x time x symbol) panel"""
+        frames = self.get_historical_data_batch(symbols, period, interval)
+        frames = {symbol: frames[symbol] for symbol in symbols if symbol in frames}
+        return compute_panel(frames, names or PANEL_INDICATORS)
+    
+    def get_timeframe_data(self, symbol: str, timeframe: str = '1D') -> pd.DataFrame:
+        """Get bars with indicators for a UI timeframe ('1D', '4H', '1H', '15min')"""
+        try:
+            return self.timeframes.get(symbol, timeframe)
+        except Exception as e:
+            logger.error(f"Error getting {timeframe} data for {symbol}: {e}")
+            return pd.DataFrame()
+    
+    async def get_timeframe_data_async(self, symbol: str, timeframe: str = '1D') -> pd.DataFrame:
+        """Async variant of get_timeframe_data"""
+        try:
+            return await self.timeframes.get_async(symbol, timeframe)
+        except Exception as e:
+            logger.error(f"Error getting {timeframe} data for {symbol}: {e}")
+            return pd.DataFrame()
+    
+    def get_patterns(self, symbol: str, period: str = '1y', interval: str = '1d') -> Dict:
+        """Get support/resistance levels and recent chart patterns for a symbol"""
+        return self.get_patterns_batch([symbol], period, interval).get(symbol, {})
+    
+    def get_patterns_batch(self, symbols: List[str], period: str = '1y', interval: str = '1d') -> Dict[str, Dict]:
+        """Get patterns for many symbols, detected in one pass per shared calendar and memoized per bar range"""
+        frames = self.get_historical_data_batch(symbols, period, interval)
+        return pattern_engine.detect_many(frames)
+    
+    async def get_patterns_async(self, symbol: str, period: str = '1y', interval: str = '1d') -> Dict:
+        """Async variant of get_patterns"""
+        frames = await self.get_historical_data_batch_async([symbol], period, interval)
+        return (await run_blocking(pattern_engine.detect_many, frames)).get(symbol, {})
+    
+    def get_market_breadth(self) -> Dict:
+        """Get breadth across the configured universe, recomputing only symbols with new bars"""
+        frames = self.get_historical_data_batch(breadth_engine.symbols, breadth_engine.period, breadth_engine.interval)
+        breadth_engine.update(frames)
+        return breadth_engine.snapshot()
+    
+    async def get_market_breadth_async(self) -> Dict:
+        """Async variant of get_market_breadth"""
+        frames = await self.get_historical_data_batch_async(breadth_engine.symbols, breadth_engine.period,
+                                                            breadth_engine.interval)
+        await run_blocking(breadth_engine.update, frames)
+        return breadth_engine.snapshot()
+    
+    def get_cache_stats(self) -> Dict:
+        """Get hit/miss counters and memory usage of the shared bar cache"""
+        return self.bar_cache.stats()
+    
+    def get_fetch_stats(self) -> Dict:
+        """Get how many upstream fetches were made versus coalesced into one in flight"""
+        return _flights.stats()
+    
+    def get_real_time_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Get real-time prices for several symbols, fetching cache misses in one request"""
+        prices, missing = self._split_cached_prices(symbols)
+        
+        try:
+            # Concurrent callers asking for the same quotes share one provider request
+            quotes = _flights.do_batch(
+                [('quote', symbol) for symbol in missing],
+                lambda keys: {
+                    ('quote', symbol): price
+                    for symbol, price in self.provider.get_quotes([key[1] for key in keys]).items()
+                },
+                wait_for_async=not on_worker_thread()
+            ) if missing else {}
+        except Exception as e:
+            logger.error(f"Error fetching prices for {len(missing)} symbols: {e}")
+            quotes = {}
+        
+        prices.update(self._cache_prices(quotes))
+        return prices
+    
+    async def get_real_time_prices_async(self, symbols: List[str]) -> Dict[str, float]:
+        """Async variant of get_real_time_prices"""
+        prices, missing = self._split_cached_prices(symbols)
+        
+        async def fetch(keys):
+            quotes = await self.provider.fetch_quotes([key[1] for key in keys])
+            return {('quote', symbol): price for symbol, price in quotes.items()}
+        
+        try:
+            quotes = await _flights.do_batch_async([('quote', symbol) for symbol in missing], fetch) if missing else {}
+        except Exception as e:
+            logger.error(f"Error fetching prices for {len(missing)} symbols: {e}")
+            quotes = {}
+        
+        prices.update(self._cache_prices(quotes))
+        return prices
+    
+    async def get_real_time_price_async(self, symbol: str) -> Optional[float]:
+        """Async variant of get_real_time_price"""
+        return (await self.get_real_time_prices_async([symbol])).get(symbol)
+    
+    def _split_cached_prices(self, symbols: List[str]):
+        """Split symbols into prices in the quote table from the last 5 seconds and ones to fetch"""
+        prices, missing = quote_table.fresh(symbols, max_age=5)
+        if missing:
+            # A streamed symbol's last trade is its price even when it trades less often than that
+            max_age = cache_manager.config.get('bar_aggregator', {}).get('stale_after', 60)
+            streamed = {symbol: bar_aggregator.last_price(symbol, max_age) for symbol in missing}
+            prices.update({symbol: price for symbol, price in streamed.items() if price is not None})
+            missing = [symbol for symbol in missing if streamed[symbol] is None]
+        segment = get_shared_segment()
+        if missing and segment is not None:
+            # The ingest process keeps these current for as long as its segment is live
+            shared = segment.quotes_for(missing)
+            prices.update({symbol: quote['last'] for symbol, quote in shared.items()})
+            missing = [symbol for symbol in missing if symbol not in shared]
+        return prices, missing
+    
+    def _cache_prices(self, quotes: Dict) -> Dict[str, float]:
+        prices = {symbol: price for (_, symbol), price in quotes.items() if price is not None}
+        quote_table.update_many({symbol: {'last': price} for symbol, price in prices.items()})
+        return prices
+    
+    def _snapshot_symbols(self, symbols: Optional[List[str]]) -> List[str]:
+        """Every watchlist symbol plus the requested ones and whatever earlier callers asked for"""
+        wanted = {symbol for kind in ('stocks', 'indices', 'crypto') for symbol in self.watchlists.get(kind, [])}
+        return sorted(wanted | set(symbols or ()) | quote_snapshot.symbols)
+    
+    def _store_snapshot(self, symbols: List[str], quotes: Dict[str, Dict]) -> None:
+        quote_snapshot.update(symbols, quotes)
+    
+    def _get_shared_snapshot(self, symbols: Optional[List[str]]) -> Optional[Dict[str, Dict]]:
+        """Quotes from the ingest process's shared segment when it has every symbol asked for"""
+        segment = get_shared_segment()
+        if segment is None:
+            return None
+        wanted = symbols or self._snapshot_symbols(None)
+        quotes = segment.quotes_for(wanted)
+        if len(quotes) < len(set(wanted)):
+            return None
+        return {symbol: page_quote(quote) for symbol, quote in quotes.items()}
+    
+    def get_quote_snapshot(self, symbols: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Get quotes from the shared snapshot, refreshing every watched symbol in one provider call when stale"""
+        shared = self._get_shared_snapshot(symbols)
+        if shared is not None:
+            return shared
+        if not quote_snapshot.covers(symbols or ()):
+            request = self._snapshot_symbols(symbols)
+            try:
+                # Concurrent page renders wait for one refresh instead of each starting their own
+                _flights.do(('snapshot',), lambda: self._store_snapshot(request, self.provider.get_snapshot(request)),
+                            wait_for_async=not on_worker_thread())
+            except Exception as e:
+                logger.error(f"Error refreshing quote snapshot: {e}")
+        return quote_snapshot.get(symbols)
+    
+    async def get_quote_snapshot_async(self, symbols: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Async variant of get_quote_snapshot"""
+        shared = self._get_shared_snapshot(symbols)
+        if shared is not None:
+            return shared
+        if not quote_snapshot.covers(symbols or ()):
+            request = self._snapshot_symbols(symbols)
             
-            price = data.iloc[-1].Close
-            
-            # Update cache
-            self.price_cache[symbol] = {
-                'price': price,
-                'timestamp': datetime.now()
-            }
+            async def refresh(keys):
+                self._store_snapshot(request, await self.provider.fetch_snapshot(request))
+                return {}
             
-            return price
+            try:
+                await _flights.do_batch_async([('snapshot',)], refresh)
+            except Exception as e:
+                logger.error(f"Error refreshing quote snapshot: {e}")
+        return quote_snapshot.get(symbols)
+    
+    def get_real_time_stock_data(self, symbols: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Get price, % change, volume and market cap for stocks or indices (the stock watchlist by default)"""
+        symbols = symbols or self.watchlists.get('stocks', [])
+        quotes = self.get_quote_snapshot(symbols)
+        market_caps = self._get_market_caps(list(quotes))
+        return {
+            symbol: {**quotes[symbol], 'market_cap': market_caps.get(symbol)}
+            for symbol in symbols if symbol in quotes
+        }
+    
+    def get_real_time_crypto_data(self, symbols: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Get price, % change and volume for crypto pairs (the crypto watchlist by default)"""
+        symbols = symbols or self.watchlists.get('crypto', [])
+        quotes = self.get_quote_snapshot(symbols)
+        return {symbol: dict(quotes[symbol]) for symbol in symbols if symbol in quotes}
+    
+    def _get_market_caps(self, symbols: List[str]) -> Dict[str, float]:
+        """Market caps cached for a day; only unknown symbols go to the provider, in one call"""
+        caps = {}
+        missing = []
+        for symbol in symbols:
+            cap = cache_manager.get(f"market_cap:{symbol}")
+            if cap is not None:
+                caps[symbol] = cap
+            else:
+                missing.append(symbol)
+        
+        if missing:
+            ttl = cache_manager.config.get('cache', {}).get('market_caps', 86400)
+            try:
+                fetched = self.provider.get_market_caps(missing)
+            except Exception as e:
+                logger.error(f"Error fetching market caps: {e}")
+                fetched = {}
+            for symbol in missing:
+                # Symbols without a market cap (indices) are remembered too, so they are not retried
+                cache_manager.set(f"market_cap:{symbol}", fetched.get(symbol, 0.0), ttl)
+                caps[symbol] = fetched.get(symbol, 0.0)
+        
+        return {symbol: cap for symbol, cap in caps.items() if cap}
+    
+    def get_market_news(self, limit: int = 20) -> List[Dict]:
+        """Get recent market headlines with headline, summary, url and datetime (epoch seconds)"""
+        news = cache_manager.get('market_news')
+        if news is None:
+            try:
+                news = _flights.do(('news',), lambda: self.provider.get_news(self.watchlists.get('news', []), limit))
+            except Exception as e:
+                logger.error(f"Error fetching market news: {e}")
+                return []
+            cache_manager.set('market_news', news, cache_manager.config.get('cache', {}).get('news', 600))
+        return news[:limit]
+    
+    def get_technical_indicators(self, symbol: str, timeframe: str = '1D') -> Optional[pd.DataFrame]:
+        """Get bars with indicators for the technical page, or None when there is no data"""
+        data = self.get_timeframe_data(symbol, timeframe)
+        if data is None or data.empty:
+            return None
+        # The page reads the MACD signal line as 'Signal'; assign returns a new frame, leaving the cache intact
+        return data.assign(Signal=data['Signal_Line'])
+    
+    async def start_streaming(self, symbols: List[str], callback: Optional[Callable] = None) -> None:
+        """Stream live trades for symbols into the quote table and live indicators
+        
+        callback, if given, is awaited with (symbol, price, indicators) from the
+        fanout stage, with a symbol's backed-up trades coalesced into one call.
+        """
+        if self.stream is None:
+            self.stream = DataStreamManager()
+        if callback is not None:
+            self.stream_callback = callback
+        
+        # Live indicators continue from each symbol's daily bars; today's partial bar keeps forming
+        new = [symbol for symbol in symbols if symbol not in self.stream.indicator_states]
+        if new:
+            history = await self.get_historical_data_batch_async(new)
+            for symbol, data in history.items():
+                self.stream.seed_indicators(symbol, data)
+        
+        for symbol in symbols:
+            await self.stream.subscribe(symbol, self.stream_callback)
+        if self._stream_task is None or self._stream_task.done():
+            self._stream_task = asyncio.create_task(self.stream.run())
+    
+    async def stop_streaming(self, symbols: Optional[List[str]] = None) -> None:
+        """Stop streaming the given symbols, or everything and close the upstream connection if None"""
+        if symbols is not None:
+            if self.stream is not None:
+                for symbol in symbols:
+                    await self.stream.unsubscribe(symbol)
+            return
+        if self._stream_task is not None:
+            self._stream_task.cancel()
+            self._stream_task = None
+        if self.stream is not None:
+            await self.stream.stop_streaming()
+    
+    def get_live_bar(self, symbol: str, interval: str = '1m') -> Optional[Dict[str, float]]:
+        """The bar still forming from streamed trades for a symbol, with its start as epoch seconds"""
+        return bar_aggregator.get_forming_bar(symbol, interval)
+    
+    def get_intraday_data(self, symbol: str, interval: str = '1m', period: str = '1d') -> pd.DataFrame:
+        """Intraday bars with indicators, ending in the bar still forming if the symbol is streamed
+        
+        Intervals shorter than a minute, which the provider does not serve, come
+        from streamed trades alone.
+        """
+        try:
+            if interval_seconds(interval) < 60:
+                bars = bar_aggregator.get_bars(symbol, interval, include_forming=True)
+                if bars is None or bars.empty:
+                    return pd.DataFrame()
+                return self._add_technical_indicators(bars)
             
+            data = self.get_historical_data(symbol, period, interval)
+            if data.empty or interval not in bar_aggregator.intervals:
+                return data
+            forming = bar_aggregator.get_bars(symbol, interval, since=data.index[-1], include_forming=True)
+            if forming is None or forming.empty:
+                return data
+            # Merged into a copy; the cache keeps closed bars only
+            return self._merge_new_bars(data.astype(float), forming, period)
         except Exception as e:
-            logger.error(f"Error fetching price for {symbol}: {e}")
-            return None
+            logger.error(f"Error getting {interval} intraday data for {symbol}: {e}")
+            return pd.DataFrame()
+    
+    async def get_intraday_data_async(self, symbol: str, interval: str = '1m', period: str = '1d') -> pd.DataFrame:
+        """Async variant of get_intraday_data"""
+        try:
+            if interval_seconds(interval) < 60:
+                return await run_blocking(self.get_intraday_data, symbol, interval, period)
+            data = await self.get_historical_data_async(symbol, period, interval)
+            if data.empty or interval not in bar_aggregator.intervals:
+                return data
+            forming = bar_aggregator.get_bars(symbol, interval, since=data.index[-1], include_forming=True)
+            if forming is None or forming.empty:
+                return data
+            return await run_blocking(self._merge_new_bars, data.astype(float), forming, period)
+        except Exception as e:
+            logger.error(f"Error getting {interval} intraday data for {symbol}: {e}")
+            return pd.DataFrame()
+    
+    def get_stream_stats(self) -> Dict:
+        """Get upstream counters and per-stage depth, drops and latency of the ingest pipeline"""
+        return self.stream.stats() if self.stream is not None else {}
     
     def get_market_summary(self, symbols: List[str]) -> Dict:
         """Get market summary for given symbols"""
+        history = self.get_historical_data_batch(symbols)
+        prices = self.get_real_time_prices(list(history.keys()))
+        return self._build_summary(symbols, history, prices)
+    
+    async def get_market_summary_async(self, symbols: List[str]) -> Dict:
+        """Async variant of get_market_summary"""
+        history = await self.get_historical_data_batch_async(symbols)
+        prices = await self.get_real_time_prices_async(list(history.keys()))
+        return self._build_summary(symbols, history, prices)
+    
+    def _build_summary(self, symbols: List[str], history: Dict[str, pd.DataFrame],
+                       prices: Dict[str, float]) -> Dict:
         summary = {}
         
         for symbol in symbols:
             try:
-                data = self.get_historical_data(symbol)
-                if not data.empty:
+                data = history.get(symbol)
+                if data is not None and not data.empty:
                     latest = data.iloc[-1]
                     prev_close = data.iloc[-2].Close if len(data) > 1 else latest.Close
                     
                     summary[symbol] = {
-                        'price': self.get_real_time_price(symbol) or latest.Close,
+                        'price': prices.get(symbol) or latest.Close,
                         'change': f"{((latest.Close / prev_close) - 1) * 100:.2f}%",
                         'volume': latest.Volume,
                         'rsi': latest.RSI,
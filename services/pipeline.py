@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Union
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# What a stage does with an item that arrives while its queue is full:
+#   block        the previous stage waits for room (items submitted from outside are dropped)
+#   drop_oldest  the oldest queued item makes room
+#   drop_newest  the arriving item is dropped
+#   coalesce     an item replaces the queued one with the same key; a new key drops the oldest
+POLICIES = ('block', 'drop_oldest', 'drop_newest', 'coalesce')
+
+# Recent per-item latencies kept per stage for percentiles
+LATENCY_SAMPLES = 2048
+
+class Stage:
+    """One step of a pipeline: a bounded queue drained by concurrency worker tasks
+    
+    The handler takes one item and returns the items for the next stage: None
+    for nothing, a list for several, anything else for one. Handlers may be
+    plain functions or coroutines. With a key, items are sharded across workers
+    by key so items with the same key are always handled in order, one at a
+    time; coalescing needs a key.
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], Union[Any, Awaitable[Any]]], concurrency: int = 1,
+                 queue_size: int = 1000, policy: str = 'block', key: Optional[Callable[[Any], Hashable]] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r} for stage {name}, expected one of {POLICIES}")
+        if policy == 'coalesce' and key is None:
+            raise ValueError(f"Stage {name} coalesces, so it needs a key")
+        self.name = name
+        self.handler = handler
+        self.is_coroutine = asyncio.iscoroutinefunction(handler)
+        self.concurrency = max(int(concurrency), 1)
+        self.queue_size = queue_size
+        self.policy = policy
+        self.key = key
+        self.next: Optional['Stage'] = None
+        
+        shards = self.concurrency if key is not None else 1
+        # Every shard bounds its own queue, so the stage holds at most queue_size items
+        self._queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=max(queue_size // shards, 1)) for _ in range(shards)]
+        # key -> (item, enqueued at) for coalescing stages; their queues carry keys
+        self._pending: Dict[Hashable, tuple] = {}
+        self._workers: List[asyncio.Task] = []
+        self._latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_depth = 0
+    
+    @property
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+    
+    def _queue_for(self, item) -> asyncio.Queue:
+        if len(self._queues) == 1:
+            return self._queues[0]
+        return self._queues[hash(self.key(item)) % len(self._queues)]
+    
+    def offer(self, item) -> bool:
+        """Enqueue without waiting, applying the overload policy; returns whether the item was kept"""
+        self.received += 1
+        now = time.perf_counter()
+        queue = self._queue_for(item)
+        
+        if self.policy == 'coalesce':
+            key = self.key(item)
+            if key in self._pending:
+                # Keep the original enqueue time so latency covers the whole wait
+                self._pending[key] = (item, self._pending[key][1])
+                self.coalesced += 1
+                return True
+            if queue.full():
+                self._pending.pop(queue.get_nowait(), None)
+                self.dropped += 1
+            self._pending[key] = (item, now)
+            queue.put_nowait(key)
+        else:
+            if queue.full():
+                if self.policy != 'drop_oldest':
+                    self.dropped += 1
+                    return False
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait((item, now))
+        
+        self.max_depth = max(self.max_depth, self.depth)
+        return True
+    
+    async def put(self, item) -> None:
+        """Enqueue from the previous stage, waiting for room when the policy is block"""
+        if self.policy != 'block':
+            self.offer(item)
+            return
+        self.received += 1
+        await self._queue_for(item).put((item, time.perf_counter()))
+        self.max_depth = max(self.max_depth, self.depth)
+    
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._work(queue)) for queue in self._queues]
+            # Unsharded stages run their extra workers on the one shared queue
+            self._workers += [asyncio.create_task(self._work(self._queues[0]))
+                              for _ in range(self.concurrency - len(self._queues))]
+    
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+    
+    async def _work(self, queue: asyncio.Queue) -> None:
+        while True:
+            entry = await queue.get()
+            item, enqueued = self._pending.pop(entry) if self.policy == 'coalesce' else entry
+            try:
+                result = self.handler(item)
+                if self.is_coroutine:
+                    result = await result
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error in {self.name} stage: {e}")
+                continue
+            self.processed += 1
+            self._latencies.append(time.perf_counter() - enqueued)
+            
+            if self.next is None or result is None:
+                continue
+            for output in (result if isinstance(result, list) else [result]):
+                await self.next.put(output)
+    
+    def stats(self) -> Dict[str, Any]:
+        latencies = np.array(self._latencies) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (None, None, None)
+        return {
+            'policy': self.policy,
+            'concurrency': self.concurrency,
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'queue_size': self.queue_size,
+            'received': self.received,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'latency_ms': {
+                'p50': None if p50 is None else round(float(p50), 3),
+                'p95': None if p95 is None else round(float(p95), 3),
+                'p99': None if p99 is None else round(float(p99), 3)
+            }
+        }
+
+class Pipeline:
+    """Stages chained in order; each stage's outputs are the next stage's inputs"""
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+        for stage, following in zip(stages, stages[1:]):
+            stage.next = following
+    
+    def submit(self, item) -> bool:
+        """Hand an item to the first stage without waiting"""
+        return self.stages[0].offer(item)
+    
+    def start(self) -> None:
+        for stage in self.stages:
+            stage.start()
+    
+    async def stop(self) -> None:
+        for stage in self.stages:
+            await stage.stop()
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {stage.name: stage.stats() for stage in self.stages}
@@ -0,0 +1,73 @@
+from typing import Dict, Iterable, Optional, Set
+import logging
+import threading
+import time
+from services.quote_table import quote_table
+from utils.cache_manager import cache_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def page_quote(quote: Dict[str, Optional[float]]) -> Dict[str, Optional[float]]:
+    """Quote table fields in the shape the pages read"""
+    return {
+        'price': quote['last'],
+        'previous_close': quote['previous_close'],
+        'change': quote['change'],
+        'volume': quote['volume'],
+        'timestamp': quote['timestamp']
+    }
+
+class QuoteSnapshot:
+    """Tracks which symbols the shared quote table was last refreshed for, in one provider call
+    
+    Pages ask for stocks, indices and crypto separately and often one symbol at a
+    time; all of them are answered from the quote table until the refresh
+    expires. Streamed trades land in the same table, so pages see them too.
+    """
+
+    def __init__(self, ttl: float = 5.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._symbols: Set[str] = set()
+        self._expiry = 0.0
+        self.refreshes = 0
+    
+    @property
+    def symbols(self) -> Set[str]:
+        """Every symbol the last refresh asked for"""
+        with self._lock:
+            return set(self._symbols)
+    
+    def covers(self, symbols: Iterable[str]) -> bool:
+        """Whether the snapshot is fresh and was taken for all of these symbols"""
+        with self._lock:
+            return time.monotonic() < self._expiry and self._symbols.issuperset(symbols)
+    
+    def get(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """Price, previous close, % change, volume and timestamp for the given symbols (all if None)"""
+        quotes = {}
+        for symbol in (self.symbols if symbols is None else symbols):
+            quote = quote_table.get(symbol)
+            if quote is not None and quote['last'] is not None:
+                quotes[symbol] = page_quote(quote)
+        return quotes
+    
+    def update(self, symbols: Iterable[str], quotes: Dict[str, Dict]) -> None:
+        """Write a refresh taken for symbols into the quote table"""
+        quote_table.update_many({
+            symbol: {
+                'last': quote['price'],
+                'previous_close': quote['previous_close'],
+                'change': quote['change'],
+                'volume': quote['volume']
+            }
+            for symbol, quote in quotes.items()
+        })
+        with self._lock:
+            self._symbols = set(symbols)
+            self._expiry = time.monotonic() + self.ttl
+            self.refreshes += 1
+
+# Process-wide so every MarketDataService instance, one per page render, shares it
+quote_snapshot = QuoteSnapshot(ttl=cache_manager.config.get('cache', {}).get('quotes', 5))
@@ -0,0 +1,168 @@
+import numpy as np
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+import logging
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Columns of the quote table; timestamp is epoch seconds of the quote
+FIELDS = ('last', 'bid', 'ask', 'volume', 'change', 'previous_close', 'timestamp')
+FIELD_INDEX = {field: i for i, field in enumerate(FIELDS)}
+
+class QuoteTableSnapshot:
+    """A consistent copy of the quote table as of one version"""
+    __slots__ = ('version', 'ids', 'values')
+    
+    def __init__(self, version: int, ids: Dict[str, int], values: np.ndarray):
+        self.version = version
+        self.ids = ids
+        self.values = values
+    
+    @property
+    def symbols(self) -> List[str]:
+        return list(self.ids)
+    
+    def get(self, symbol: str) -> Optional[Dict[str, float]]:
+        i = self.ids.get(symbol)
+        return None if i is None else _row_dict(self.values[i])
+    
+    def column(self, field: str) -> np.ndarray:
+        """One field for every symbol, in symbol id order"""
+        return self.values[:, FIELD_INDEX[field]]
+    
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        return {symbol: _row_dict(self.values[i]) for symbol, i in self.ids.items()}
+
+def _row_dict(row: np.ndarray) -> Dict[str, float]:
+    # Unknown fields are NaN in the table and None to callers
+    return {field: (None if np.isnan(value) else float(value)) for field, value in zip(FIELDS, row)}
+
+class QuoteTable:
+    """Latest quote per symbol in one (symbol id x field) float64 array
+    
+    Symbols get a stable row on first write, so a lookup is a dict hit plus an
+    array index. Writes are serialized by a writer lock; readers never take it.
+    Instead every write bumps a version counter to odd before touching the
+    array and back to even after, and readers retry when the version they saw
+    before copying is odd or has moved on (a seqlock), so they always get a
+    row or a whole table from between two writes.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self._write_lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+        self._values = np.full((capacity, len(FIELDS)), np.nan)
+        self._version = 0
+        self.writes = 0
+    
+    @property
+    def version(self) -> int:
+        return self._version
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._ids
+    
+    def symbol_id(self, symbol: str) -> Optional[int]:
+        return self._ids.get(symbol)
+    
+    def update(self, symbol: str, **fields: Optional[float]) -> None:
+        """Write the given fields for one symbol; fields left out keep their values"""
+        self.update_many({symbol: fields})
+    
+    def update_many(self, quotes: Mapping[str, Mapping[str, Optional[float]]]) -> None:
+        """Write fields for many symbols as one version
+        
+        When last changes without a change being given, change is recomputed
+        from the stored previous close. timestamp defaults to now.
+        """
+        if not quotes:
+            return
+        now = time.time()
+        with self._write_lock:
+            self._version += 1
+            try:
+                rows = [(self._assign(symbol), fields) for symbol, fields in quotes.items()]
+                values = self._values
+                for i, fields in rows:
+                    for field, value in fields.items():
+                        if value is not None:
+                            values[i, FIELD_INDEX[field]] = value
+                    if 'last' in fields and 'change' not in fields:
+                        previous = values[i, FIELD_INDEX['previous_close']]
+                        if previous:
+                            values[i, FIELD_INDEX['change']] = (values[i, FIELD_INDEX['last']] / previous - 1) * 100
+                    if fields.get('timestamp') is None:
+                        values[i, FIELD_INDEX['timestamp']] = now
+            finally:
+                self._version += 1
+                self.writes += 1
+    
+    def _assign(self, symbol: str) -> int:
+        # Called under the writer lock. Growing swaps in a larger copy, so readers
+        # holding the old array still see a complete, if older, table.
+        i = self._ids.get(symbol)
+        if i is None:
+            i = len(self._ids)
+            if i == len(self._values):
+                grown = np.full((2 * len(self._values), len(FIELDS)), np.nan)
+                grown[:i] = self._values
+                self._values = grown
+            self._ids[symbol] = i
+        return i
+    
+    def _read(self, read):
+        while True:
+            version = self._version
+            if not version & 1:
+                result = read(self._values)
+                if self._version == version:
+                    return result
+            # A write is in progress; let the writer thread finish it
+            time.sleep(0)
+    
+    def get(self, symbol: str) -> Optional[Dict[str, float]]:
+        """All fields for one symbol, or None if it was never written"""
+        i = self._ids.get(symbol)
+        if i is None:
+            return None
+        return _row_dict(self._read(lambda values: values[i].copy()))
+    
+    def last(self, symbol: str) -> Optional[float]:
+        quote = self.get(symbol)
+        return None if quote is None else quote['last']
+    
+    def fresh(self, symbols: Iterable[str], max_age: float) -> Tuple[Dict[str, float], List[str]]:
+        """Split symbols into last prices written within max_age seconds and the rest"""
+        symbols = list(symbols)
+        ids = [self._ids.get(symbol) for symbol in symbols]
+        known = [i for i in ids if i is not None]
+        rows = self._read(lambda values: values[known][:, [FIELD_INDEX['last'], FIELD_INDEX['timestamp']]])
+        cutoff = time.time() - max_age
+        
+        prices, missing = {}, []
+        rows = iter(rows)
+        for symbol, i in zip(symbols, ids):
+            last, timestamp = next(rows) if i is not None else (np.nan, np.nan)
+            if not np.isnan(last) and timestamp >= cutoff:
+                prices[symbol] = float(last)
+            else:
+                missing.append(symbol)
+        return prices, missing
+    
+    def snapshot(self) -> QuoteTableSnapshot:
+        """A read-only copy of the whole table at one version"""
+        def read(values):
+            ids = dict(self._ids)
+            return self._version, ids, values[:len(ids)].copy()
+        
+        version, ids, values = self._read(read)
+        values.flags.writeable = False
+        return QuoteTableSnapshot(version, ids, values)
+
+# Process-wide so the price endpoints, dashboards and streaming all read the same quotes
+quote_table = QuoteTable()
@@ -0,0 +1,195 @@
+"""Local stand-in for the upstream trade websocket, for load-testing the streaming stack
+
+Speaks the same protocol WebSocketManager uses upstream: clients send
+{"type": "subscribe", "symbol": ...} / {"type": "unsubscribe", ...} and receive
+{"type": "trade", "data": [{"s", "p", "t", "v"}, ...]} for the symbols they
+subscribed to. Trades are either replayed from a recording (JSON lines of
+trade messages as received upstream) or generated as a random walk per symbol,
+N times faster than real time. Trade times are stamped when sent, so
+downstream consumers can measure end-to-end latency against them.
+
+Run it, then point the server at it with websocket.url: "ws://localhost:8765":
+
+    python -m services.replay_feed --speed 10 --rate 2
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional, Set
+import numpy as np
+import websockets
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ReplayFeedServer:
+    """Serves recorded or synthetic trades over a websocket at speed times real time
+    
+    Synthetic symbols start at a price derived from their name and trade rate
+    times per simulated second on average, each trade moving the price by a
+    normal log-return of tick_volatility.
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 8765, speed: float = 1.0, rate: float = 1.0,
+                 tick_volatility: float = 5e-4, recording: Optional[str] = None, batch_ms: float = 10,
+                 max_trades_per_message: int = 500, seed: int = 0):
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.rate = rate
+        self.tick_volatility = tick_volatility
+        self.recording = recording
+        self.batch_interval = batch_ms / 1000
+        self.max_trades_per_message = max_trades_per_message
+        self.rng = np.random.default_rng(seed)
+        self.clients: Dict[object, Set[str]] = {}
+        # Synthetic state for every symbol any client subscribed to
+        self.symbols: List[str] = []
+        self.symbol_index: Dict[str, int] = {}
+        self.prices = np.empty(0)
+        self.trades_sent = 0
+        self.messages_sent = 0
+    
+    async def serve(self) -> None:
+        """Accept clients and stream trades until cancelled"""
+        async with websockets.serve(self._handle, self.host, self.port, max_queue=None):
+            logger.info(f"Replay feed on ws://{self.host}:{self.port} at {self.speed}x")
+            reporter = asyncio.create_task(self._report())
+            try:
+                if self.recording:
+                    await self._replay_recording()
+                else:
+                    await self._replay_synthetic()
+            finally:
+                reporter.cancel()
+    
+    async def _handle(self, websocket) -> None:
+        subscriptions = self.clients[websocket] = set()
+        try:
+            async for message in websocket:
+                try:
+                    request = json.loads(message)
+                except ValueError:
+                    continue
+                symbol = request.get('symbol')
+                if not symbol:
+                    continue
+                if request.get('type') == 'subscribe':
+                    subscriptions.add(symbol)
+                    self._add_symbol(symbol)
+                elif request.get('type') == 'unsubscribe':
+                    subscriptions.discard(symbol)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            del self.clients[websocket]
+    
+    def _add_symbol(self, symbol: str) -> None:
+        if symbol in self.symbol_index:
+            return
+        self.symbol_index[symbol] = len(self.symbols)
+        self.symbols.append(symbol)
+        # Deterministic starting price per symbol, like the replay data provider's walks
+        start = 20 + zlib.crc32(symbol.encode()) % 480
+        self.prices = np.append(self.prices, float(start))
+    
+    async def _replay_synthetic(self) -> None:
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(self.batch_interval)
+            now = time.monotonic()
+            elapsed, last = (now - last) * self.speed, now
+            if not self.symbols:
+                continue
+            
+            # Trades per symbol in the simulated interval, then one cumulative walk over all of them
+            counts = self.rng.poisson(self.rate * elapsed, size=len(self.symbols))
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            owners = np.repeat(np.arange(len(self.symbols)), counts)
+            steps = self.rng.normal(0, self.tick_volatility, size=total)
+            walk = np.cumsum(steps)
+            traded = np.flatnonzero(counts)
+            starts = (np.cumsum(counts) - counts)[traded]
+            # Restart the cumulative sum at each symbol's first trade
+            walk -= np.repeat(walk[starts] - steps[starts], counts[traded])
+            prices = self.prices[owners] * np.exp(walk)
+            self.prices[traded] = prices[starts + counts[traded] - 1]
+            
+            volumes = self.rng.integers(1, 500, size=total)
+            stamp = int(time.time() * 1000)
+            trades = [{'s': self.symbols[owner], 'p': round(float(price), 4), 't': stamp, 'v': int(volume)}
+                      for owner, price, volume in zip(owners, prices, volumes)]
+            await self._broadcast(trades)
+    
+    def _recorded_messages(self) -> Iterator[dict]:
+        with open(self.recording) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    
+    async def _replay_recording(self) -> None:
+        while True:
+            previous = None
+            replayed = 0
+            for message in self._recorded_messages():
+                trades = message.get('data', [])
+                if message.get('type', 'trade') != 'trade' or not trades:
+                    continue
+                replayed += 1
+                recorded = trades[0].get('t')
+                if previous is not None and recorded is not None:
+                    await asyncio.sleep(max(recorded - previous, 0) / 1000 / self.speed)
+                previous = recorded if recorded is not None else previous
+                stamp = int(time.time() * 1000)
+                await self._broadcast([{**trade, 't': stamp} for trade in trades])
+            if not replayed:
+                logger.error(f"No trade messages in {self.recording}")
+                return
+            logger.info("Recording finished, starting over")
+    
+    async def _broadcast(self, trades: List[dict]) -> None:
+        for websocket, subscriptions in list(self.clients.items()):
+            mine = [trade for trade in trades if trade['s'] in subscriptions]
+            for start in range(0, len(mine), self.max_trades_per_message):
+                batch = mine[start:start + self.max_trades_per_message]
+                try:
+                    await websocket.send(json.dumps({'type': 'trade', 'data': batch}))
+                except websockets.exceptions.ConnectionClosed:
+                    break
+                self.trades_sent += len(batch)
+                self.messages_sent += 1
+    
+    async def _report(self, every: float = 5.0) -> None:
+        while True:
+            trades, started = self.trades_sent, time.monotonic()
+            await asyncio.sleep(every)
+            rate = (self.trades_sent - trades) / (time.monotonic() - started)
+            logger.info(f"{len(self.clients)} clients, {len(self.symbols)} symbols, {rate:,.0f} trades/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--speed', type=float, default=1.0, help='simulated seconds per wall-clock second')
+    parser.add_argument('--rate', type=float, default=1.0, help='synthetic trades per symbol per simulated second')
+    parser.add_argument('--tick-volatility', type=float, default=5e-4)
+    parser.add_argument('--recording', help='JSON lines of recorded trade messages to replay instead')
+    parser.add_argument('--batch-ms', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    server = ReplayFeedServer(args.host, args.port, args.speed, args.rate, args.tick_volatility,
+                              args.recording, args.batch_ms, seed=args.seed)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import logging
+import math
+import threading
+from services.executor import run_blocking
+from services.market_data import MarketDataService
+from utils.indicators import compute_indicators
+from utils.screen_expressions import compile_expression
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class Screener:
+    """Screens every cached symbol against compiled filter expressions in one vectorized pass
+    
+    The latest value of each field is kept per symbol and only recomputed when
+    that symbol's cached bars change, so a refresh costs one pass over the
+    cache keys and a screen costs a few array operations over the universe.
+    """
+
+    RAW_FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+    
+    def __init__(self, market_data: Optional[MarketDataService] = None, period: str = '1y', interval: str = '1d'):
+        self.market_data = market_data or MarketDataService()
+        self.period = period
+        self.interval = interval
+        self._lock = threading.Lock()
+        # symbol -> (cached bars the row was built from, {field: latest value})
+        self._rows: Dict[str, Tuple[Any, Dict[str, float]]] = {}
+        # Field arrays aligned with _symbols, rebuilt only when symbols enter or leave the cache
+        self._symbols: Tuple[str, ...] = ()
+        self._positions: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+    
+    def screen(self, expression: str, symbols: Optional[List[str]] = None, sort_by: Optional[str] = None,
+               descending: bool = True, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE,
+               columns: Optional[List[str]] = None) -> Dict:
+        """Find symbols matching a filter such as 'RSI<30 & Close>SMA_50', ranked and paged
+        
+        Without symbols the whole cached universe for this period and interval is
+        screened; with symbols, those are fetched if needed and the screen is
+        limited to them. sort_by is any numeric expression, e.g. 'Volume_Ratio'.
+        """
+        if symbols:
+            self.market_data.get_historical_data_batch(symbols, self.period, self.interval)
+        return self._run(expression, symbols, sort_by, descending, page, page_size, columns)
+    
+    async def screen_async(self, expression: str, symbols: Optional[List[str]] = None,
+                           sort_by: Optional[str] = None, descending: bool = True, page: int = 1,
+                           page_size: int = DEFAULT_PAGE_SIZE, columns: Optional[List[str]] = None) -> Dict:
+        """Async variant of screen"""
+        if symbols:
+            await self.market_data.get_historical_data_batch_async(symbols, self.period, self.interval)
+        return await run_blocking(self._run, expression, symbols, sort_by, descending, page, page_size, columns)
+    
+    def _run(self, expression: str, symbols: Optional[List[str]], sort_by: Optional[str], descending: bool,
+             page: int, page_size: int, columns: Optional[List[str]]) -> Dict:
+        condition = compile_expression(expression)
+        if not condition.is_condition:
+            raise ValueError(f"Screen filter must be a condition, got {expression!r}")
+        ranking = compile_expression(sort_by) if sort_by else None
+        if ranking is not None and ranking.is_condition:
+            raise ValueError(f"sort_by must be a numeric expression, got {sort_by!r}")
+        
+        page = max(int(page), 1)
+        page_size = min(max(int(page_size), 1), self.MAX_PAGE_SIZE)
+        fields = set(condition.fields) | set(columns or ()) | {'Close'}
+        if ranking is not None:
+            fields |= ranking.fields
+        
+        with self._lock:
+            universe, values = self._snapshot(fields)
+            mask = condition(values) if universe else np.zeros(0, dtype=bool)
+            if symbols:
+                mask = mask & np.isin(np.asarray(universe, dtype=object), list(symbols))
+            matches = np.flatnonzero(mask)
+            
+            if ranking is not None and len(matches):
+                key = np.asarray(ranking(values), dtype=float)[matches]
+                # argsort puts NaN last either way, so negate rather than reverse for descending
+                matches = matches[np.argsort(-key if descending else key, kind='stable')]
+            
+            start = (page - 1) * page_size
+            shown = columns or sorted(fields)
+            results = [
+                {'symbol': universe[i], **{field: self._plain(values[field][i]) for field in shown}}
+                for i in matches[start:start + page_size]
+            ]
+        
+        return {
+            'expression': expression,
+            'sort_by': sort_by,
+            'universe': len(universe),
+            'total': len(matches),
+            'page': page,
+            'page_size': page_size,
+            'pages': math.ceil(len(matches) / page_size),
+            'results': results,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def _snapshot(self, fields) -> Tuple[Tuple[str, ...], Dict[str, np.ndarray]]:
+        """Latest value of each field for every cached symbol, as arrays aligned with the universe"""
+        cached = {
+            key[0]: value for key, value in self.market_data.bar_cache.items()
+            if key[1:] == (self.period, self.interval)
+        }
+        
+        resized = cached.keys() != self._rows.keys()
+        for symbol in list(self._rows):
+            if symbol not in cached:
+                del self._rows[symbol]
+        dirty = []
+        for symbol, bars in cached.items():
+            row = self._rows.get(symbol)
+            if row is None or row[0] is not bars:
+                self._rows[symbol] = (bars, {})
+                dirty.append(symbol)
+        
+        if resized:
+            self._symbols = tuple(sorted(self._rows))
+            self._positions = {symbol: i for i, symbol in enumerate(self._symbols)}
+            self._columns = {}
+        
+        new_fields = [field for field in fields if field not in self._columns]
+        if new_fields:
+            tracked = list(self._columns) + new_fields
+            rows = [self._fill_row(symbol, tracked) for symbol in self._symbols]
+            for field in new_fields:
+                self._columns[field] = np.array([row[field] for row in rows], dtype=float)
+        if dirty and not resized:
+            # Same universe: patch only the symbols whose bars were refreshed
+            for symbol in dirty:
+                row = self._fill_row(symbol, list(self._columns))
+                for field, column in self._columns.items():
+                    column[self._positions[symbol]] = row[field]
+        
+        return self._symbols, {field: self._columns[field] for field in fields}
+    
+    def _fill_row(self, symbol: str, fields: List[str]) -> Dict[str, float]:
+        """Latest values of the given fields for one symbol, computing only those not yet known"""
+        bars, row = self._rows[symbol]
+        missing = [field for field in fields if field not in row]
+        if not missing:
+            return row
+        
+        data = MarketDataService._as_frame(bars)
+        if data is None or data.empty:
+            row.update(dict.fromkeys(missing, np.nan))
+            return row
+        
+        # One conversion serves both the last row and the raw columns, far cheaper than per-column lookups
+        columns = list(data.columns)
+        values = data.to_numpy(dtype=float)
+        if not row:
+            row.update(zip(columns, values[-1]))
+            missing = [field for field in missing if field not in row]
+        if missing:
+            # Indicators the cache does not carry are computed together from the raw columns
+            bars = {column: values[:, columns.index(column)] for column in self.RAW_FIELDS if column in columns}
+            computed = compute_indicators(bars, missing)
+            row.update((field, float(computed[field][-1])) for field in missing)
+        return row
+    
+    @staticmethod
+    def _plain(value: float) -> Optional[float]:
+        return None if math.isnan(value) else float(value)
@@ -0,0 +1,290 @@
+"""Quotes and recent bars in a shared memory segment for multi-process deployments
+
+One ingest process (``python -m services.shared_segment``) refreshes the quote
+table and recent bars for the watched symbols and publishes them into a named
+shared memory block. Uvicorn workers and Streamlit sessions on the same host
+map that block read-only, so adding workers adds neither memory for another
+copy of the data nor upstream requests.
+
+The block is laid out as fixed-size NumPy arrays:
+
+    header      float64[8]      version, heartbeat, symbols, capacity, bar capacity
+    bar_key     S16[2]          period and interval of the bars
+    names       S16[capacity]   symbol per row
+    tzs         S32[capacity]   timezone of each symbol's bar timestamps
+    quotes      float64[capacity, len(FIELDS)]
+    bar_counts  int64[capacity]
+    bars        float64[capacity, bar capacity, 6]   epoch seconds, OHLCV
+
+The writer brackets each publish with an odd/even version, like the in-process
+quote table, and readers retry copies that straddle a publish.
+"""
+import numpy as np
+import pandas as pd
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterable, List, Mapping, Optional
+import logging
+import time
+from services.quote_table import FIELDS, QuoteTableSnapshot
+from utils.cache_manager import cache_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BAR_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+HEADER_VERSION, HEADER_HEARTBEAT, HEADER_SYMBOLS, HEADER_CAPACITY, HEADER_BAR_CAPACITY = range(5)
+
+def _layout(capacity: int, bar_capacity: int):
+    """(name, dtype, shape) of each array in the segment, in order"""
+    return (
+        ('header', np.float64, (8,)),
+        ('bar_key', 'S16', (2,)),
+        ('names', 'S16', (capacity,)),
+        ('tzs', 'S32', (capacity,)),
+        ('quotes', np.float64, (capacity, len(FIELDS))),
+        ('bar_counts', np.int64, (capacity,)),
+        ('bars', np.float64, (capacity, bar_capacity, 1 + len(BAR_COLUMNS)))
+    )
+
+def _size(capacity: int, bar_capacity: int) -> int:
+    return sum(np.dtype(dtype).itemsize * int(np.prod(shape)) for _, dtype, shape in _layout(capacity, bar_capacity))
+
+class SharedSegment:
+    """Named shared memory holding quotes and recent bars for up to capacity symbols"""
+
+    def __init__(self, shm: shared_memory.SharedMemory, capacity: int, bar_capacity: int, writer: bool):
+        self.shm = shm
+        self.capacity = capacity
+        self.bar_capacity = bar_capacity
+        self.writer = writer
+        offset = 0
+        for name, dtype, shape in _layout(capacity, bar_capacity):
+            array = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            # Workers map the segment read-only; only the ingest process can write through it
+            array.flags.writeable = writer
+            setattr(self, name, array)
+            offset += array.nbytes
+        # Readers rebuild their symbol -> row map whenever the writer adds symbols
+        self._ids: Dict[str, int] = {}
+        self._ids_count = -1
+    
+    @classmethod
+    def create(cls, name: str, capacity: int, bar_capacity: int) -> 'SharedSegment':
+        """Create the segment in the ingest process, replacing one left behind by a previous run"""
+        size = _size(capacity, bar_capacity)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        segment = cls(shm, capacity, bar_capacity, writer=True)
+        segment.header[:] = 0
+        segment.header[HEADER_CAPACITY] = capacity
+        segment.header[HEADER_BAR_CAPACITY] = bar_capacity
+        segment.bar_counts[:] = 0
+        return segment
+    
+    @classmethod
+    def attach(cls, name: str) -> 'SharedSegment':
+        """Map an existing segment read-only; raises FileNotFoundError if no ingest process created it"""
+        shm = shared_memory.SharedMemory(name=name)
+        # Python 3.11 registers attached segments with the resource tracker, which would
+        # unlink the segment when this worker exits; only the ingest process owns it
+        try:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        header = np.ndarray((8,), dtype=np.float64, buffer=shm.buf)
+        capacity, bar_capacity = int(header[HEADER_CAPACITY]), int(header[HEADER_BAR_CAPACITY])
+        del header
+        return cls(shm, capacity, bar_capacity, writer=False)
+    
+    def close(self) -> None:
+        # Views into the buffer have to go before it can be closed
+        for name, _, _ in _layout(self.capacity, self.bar_capacity):
+            setattr(self, name, None)
+        self.shm.close()
+    
+    def unlink(self) -> None:
+        self.shm.unlink()
+    
+    @property
+    def heartbeat(self) -> float:
+        """Epoch seconds of the last publish"""
+        return float(self.header[HEADER_HEARTBEAT])
+    
+    def is_live(self, stale_after: float) -> bool:
+        """Whether the ingest process has published within stale_after seconds"""
+        return time.time() - self.heartbeat < stale_after
+    
+    def publish(self, quotes: QuoteTableSnapshot, frames: Mapping[str, pd.DataFrame],
+                bar_key: Optional[tuple] = None) -> None:
+        """Write a quote table snapshot and recent bars for (period, interval) bar_key as one version"""
+        header = self.header
+        header[HEADER_VERSION] += 1
+        try:
+            if bar_key is not None:
+                self.bar_key[:] = [part.encode() for part in bar_key]
+            for symbol in set(quotes.ids) | set(frames):
+                i = self._row(symbol)
+                if i is None:
+                    continue
+                quote = quotes.ids.get(symbol)
+                if quote is not None:
+                    self.quotes[i] = quotes.values[quote]
+                if symbol in frames:
+                    self._write_bars(i, symbol, frames[symbol])
+            header[HEADER_HEARTBEAT] = time.time()
+        finally:
+            header[HEADER_VERSION] += 1
+    
+    def _row(self, symbol: str) -> Optional[int]:
+        i = self._ids.get(symbol)
+        if i is not None:
+            return i
+        count = int(self.header[HEADER_SYMBOLS])
+        if count == self.capacity:
+            logger.warning(f"Shared segment is full ({self.capacity} symbols), not publishing {symbol}")
+            return None
+        self.names[count] = symbol.encode()
+        self.quotes[count] = np.nan
+        self.header[HEADER_SYMBOLS] = count + 1
+        self._ids[symbol] = count
+        return count
+    
+    def _write_bars(self, i: int, symbol: str, data: Optional[pd.DataFrame]) -> None:
+        if data is None or data.empty or not isinstance(data.index, pd.DatetimeIndex):
+            self.bar_counts[i] = 0
+            return
+        if len(data) > self.bar_capacity:
+            # Serving a truncated window as the full period would be wrong; readers fetch it themselves
+            logger.warning(f"{len(data)} bars for {symbol} exceed the shared bar capacity of {self.bar_capacity}")
+            self.bar_counts[i] = 0
+            return
+        n = len(data)
+        index = data.index if data.index.tz is not None else data.index.tz_localize('UTC')
+        self.bars[i, :n, 0] = index.as_unit('ns').asi8 / 1e9
+        for column, name in enumerate(BAR_COLUMNS, start=1):
+            self.bars[i, :n, column] = data[name].to_numpy(dtype=float) if name in data else np.nan
+        self.tzs[i] = str(data.index.tz or 'UTC').encode()
+        self.bar_counts[i] = n
+    
+    def _read(self, read):
+        while True:
+            version = self.header[HEADER_VERSION]
+            if not int(version) & 1:
+                result = read()
+                if self.header[HEADER_VERSION] == version:
+                    return result
+            time.sleep(0)
+    
+    def _lookup(self, symbol: str) -> Optional[int]:
+        count = int(self.header[HEADER_SYMBOLS])
+        if count != self._ids_count:
+            self._ids = {name.decode(): i for i, name in enumerate(self.names[:count])}
+            self._ids_count = count
+        return self._ids.get(symbol)
+    
+    @property
+    def symbols(self) -> List[str]:
+        count = int(self.header[HEADER_SYMBOLS])
+        return [name.decode() for name in self.names[:count]]
+    
+    def quotes_for(self, symbols: Iterable[str]) -> Dict[str, Dict[str, Optional[float]]]:
+        """Quote fields for the symbols the segment has a price for"""
+        rows = {symbol: self._lookup(symbol) for symbol in symbols}
+        rows = {symbol: i for symbol, i in rows.items() if i is not None}
+        values = self._read(lambda: self.quotes[list(rows.values())].copy())
+        quotes = {}
+        for symbol, row in zip(rows, values):
+            quote = {field: (None if np.isnan(value) else float(value)) for field, value in zip(FIELDS, row)}
+            if quote['last'] is not None:
+                quotes[symbol] = quote
+        return quotes
+    
+    def bars_for(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+        """Recent OHLCV bars for symbol if the segment holds bars for this period and interval"""
+        i = self._lookup(symbol)
+        if i is None:
+            return None
+        
+        def read():
+            key = tuple(part.decode() for part in self.bar_key)
+            n = int(self.bar_counts[i])
+            return key, self.bars[i, :n].copy(), self.tzs[i].decode()
+        
+        key, bars, tz = self._read(read)
+        if key != (period, interval) or len(bars) == 0:
+            return None
+        index = pd.to_datetime((bars[:, 0] * 1e9).round().astype(np.int64), utc=True).tz_convert(tz)
+        return pd.DataFrame(bars[:, 1:], index=index, columns=list(BAR_COLUMNS))
+
+_attached: Optional[SharedSegment] = None
+_next_attach = 0.0
+_writer = False
+
+def get_shared_segment() -> Optional[SharedSegment]:
+    """The ingest process's segment when shared memory is enabled and it is live, else None
+    
+    Workers attach lazily and retry every few seconds, so they can start
+    before the ingest process or outlive a restart of it.
+    """
+    global _attached, _next_attach
+    config = cache_manager.config.get('shared_memory', {})
+    if not config.get('enabled', False) or _writer:
+        return None
+    
+    if _attached is None and time.monotonic() >= _next_attach:
+        try:
+            _attached = SharedSegment.attach(config.get('name', 'tenzinquant'))
+            logger.info(f"Attached shared quote segment {config.get('name', 'tenzinquant')}")
+        except FileNotFoundError:
+            _next_attach = time.monotonic() + config.get('attach_retry', 5)
+    
+    if _attached is not None and not _attached.is_live(config.get('stale_after', 15)):
+        # A restarted ingest process replaces the segment, so a stale mapping may be of an
+        # unlinked one; drop it and attach again to whatever segment holds the name now. It is
+        # not closed here because readers in other threads may still hold its arrays; the
+        # mapping goes once the last of them lets go
+        _attached = None
+        _next_attach = time.monotonic() + config.get('attach_retry', 5)
+    return _attached
+
+def run_ingest() -> None:
+    """Refresh quotes and recent bars for the watched symbols and publish them until interrupted"""
+    global _writer
+    from services.breadth import breadth_engine
+    from services.market_data import MarketDataService
+    from services.quote_table import quote_table
+    
+    config = cache_manager.config.get('shared_memory', {})
+    _writer = True
+    segment = SharedSegment.create(config.get('name', 'tenzinquant'), config.get('capacity', 1024),
+                                   config.get('bar_capacity', 512))
+    market_data = MarketDataService()
+    bar_key = (config.get('bar_period', '5d'), config.get('bar_interval', '15m'))
+    watchlists = cache_manager.config.get('watchlists', {})
+    symbols = sorted({symbol for kind in ('stocks', 'indices', 'crypto') for symbol in watchlists.get(kind, [])}
+                     | set(breadth_engine.symbols))
+    logger.info(f"Publishing {len(symbols)} symbols to shared segment {segment.shm.name}")
+    
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                market_data.get_quote_snapshot(symbols)
+                frames = market_data.get_historical_data_batch(symbols, *bar_key)
+                segment.publish(quote_table.snapshot(), frames, bar_key)
+            except Exception as e:
+                logger.error(f"Error publishing shared segment: {e}")
+            time.sleep(max(config.get('refresh', 5) - (time.monotonic() - started), 0))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        segment.close()
+        segment.unlink()
+
+if __name__ == "__main__":
+    run_ingest()
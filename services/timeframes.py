@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+import logging
+import threading
+from services.executor import run_blocking
+from utils.cache_manager import cache_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# UI timeframe -> pandas bucket rule over the intraday base bars; None serves the base bars as they are
+INTRADAY_TIMEFRAMES = {'4H': '4h', '1H': '1h', '15min': None}
+# Daily bars cover far more history than intraday downloads allow, so 1D comes from daily history
+DAILY_TIMEFRAMES = {'1D': '1d'}
+TIMEFRAMES = tuple(DAILY_TIMEFRAMES) + tuple(INTRADAY_TIMEFRAMES)
+
+OHLCV_AGGREGATION = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+def rollup(bars: pd.DataFrame, rule: str) -> pd.DataFrame:
+    """Aggregate OHLCV bars into buckets of the given rule
+    
+    Buckets come from flooring each timestamp in local time, so rolling up any
+    suffix of the bars gives exactly the same buckets as rolling up all of them.
+    """
+    index = bars.index
+    wall = index.tz_localize(None) if index.tz is not None else index
+    buckets = wall.floor(rule)
+    aggregation = {column: how for column, how in OHLCV_AGGREGATION.items() if column in bars}
+    rolled = bars[list(aggregation)].groupby(buckets).agg(aggregation)
+    
+    if index.tz is not None:
+        # Label each bucket with its start as an aware timestamp, taking the UTC offset
+        # from the bucket's first bar so DST changes never make a label ambiguous
+        first = pd.Series(index, index=buckets).groupby(level=0).first()
+        rolled.index = pd.DatetimeIndex(first - (first.dt.tz_localize(None) - first.index))
+    rolled.index.name = index.name
+    return rolled
+
+class TimeframeEngine:
+    """Derives coarser timeframes from the finest intraday bars held in the bar cache
+    
+    Each rolled-up timeframe keeps its bars, indicator columns and the bucket
+    that was still open in the shared bar cache. When the base bars move on, only
+    the base rows from that open bucket onwards are rolled up again, and
+    indicators are updated from there with the same incremental tail refresh
+    as downloaded history.
+    """
+
+    def __init__(self, market_data, base_interval: Optional[str] = None, base_period: Optional[str] = None):
+        config = cache_manager.config.get('timeframes', {})
+        self.market_data = market_data
+        self.base_interval = base_interval or config.get('base_interval', '15m')
+        self.base_period = base_period or config.get('base_period', '60d')
+        self._lock = threading.Lock()
+    
+    def get(self, symbol: str, timeframe: str) -> pd.DataFrame:
+        """Bars with indicators for a UI timeframe such as '1D', '4H', '1H' or '15min'"""
+        if timeframe in DAILY_TIMEFRAMES:
+            return self.market_data.get_historical_data(symbol, '1y', DAILY_TIMEFRAMES[timeframe])
+        if timeframe not in INTRADAY_TIMEFRAMES:
+            raise ValueError(f"Unknown timeframe {timeframe!r}, expected one of {', '.join(TIMEFRAMES)}")
+        
+        base = self.market_data.get_historical_data(symbol, self.base_period, self.base_interval)
+        rule = INTRADAY_TIMEFRAMES[timeframe]
+        if rule is None or base.empty:
+            return base
+        return self.update(symbol, timeframe, base)
+    
+    async def get_async(self, symbol: str, timeframe: str) -> pd.DataFrame:
+        """Async variant of get"""
+        if timeframe in DAILY_TIMEFRAMES:
+            return await self.market_data.get_historical_data_async(symbol, '1y', DAILY_TIMEFRAMES[timeframe])
+        if timeframe not in INTRADAY_TIMEFRAMES:
+            raise ValueError(f"Unknown timeframe {timeframe!r}, expected one of {', '.join(TIMEFRAMES)}")
+        
+        base = await self.market_data.get_historical_data_async(symbol, self.base_period, self.base_interval)
+        if INTRADAY_TIMEFRAMES[timeframe] is None or base.empty:
+            return base
+        return await run_blocking(self.update, symbol, timeframe, base)
+    
+    def update(self, symbol: str, timeframe: str, base: pd.DataFrame) -> pd.DataFrame:
+        """Roll base bars up into a timeframe, redoing only the bucket that was still open"""
+        rule = INTRADAY_TIMEFRAMES[timeframe]
+        key = ('rollup', symbol, self.base_interval, timeframe)
+        cache = self.market_data.bar_cache
+        
+        with self._lock:
+            state = cache.get_stale(key)
+            if state is not None and state['base_last'] == base.index[-1] and state['base_len'] == len(base):
+                return state['data']
+            
+            if state is not None and base.index[0] <= state['open_bucket'] <= base.index[-1]:
+                previous = state['data']
+                start = int(previous.index.searchsorted(state['open_bucket']))
+                rolled = rollup(base[base.index >= state['open_bucket']], rule)
+                data = pd.concat([previous.iloc[:start], rolled])
+                data = self.market_data._update_technical_indicators(data, start)
+                # Keep the rollup aligned with the base window as it slides forward
+                first_bucket = rollup(base.iloc[:1], rule).index[0]
+                data = data[data.index >= first_bucket]
+            else:
+                data = self.market_data._add_technical_indicators(rollup(base, rule), symbol)
+            
+            cache.set(key, {
+                'data': data,
+                'base_last': base.index[-1],
+                'base_len': len(base),
+                'open_bucket': data.index[-1]
+            })
+            return data
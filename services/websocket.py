@@ -2,107 +2,384 @@ import asyncio
 import websockets
 import json
 import logging
-from typing import Dict, List, Optional, Callable
+from typing import Dict, List, Optional, Callable, Set
 import yaml
 import os
+import random
+import time
+import pandas as pd
+from services.bar_aggregator import bar_aggregator
+from services.pipeline import Pipeline, Stage
+from services.quote_table import quote_table
+from utils.online_indicators import IndicatorState
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class WebSocketManager:
+    """One multiplexed upstream websocket shared by every streamed symbol
+    
+    Symbols are added and removed with subscribe/unsubscribe messages on the
+    same connection. A reader task only moves raw messages from the socket
+    into a queue, and a dispatcher task parses them and calls the callbacks of
+    the symbols each message carries, so a quiet symbol never holds up a busy
+    one. When the connection drops, the reader reconnects with jittered
+    exponential backoff and resubscribes to everything.
+    
+    When a sink is set, raw messages go to it instead of the built-in
+    dispatcher; DataStreamManager uses that to feed its ingest pipeline.
+    """
+
     def __init__(self):
         self.config = self._load_config()
-        self.connections: Dict[str, websockets.WebSocketClientProtocol] = {}
+        ws_config = self.config.get('websocket', {})
+        self.url = ws_config.get('url', 'wss://ws.finnhub.io')
+        self.token = os.getenv('FINNHUB_API_KEY')
+        self.reconnect_interval = ws_config.get('reconnect_interval', 1)
+        self.max_reconnect_interval = ws_config.get('max_reconnect_interval', 30)
+        self.max_retries = ws_config.get('max_retries', 3)
+        self.queue_size = ws_config.get('queue_size', 10000)
+        
+        self.ws = None
+        self.subscriptions: Set[str] = set()
         self.callbacks: Dict[str, List[Callable]] = {}
+        self.queue: Optional[asyncio.Queue] = None
+        self.sink: Optional[Callable[[str], object]] = None
+        # Called after every (re)connect, once the subscriptions have been sent
+        self.on_connect: Optional[Callable[[], None]] = None
+        self.connected = asyncio.Event()
         self.running = False
-        
+        self.received = 0
+        self.dropped = 0
+        self.reconnects = 0
+    
     def _load_config(self) -> dict:
         config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
         with open(config_path, 'r') as f:
             return yaml.safe_load(f)
     
-    async def connect(self, symbol: str, callback: Optional[Callable] = None):
-        """Connect to websocket for a given symbol"""
-        if callback:
-            if symbol not in self.callbacks:
-                self.callbacks[symbol] = []
+    @property
+    def connections(self) -> Set[str]:
+        """Symbols currently subscribed upstream"""
+        return set(self.subscriptions)
+    
+    async def subscribe(self, symbol: str, callback: Optional[Callable] = None):
+        """Stream trades for a symbol, calling callback with each message of its trades"""
+        if callback is not None and callback not in self.callbacks.setdefault(symbol, []):
             self.callbacks[symbol].append(callback)
-            
-        if symbol not in self.connections:
-            # Use free data sources
-            ws_url = f"wss://ws.finnhub.io?symbol={symbol}"
-            
-            retries = 0
-            while retries < self.config['websocket']['max_retries']:
-                try:
-                    self.connections[symbol] = await websockets.connect(ws_url)
-                    logger.info(f"Connected to websocket for {symbol}")
-                    break
-                except Exception as e:
-                    logger.error(f"Failed to connect to {symbol}: {e}")
-                    retries += 1
-                    await asyncio.sleep(self.config['websocket']['reconnect_interval'])
-    
-    async def disconnect(self, symbol: str):
-        """Disconnect from websocket for a given symbol"""
-        if symbol in self.connections:
-            await self.connections[symbol].close()
-            del self.connections[symbol]
-            logger.info(f"Disconnected from websocket for {symbol}")
+        if symbol not in self.subscriptions:
+            self.subscriptions.add(symbol)
+            await self._send('subscribe', symbol)
+            logger.info(f"Subscribed to {symbol}")
+    
+    async def unsubscribe(self, symbol: str, callback: Optional[Callable] = None):
+        """Remove a callback, or all of them, and stop streaming the symbol once none are left"""
+        callbacks = self.callbacks.get(symbol, [])
+        if callback is not None and callback in callbacks:
+            callbacks.remove(callback)
+        if callback is None or not callbacks:
+            self.callbacks.pop(symbol, None)
+            if symbol in self.subscriptions:
+                self.subscriptions.discard(symbol)
+                await self._send('unsubscribe', symbol)
+                logger.info(f"Unsubscribed from {symbol}")
+    
+    async def _send(self, action: str, symbol: str):
+        # Before the connection is up, subscriptions are sent by the reader when it connects
+        if self.ws is None:
+            return
+        try:
+            await self.ws.send(json.dumps({'type': action, 'symbol': symbol}))
+        except Exception as e:
+            logger.warning(f"Could not {action} {symbol}, will resubscribe on reconnect: {e}")
     
     async def start_listening(self):
-        """Start listening to all websocket connections"""
+        """Run the reader and dispatcher until stop() is called or reconnecting gives up"""
         self.running = True
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        dispatcher = asyncio.create_task(self._dispatch_loop()) if self.sink is None else None
+        try:
+            await self._read_loop()
+        finally:
+            if dispatcher is not None:
+                dispatcher.cancel()
+            self.running = False
+    
+    async def _read_loop(self):
+        failures = 0
+        url = f"{self.url}?token={self.token}" if self.token else self.url
         while self.running:
-            for symbol, ws in self.connections.items():
-                try:
-                    message = await ws.recv()
-                    data = json.loads(message)
+            try:
+                async with websockets.connect(url) as ws:
+                    self.ws = ws
+                    failures = 0
+                    for symbol in sorted(self.subscriptions):
+                        await ws.send(json.dumps({'type': 'subscribe', 'symbol': symbol}))
+                    self.connected.set()
+                    logger.info(f"Connected to {self.url} with {len(self.subscriptions)} subscriptions")
+                    if self.on_connect is not None:
+                        self.on_connect()
                     
-                    # Process callbacks
-                    if symbol in self.callbacks:
-                        for callback in self.callbacks[symbol]:
-                            await callback(data)
-                            
-                except websockets.exceptions.ConnectionClosed:
-                    logger.warning(f"Connection closed for {symbol}, attempting to reconnect...")
-                    await self.connect(symbol)
-                except Exception as e:
-                    logger.error(f"Error processing message for {symbol}: {e}")
+                    async for message in ws:
+                        self.received += 1
+                        if self.sink is not None:
+                            self.sink(message)
+                            continue
+                        if self.queue.full():
+                            # A dispatcher this far behind is better served by the newest trades
+                            self.queue.get_nowait()
+                            self.dropped += 1
+                        self.queue.put_nowait(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                logger.warning(f"Websocket connection failed ({failures}/{self.max_retries}): {e}")
+            finally:
+                self.ws = None
+                self.connected.clear()
+            
+            if not self.running:
+                break
+            if failures >= self.max_retries:
+                logger.error(f"Giving up on {self.url} after {failures} failed connects")
+                break
+            # Full jitter keeps many clients from reconnecting in lockstep after an outage
+            backoff = min(self.max_reconnect_interval, self.reconnect_interval * 2 ** failures)
+            self.reconnects += 1
+            await asyncio.sleep(random.uniform(0, backoff))
+    
+    async def _dispatch_loop(self):
+        while True:
+            message = await self.queue.get()
+            try:
+                data = json.loads(message)
+            except ValueError as e:
+                logger.error(f"Unparseable websocket message: {e}")
+                continue
+            if data.get('type') != 'trade':
+                continue
+            
+            trades: Dict[str, List[dict]] = {}
+            for trade in data.get('data', []):
+                trades.setdefault(trade['s'], []).append(trade)
+            for symbol, symbol_trades in trades.items():
+                for callback in list(self.callbacks.get(symbol, [])):
+                    try:
+                        await callback({'type': 'trade', 'data': symbol_trades})
+                    except Exception as e:
+                        logger.error(f"Error processing message for {symbol}: {e}")
     
     def stop(self):
-        """Stop listening to all websocket connections"""
+        """Stop listening; the open connection is closed by close_all"""
         self.running = False
-        
+    
     async def close_all(self):
-        """Close all websocket connections"""
-        for symbol in list(self.connections.keys()):
-            await self.disconnect(symbol)
-            
+        """Close the upstream connection and forget every subscription"""
+        self.subscriptions.clear()
+        self.callbacks.clear()
+        if self.ws is not None:
+            await self.ws.close()
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            'subscriptions': len(self.subscriptions),
+            'received': self.received,
+            'dropped': self.dropped,
+            'reconnects': self.reconnects,
+            'queued': self.queue.qsize() if self.queue is not None else 0
+        }
+
+# Ingest stages: raw frames -> parse -> quote table and live indicators -> subscriber callbacks
+DEFAULT_STAGES = {
+    'parse': {'concurrency': 1, 'queue_size': 10000, 'policy': 'drop_oldest'},
+    'quotes': {'concurrency': 1, 'queue_size': 10000, 'policy': 'block'},
+    'fanout': {'concurrency': 4, 'queue_size': 5000, 'policy': 'coalesce'}
+}
+
 class DataStreamManager:
+    """Streams trades from the upstream websocket through a staged ingest pipeline
+    
+    The socket reader only hands raw frames to the parse stage, so a slow
+    subscriber never stalls the connection. Parsed trades update the quote
+    table, live OHLCV bars and live indicators in order, and subscriber callbacks run in the
+    fanout stage, where pending updates for a symbol coalesce into its latest
+    price when callbacks fall behind.
+    """
+
     def __init__(self):
         self.ws_manager = WebSocketManager()
-        self.cache = {}
+        # Streaming indicator state per symbol, seeded from closed bars
+        self.indicator_states: Dict[str, IndicatorState] = {}
+        # High/low/volume of the bar currently forming from trades, and when its session ends
+        self.forming_bars: Dict[str, Dict[str, float]] = {}
+        # Timezone of each symbol's seeded bars; a new date there starts a new bar
+        self.bar_timezones: Dict[str, str] = {}
+        self.live_indicators: Dict[str, Dict[str, float]] = {}
+        # symbol -> callbacks awaited with (symbol, price, indicators)
+        self.callbacks: Dict[str, List[Callable]] = {}
+        
+        config = self.ws_manager.config.get('pipeline', {})
         
+        def stage(name, handler, key=None):
+            options = {**DEFAULT_STAGES[name], **config.get(name, {})}
+            return Stage(name, handler, options['concurrency'], options['queue_size'], options['policy'], key)
+        
+        self.pipeline = Pipeline([
+            stage('parse', self._parse),
+            # Keyed by symbol so each symbol's trades are applied in order
+            stage('quotes', self._apply_trade, key=lambda trade: trade['s']),
+            stage('fanout', self._fan_out, key=lambda symbol: symbol)
+        ])
+    
+    async def subscribe(self, symbol: str, callback: Optional[Callable] = None):
+        """Stream a symbol, awaiting callback with (symbol, price, indicators) on its updates"""
+        if callback is not None and callback not in self.callbacks.setdefault(symbol, []):
+            self.callbacks[symbol].append(callback)
+        await self.ws_manager.subscribe(symbol)
+    
+    async def unsubscribe(self, symbol: str, callback: Optional[Callable] = None):
+        """Remove a callback, or all of them, and stop streaming the symbol once none are left"""
+        callbacks = self.callbacks.get(symbol, [])
+        if callback is not None and callback in callbacks:
+            callbacks.remove(callback)
+        if callback is None or not callbacks:
+            self.callbacks.pop(symbol, None)
+            await self.ws_manager.unsubscribe(symbol)
+            self._forget(symbol)
+    
+    def _forget(self, symbol: str):
+        """Drop live bars and indicator state that stop being complete once trades stop arriving"""
+        bar_aggregator.drop(symbol)
+        self.indicator_states.pop(symbol, None)
+        self.forming_bars.pop(symbol, None)
+        self.live_indicators.pop(symbol, None)
+        self.bar_timezones.pop(symbol, None)
+    
+    async def run(self):
+        """Run the upstream connection and the pipeline until streaming stops"""
+        self.ws_manager.sink = self.pipeline.submit
+        # Trades missed while disconnected leave a gap in the live bars
+        self.ws_manager.on_connect = lambda: bar_aggregator.mark_gap(self.ws_manager.subscriptions)
+        self.pipeline.start()
+        try:
+            await self.ws_manager.start_listening()
+        finally:
+            await self.pipeline.stop()
+    
     async def start_streaming(self, symbols: List[str], callback: Callable):
         """Start streaming data for given symbols"""
         for symbol in symbols:
-            await self.ws_manager.connect(symbol, callback)
-        await self.ws_manager.start_listening()
-        
+            await self.subscribe(symbol, callback)
+        await self.run()
+    
     async def stop_streaming(self):
         """Stop streaming all data"""
+        self.callbacks.clear()
+        for symbol in list(self.ws_manager.subscriptions):
+            self._forget(symbol)
         self.ws_manager.stop()
         await self.ws_manager.close_all()
-        
+    
+    def stats(self) -> Dict[str, Dict]:
+        """Upstream counters, per-stage queue depth, drops and latency, and live bar counters"""
+        return {'upstream': self.ws_manager.stats(), 'stages': self.pipeline.stats(), 'bars': bar_aggregator.stats()}
+    
+    @staticmethod
+    def _parse(message: str) -> Optional[List[dict]]:
+        data = json.loads(message)
+        if data.get('type') != 'trade':
+            return None
+        return [trade for trade in data.get('data', []) if 's' in trade and 'p' in trade]
+    
+    def _apply_trade(self, trade: dict) -> Optional[str]:
+        symbol = trade['s']
+        # Trade times are epoch milliseconds
+        timestamp = trade['t'] / 1000 if 't' in trade else None
+        quote_table.update(symbol, last=trade['p'], timestamp=timestamp)
+        bar_aggregator.add_trade(symbol, trade['p'], trade.get('v', 0.0), timestamp)
+        self._update_live_indicators(symbol, trade['p'], trade.get('v', 0.0), timestamp)
+        return symbol if symbol in self.callbacks else None
+    
+    async def _fan_out(self, symbol: str):
+        price = quote_table.last(symbol)
+        indicators = self.get_live_indicators(symbol)
+        for callback in list(self.callbacks.get(symbol, [])):
+            try:
+                await callback(symbol, price, indicators)
+            except Exception as e:
+                logger.error(f"Error in stream callback for {symbol}: {e}")
+    
     def get_latest_price(self, symbol: str) -> Optional[float]:
-        """Get latest cached price for a symbol"""
-        return self.cache.get(symbol)
+        """Get latest price for a symbol from the shared quote table"""
+        return quote_table.last(symbol)
+    
+    def seed_indicators(self, symbol: str, history: pd.DataFrame, now: Optional[float] = None):
+        """Initialize streaming indicators for a symbol from its daily bars
         
+        During a session the last bar is today's, still forming; it becomes the
+        forming bar that trades extend instead of being folded in as closed.
+        """
+        if history is None or history.empty:
+            return
+        self.bar_timezones[symbol] = str(getattr(history.index, 'tz', None) or 'UTC')
+        self.forming_bars.pop(symbol, None)
+        
+        ends = self._session_end(symbol, now if now is not None else time.time())
+        last = history.index[-1]
+        last = last.timestamp() if last.tzinfo is not None else last.tz_localize('UTC').timestamp()
+        forming = None
+        if len(history) > 1 and self._session_end(symbol, last) == ends:
+            forming = history.iloc[-1]
+            history = history.iloc[:-1]
+        
+        state = self.indicator_states[symbol] = IndicatorState.from_history(history)
+        if forming is not None:
+            bar = self.forming_bars[symbol] = {'high': float(forming['High']), 'low': float(forming['Low']),
+                                               'close': float(forming['Close']), 'volume': float(forming['Volume']),
+                                               'ends': ends}
+            self.live_indicators[symbol] = state.peek(bar['high'], bar['low'], bar['close'], bar['volume'])
+    
+    def commit_bar(self, symbol: str):
+        """Close the forming bar for a symbol, folding it into the indicator state"""
+        bar = self.forming_bars.pop(symbol, None)
+        state = self.indicator_states.get(symbol)
+        if bar is not None and state is not None:
+            self.live_indicators[symbol] = state.update(bar['high'], bar['low'], bar['close'], bar['volume'])
+    
+    def get_live_indicators(self, symbol: str) -> Optional[Dict[str, float]]:
+        """Get indicators as of the latest trade for a symbol"""
+        return self.live_indicators.get(symbol)
+    
     async def price_update_callback(self, data: dict):
-        """Callback for price updates"""
+        """Apply a trade message directly, outside the pipeline"""
         if 'data' in data:
             for trade in data['data']:
-                symbol = trade['s']
-                price = trade['p']
-                self.cache[symbol] = price
\ No newline at end of file
+                self._apply_trade(trade)
+    
+    def _session_end(self, symbol: str, timestamp: float) -> float:
+        """Epoch seconds at which the daily bar holding timestamp ends, midnight in the symbol's bar timezone"""
+        moment = pd.Timestamp(timestamp, unit='s', tz='UTC').tz_convert(self.bar_timezones.get(symbol, 'UTC'))
+        return (moment.normalize() + pd.DateOffset(days=1)).timestamp()
+    
+    def _update_live_indicators(self, symbol: str, price: float, volume: float, timestamp: Optional[float] = None):
+        """Re-evaluate indicators for the forming bar; O(1) per trade"""
+        state = self.indicator_states.get(symbol)
+        if state is None:
+            return
+        
+        timestamp = timestamp if timestamp is not None else time.time()
+        bar = self.forming_bars.get(symbol)
+        if bar is not None and timestamp >= bar['ends']:
+            # The first trade of a new session closes the previous day's bar
+            self.commit_bar(symbol)
+            bar = None
+        if bar is None:
+            bar = self.forming_bars[symbol] = {'high': price, 'low': price, 'close': price, 'volume': 0.0,
+                                               'ends': self._session_end(symbol, timestamp)}
+        bar['high'] = max(bar['high'], price)
+        bar['low'] = min(bar['low'], price)
+        bar['close'] = price
+        bar['volume'] += volume or 0.0
+        
+        self.live_indicators[symbol] = state.peek(bar['high'], bar['low'], price, bar['volume'])
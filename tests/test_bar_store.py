@@ -0,0 +1,21 @@
+import multiprocessing
+import numpy as np
+import pandas as pd
+from services.bar_store import BarStore
+
+def write_days(root: str, offset: int) -> None:
+    store = BarStore(root=root)
+    for day in range(offset, 40, 4):
+        index = pd.DatetimeIndex([pd.Timestamp('2024-01-01', tz='UTC') + pd.Timedelta(days=day)])
+        store.write('AAA', '1d', pd.DataFrame({'Close': [float(day)]}, index=index))
+
+def test_concurrent_writers_in_separate_processes_keep_every_bar(tmp_path):
+    writers = [multiprocessing.get_context('spawn').Process(target=write_days, args=(str(tmp_path), offset))
+               for offset in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    
+    stored = BarStore(root=str(tmp_path)).read('AAA', '1d')
+    assert np.array_equal(stored['Close'].to_numpy(), np.arange(40, dtype=float))
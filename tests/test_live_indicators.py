@@ -0,0 +1,98 @@
+import asyncio
+import numpy as np
+import pandas as pd
+from services.data_providers import create_provider
+from services.market_data import MarketDataService
+from services.websocket import DataStreamManager
+from utils.indicators import compute_indicators
+from utils.online_indicators import IndicatorState
+
+def daily_bars(days: int) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+    index = pd.date_range('2024-01-02', periods=days, freq='D', tz='America/New_York')
+    return pd.DataFrame({
+        'Open': close,
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': rng.integers(1_000, 5_000, days).astype(float)
+    }, index=index)
+
+def test_trades_across_two_sessions_match_batch_indicators():
+    history = daily_bars(80)
+    stream = DataStreamManager()
+    stream.seed_indicators('AAA', history)
+    
+    # Two sessions of trades after the seeded history, at 10:00, 12:00 and 15:00 New York time
+    sessions = [history.index[-1] + pd.Timedelta(days=1), history.index[-1] + pd.Timedelta(days=2)]
+    trades = {sessions[0]: [(101.0, 100), (99.5, 250), (100.5, 50)],
+              sessions[1]: [(102.0, 300), (103.5, 20), (102.5, 80)]}
+    for day, ticks in trades.items():
+        for hour, (price, volume) in zip((10, 12, 15), ticks):
+            timestamp = (day + pd.Timedelta(hours=hour)).timestamp()
+            stream._apply_trade({'s': 'AAA', 'p': price, 'v': volume, 't': timestamp * 1000})
+    
+    streamed = pd.DataFrame([
+        {'Open': ticks[0][0], 'High': max(p for p, _ in ticks), 'Low': min(p for p, _ in ticks),
+         'Close': ticks[-1][0], 'Volume': float(sum(v for _, v in ticks))}
+        for ticks in trades.values()
+    ], index=pd.DatetimeIndex(sessions))
+    expected = compute_indicators(pd.concat([history, streamed]))
+    
+    # The first session's bar was committed, the second is still forming
+    assert stream.indicator_states['AAA'].bars == len(history) + 1
+    live = stream.get_live_indicators('AAA')
+    for name in ('SMA_20', 'SMA_50', 'EMA_12', 'MACD', 'Signal_Line', 'RSI', 'BB_upper', 'ATR', 'Volume_Ratio'):
+        assert np.isclose(live[name], expected[name][-1]), name
+
+def test_todays_partial_bar_keeps_forming_after_seeding():
+    history = daily_bars(80)
+    now = (history.index[-1] + pd.Timedelta(hours=11)).timestamp()
+    stream = DataStreamManager()
+    stream.seed_indicators('AAA', history, now=now)
+    
+    # The seeded partial bar is extended by the trade, not followed by another bar
+    assert stream.indicator_states['AAA'].bars == len(history) - 1
+    stream._apply_trade({'s': 'AAA', 'p': history['High'].iloc[-1] + 1, 'v': 10, 't': (now + 60) * 1000})
+    
+    today = history.iloc[-1:].copy()
+    today['High'] = history['High'].iloc[-1] + 1
+    today['Close'] = today['High']
+    today['Volume'] += 10
+    expected = compute_indicators(pd.concat([history.iloc[:-1], today]))
+    live = stream.get_live_indicators('AAA')
+    for name in ('SMA_20', 'MACD', 'RSI', 'ATR', 'Volume_Ratio'):
+        assert np.isclose(live[name], expected[name][-1]), name
+
+def test_resubscribing_reseeds_from_fresh_history(monkeypatch):
+    market_data = MarketDataService(provider=create_provider('replay'))
+    market_data.stream = DataStreamManager()
+    
+    async def run():
+        pass
+    
+    monkeypatch.setattr(market_data.stream, 'run', run)
+    history = {'AAA': daily_bars(80)}
+    
+    async def get_history(symbols, period='1y', interval='1d'):
+        return {symbol: history[symbol] for symbol in symbols}
+    
+    monkeypatch.setattr(market_data, 'get_historical_data_batch_async', get_history)
+    
+    async def scenario():
+        await market_data.start_streaming(['AAA'])
+        day = history['AAA'].index[-1] + pd.Timedelta(days=1, hours=10)
+        market_data.stream._apply_trade({'s': 'AAA', 'p': 250.0, 'v': 1e6, 't': day.timestamp() * 1000})
+        await market_data.stop_streaming(['AAA'])
+        
+        # Sessions pass while nobody streams the symbol, then it is streamed again
+        history['AAA'] = daily_bars(83)
+        await market_data.start_streaming(['AAA'])
+        day = history['AAA'].index[-1] + pd.Timedelta(days=1, hours=10)
+        market_data.stream._apply_trade({'s': 'AAA', 'p': 101.0, 'v': 10, 't': day.timestamp() * 1000})
+    
+    asyncio.run(scenario())
+    
+    assert market_data.stream.indicator_states['AAA'].state() == IndicatorState.from_history(history['AAA']).state()
+    assert market_data.stream.forming_bars['AAA']['high'] == 101.0
@@ -0,0 +1,40 @@
+import uuid
+from types import SimpleNamespace
+import pandas as pd
+from services import shared_segment
+from services.quote_table import QuoteTable
+from utils.cache_manager import cache_manager
+
+def publish_quote(segment, symbol: str, price: float) -> None:
+    table = QuoteTable()
+    table.update(symbol, last=price)
+    segment.publish(table.snapshot(), {})
+
+def test_reader_reattaches_after_the_segment_is_recreated(monkeypatch):
+    name = f"tq-test-{uuid.uuid4().hex[:8]}"
+    monkeypatch.setitem(cache_manager.config, 'shared_memory',
+                        {'enabled': True, 'name': name, 'stale_after': 15, 'attach_retry': 0})
+    monkeypatch.setattr(shared_segment, '_attached', None)
+    monkeypatch.setattr(shared_segment, '_next_attach', 0.0)
+    # Reader and writer share this process, so the writer keeps the tracker registration
+    monkeypatch.setattr(shared_segment, 'resource_tracker', SimpleNamespace(unregister=lambda *args: None))
+    
+    first = shared_segment.SharedSegment.create(name, capacity=8, bar_capacity=4)
+    second = None
+    try:
+        publish_quote(first, 'AAA', 100.0)
+        assert shared_segment.get_shared_segment().quotes_for(['AAA'])['AAA']['last'] == 100.0
+        
+        # The ingest process restarts: its old segment stops publishing and a new one replaces it
+        first.header[shared_segment.HEADER_HEARTBEAT] = 0
+        second = shared_segment.SharedSegment.create(name, capacity=8, bar_capacity=4)
+        publish_quote(second, 'AAA', 105.0)
+        
+        assert shared_segment.get_shared_segment() is None
+        reader = shared_segment.get_shared_segment()
+        assert reader is not None and reader.quotes_for(['AAA'])['AAA']['last'] == 105.0
+    finally:
+        first.close()
+        if second is not None:
+            second.close()
+            second.unlink()
@@ -0,0 +1,22 @@
+import asyncio
+from services.data_providers import create_provider
+from services.executor import executor, run_blocking
+from services.market_data import MarketDataService
+from utils.cache_manager import bar_cache
+
+def test_sync_callers_on_the_pool_do_not_deadlock_async_leaders():
+    bar_cache.clear()
+    market_data = MarketDataService(provider=create_provider('replay'))
+    # Long enough for the sync callers to fill the pool while the async fetch is in flight
+    market_data.provider.latency = 0.2
+    
+    async def scenario():
+        leader = asyncio.create_task(market_data.get_historical_data_batch_async(['AAPL'], '1y', '1d'))
+        await asyncio.sleep(0.05)
+        followers = [run_blocking(market_data.get_historical_data, 'AAPL', '1y', '1d')
+                     for _ in range(executor._max_workers + 2)]
+        return await asyncio.wait_for(asyncio.gather(leader, *followers), timeout=10)
+    
+    leader, *followers = asyncio.run(scenario())
+    assert not leader['AAPL'].empty
+    assert all(not data.empty for data in followers)
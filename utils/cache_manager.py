@@ -1,11 +1,15 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Hashable, List, Optional, Tuple
 from datetime import datetime, timedelta
+from collections import OrderedDict
 import yaml
 import os
 import logging
 from functools import wraps
 import json
 import hashlib
+import sys
+import threading
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -56,9 +60,118 @@ class CacheManager:
             for key in keys_to_delete:
                 del self.cache[key]
 
+class BarCache:
+    """Process-wide LRU cache for bar frames with per-entry TTLs and a byte budget"""
+    
+    def __init__(self, default_ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+        cache_config = cache_manager.config.get('cache', {})
+        self.default_ttl = default_ttl or cache_config.get('stock_data', 300)
+        self.max_bytes = max_bytes or int(cache_config.get('bar_cache_max_mb', 512)) * 1024 * 1024
+        self._entries: "OrderedDict[Hashable, Dict]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def _sizeof(value: Any) -> int:
+        """Estimate the memory held by a cached value in bytes"""
+        if hasattr(value, 'memory_usage') and callable(value.memory_usage):
+            try:
+                usage = value.memory_usage(deep=True)
+                return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+            except Exception:
+                pass
+        if isinstance(value, dict):
+            return sum(BarCache._sizeof(item) for item in value.values())
+        nbytes = getattr(value, 'nbytes', None)
+        if isinstance(nbytes, int):
+            return nbytes
+        return sys.getsizeof(value)
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a value if present and not expired, marking it most recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if time.monotonic() >= entry['expiry']:
+                # Expired entries stay around for get_stale until evicted
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['value']
+    
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """Get a value even if its TTL has passed, for incremental refreshes"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry['value'] if entry is not None else None
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting least recently used entries past the byte budget"""
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                logger.warning(f"Not caching {key}: {size} bytes exceeds bar cache budget")
+                return
+            self._entries[key] = {
+                'value': value,
+                'size': size,
+                'expiry': time.monotonic() + (ttl if ttl is not None else self.default_ttl)
+            }
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+    
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of every (key, value), including expired entries, without touching LRU order"""
+        with self._lock:
+            return [(key, entry['value']) for key, entry in self._entries.items()]
+    
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+    
+    def clear(self) -> None:
+        """Drop every entry and reset the byte count"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and memory usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+    
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry['size']
+
 # Global cache manager instance
 cache_manager = CacheManager()
 
+# Process-wide bar cache shared by every MarketDataService instance
+bar_cache = BarCache()
+
 def cached(expiry_seconds: Optional[int] = None):
     """Decorator for caching function results"""
     def decorator(func):
@@ -109,6 +222,8 @@ def streamlit_cache(ttl_seconds: Optional[int] = None):
 def clear_cache(pattern: Optional[str] = None) -> None:
     """Clear cache entries matching pattern or all if pattern is None"""
     cache_manager.clear(pattern)
+    if pattern is None:
+        bar_cache.clear()
     
     # Also clear Streamlit cache if running in Streamlit
     try:
@@ -0,0 +1,155 @@
+"""Numba-compiled loops behind utils.indicators
+
+Every kernel works on a 2-D (time x symbol) float64 array; 1-D series are
+passed as a single column. Compiled code is cached on disk (cache=True) so
+only the first run on a machine pays the compile cost. Without numba,
+NUMBA_AVAILABLE is False and utils.indicators uses its NumPy versions.
+"""
+import logging
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+@njit(cache=True)
+def ema(x, alpha):
+    rows, columns = x.shape
+    out = np.empty_like(x)
+    for j in range(columns):
+        prev = np.nan
+        for t in range(rows):
+            value = x[t, j]
+            if not np.isnan(value):
+                if np.isnan(prev):
+                    prev = value
+                else:
+                    prev = alpha * value + (1 - alpha) * prev
+            out[t, j] = prev
+    return out
+
+@njit(cache=True)
+def rolling_mean(x, window):
+    rows, columns = x.shape
+    out = np.full_like(x, np.nan)
+    for j in range(columns):
+        total = 0.0
+        missing = 0
+        for t in range(rows):
+            value = x[t, j]
+            if np.isnan(value):
+                missing += 1
+            else:
+                total += value
+            if t >= window:
+                old = x[t - window, j]
+                if np.isnan(old):
+                    missing -= 1
+                else:
+                    total -= old
+            if t >= window - 1 and missing == 0:
+                out[t, j] = total / window
+    return out
+
+@njit(cache=True)
+def rolling_std(x, window, ddof):
+    rows, columns = x.shape
+    out = np.full_like(x, np.nan)
+    for j in range(columns):
+        # Sums relative to the first valid value keep the variance formula stable
+        offset = np.nan
+        for t in range(rows):
+            if not np.isnan(x[t, j]):
+                offset = x[t, j]
+                break
+        if np.isnan(offset):
+            continue
+        
+        total = 0.0
+        squares = 0.0
+        missing = 0
+        for t in range(rows):
+            value = x[t, j]
+            if np.isnan(value):
+                missing += 1
+            else:
+                total += value - offset
+                squares += (value - offset) ** 2
+            if t >= window:
+                old = x[t - window, j]
+                if np.isnan(old):
+                    missing -= 1
+                else:
+                    total -= old - offset
+                    squares -= (old - offset) ** 2
+            if t >= window - 1 and missing == 0:
+                variance = (squares - total * total / window) / (window - ddof)
+                out[t, j] = np.sqrt(max(variance, 0.0))
+    return out
+
+@njit(cache=True)
+def true_range(high, low, close):
+    rows, columns = close.shape
+    out = np.empty_like(close)
+    for j in range(columns):
+        for t in range(rows):
+            value = high[t, j] - low[t, j]
+            if t > 0:
+                prev_close = close[t - 1, j]
+                # NaN-skipping max, as np.fmax
+                for candidate in (abs(high[t, j] - prev_close), abs(low[t, j] - prev_close)):
+                    if np.isnan(value) or candidate > value:
+                        value = candidate
+            out[t, j] = value
+    return out
+
+@njit(cache=True)
+def atr(high, low, close, period):
+    return rolling_mean(true_range(high, low, close), period)
+
+@njit(cache=True)
+def wilder_average(gain, loss, period):
+    """Wilder-smoothed average gain and loss, seeded by the first period's means"""
+    rows, columns = gain.shape
+    avg_gain = np.full_like(gain, np.nan)
+    avg_loss = np.full_like(loss, np.nan)
+    if rows <= period:
+        return avg_gain, avg_loss
+    for j in range(columns):
+        g = 0.0
+        l = 0.0
+        for t in range(1, period + 1):
+            g += gain[t, j]
+            l += loss[t, j]
+        g /= period
+        l /= period
+        avg_gain[period, j] = g
+        avg_loss[period, j] = l
+        for t in range(period + 1, rows):
+            g = (g * (period - 1) + gain[t, j]) / period
+            l = (l * (period - 1) + loss[t, j]) / period
+            avg_gain[t, j] = g
+            avg_loss[t, j] = l
+    return avg_gain, avg_loss
+
+def warm_up() -> None:
+    """Compile (or load from the on-disk cache) every kernel before the first real request"""
+    if not NUMBA_AVAILABLE:
+        return
+    sample = np.random.default_rng(0).random((64, 2)) + 1.0
+    ema(sample, 0.5)
+    rolling_mean(sample, 5)
+    rolling_std(sample, 5, 1)
+    atr(sample + 1.0, sample, sample + 0.5, 5)
+    wilder_average(sample, sample, 5)
+    logger.info("Numba indicator kernels ready")
@@ -0,0 +1,386 @@
+import math
+import re
+import logging
+from typing import Dict, Hashable, Iterable, Mapping, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from utils import indicator_kernels as kernels
+from utils.cache_manager import BarCache, cache_manager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Indicator parameters shared by every consumer
+RSI_PERIOD = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+BB_WINDOW = 20
+BB_STD = 2
+VOLUME_WINDOW = 20
+ROC_PERIOD = 12
+MOM_PERIOD = 10
+ATR_PERIOD = 14
+VOLATILITY_WINDOW = 20
+
+# Columns MarketDataService attaches to every cached history frame
+DEFAULT_INDICATORS = (
+    'SMA_20', 'SMA_50', 'EMA_12', 'EMA_26', 'MACD', 'Signal_Line', 'RSI',
+    'BB_middle', 'BB_upper', 'BB_lower', 'Volume_SMA', 'Volume_Ratio',
+    'ROC', 'MOM', 'ATR'
+)
+
+# Extra features used by the prediction models
+PREDICTOR_INDICATORS = ('Returns', 'Volatility')
+
+ArrayMap = Mapping[str, np.ndarray]
+
+def _empty_like(x: np.ndarray) -> np.ndarray:
+    return np.full(x.shape, np.nan)
+
+def shift(x: np.ndarray, n: int = 1) -> np.ndarray:
+    """Shift values forward by n rows, padding with NaN"""
+    out = _empty_like(x)
+    if n < len(x):
+        out[n:] = x[:len(x) - n]
+    return out
+
+def _as_columns(x: np.ndarray) -> np.ndarray:
+    """View a series or panel as a contiguous float64 (time x symbol) array for the kernels"""
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    return x.reshape(len(x), -1)
+
+def _compiled(kernel, x: np.ndarray, *args) -> np.ndarray:
+    return kernel(_as_columns(x), *args).reshape(np.shape(x))
+
+def _window_sums(x: np.ndarray, window: int, squares: bool = False):
+    """Trailing window sums of x (and x squared) via cumulative sums, for 2-D panels
+    
+    Windows containing a NaN come back as NaN, like pandas rolling with min_periods=window.
+    """
+    missing = np.isnan(x)
+    filled = np.where(missing, 0.0, x)
+    
+    def trailing(values):
+        cumulative = np.cumsum(values, axis=0)
+        sums = cumulative[window - 1:].copy()
+        sums[1:] -= cumulative[:-window]
+        return sums
+    
+    gaps = trailing(missing.astype(np.int32)) > 0
+    total = trailing(filled)
+    total[gaps] = np.nan
+    if not squares:
+        return total, None
+    squared = trailing(filled * filled)
+    squared[gaps] = np.nan
+    return total, squared
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over window rows; NaN until the window is full"""
+    if kernels.NUMBA_AVAILABLE:
+        return _compiled(kernels.rolling_mean, x, window)
+    out = _empty_like(x)
+    if len(x) < window:
+        return out
+    if x.ndim == 1:
+        out[window - 1:] = sliding_window_view(x, window).mean(axis=-1)
+    else:
+        total, _ = _window_sums(x, window)
+        out[window - 1:] = total / window
+    return out
+
+def rolling_std(x: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    """Trailing sample standard deviation over window rows"""
+    if kernels.NUMBA_AVAILABLE:
+        return _compiled(kernels.rolling_std, x, window, ddof)
+    out = _empty_like(x)
+    if len(x) < window:
+        return out
+    if x.ndim == 1:
+        out[window - 1:] = sliding_window_view(x, window).std(axis=-1, ddof=ddof)
+    else:
+        # Centering each column first keeps the sum-of-squares formula numerically stable
+        with np.errstate(invalid='ignore'):
+            centered = x - np.nanmean(x, axis=0)
+        total, squared = _window_sums(centered, window, squares=True)
+        variance = (squared - total * total / window) / (window - ddof)
+        out[window - 1:] = np.sqrt(np.maximum(variance, 0.0))
+    return out
+
+def ema(x: np.ndarray, span: int) -> np.ndarray:
+    """Exponential moving average matching pandas ewm(span=span, adjust=False)
+    
+    Leading NaNs stay NaN; later gaps carry the previous average forward.
+    """
+    alpha = 2 / (span + 1)
+    if kernels.NUMBA_AVAILABLE:
+        return _compiled(kernels.ema, x, alpha)
+    out = _empty_like(x)
+    if x.ndim == 1:
+        # Plain float recurrence; np.where per element would dominate for a single series
+        prev = np.nan
+        for t, value in enumerate(x.tolist()):
+            if not math.isnan(value):
+                prev = value if math.isnan(prev) else alpha * value + (1 - alpha) * prev
+            out[t] = prev
+        return out
+    
+    prev = np.full(x.shape[1:], np.nan)
+    for t in range(len(x)):
+        value = x[t]
+        current = np.where(np.isnan(prev), value, alpha * value + (1 - alpha) * prev)
+        prev = np.where(np.isnan(value), prev, current)
+        out[t] = prev
+    return out
+
+def diff(x: np.ndarray, n: int = 1) -> np.ndarray:
+    return x - shift(x, n)
+
+def pct_change(x: np.ndarray, n: int = 1) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return x / shift(x, n) - 1
+
+def rsi(close: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """Relative Strength Index from simple averages of gains and losses"""
+    delta = diff(close)
+    gain = rolling_mean(np.where(delta > 0, delta, 0.0), period)
+    loss = rolling_mean(np.where(delta < 0, -delta, 0.0), period)
+    return _rsi_from_averages(gain, loss)
+
+def _rsi_from_averages(gain: np.ndarray, loss: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + gain / loss)
+
+def wilder_rsi(close: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """Relative Strength Index with Wilder smoothing, seeded by the first period's simple averages"""
+    delta = diff(close)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    if kernels.NUMBA_AVAILABLE:
+        avg_gain, avg_loss = kernels.wilder_average(_as_columns(gain), _as_columns(loss), period)
+        return _rsi_from_averages(avg_gain, avg_loss).reshape(np.shape(close))
+    
+    out = _empty_like(close)
+    if len(close) <= period:
+        return out
+    
+    avg_gain = gain[1:period + 1].mean(axis=0)
+    avg_loss = loss[1:period + 1].mean(axis=0)
+    out[period] = _rsi_from_averages(avg_gain, avg_loss)
+    for t in range(period + 1, len(close)):
+        avg_gain = (avg_gain * (period - 1) + gain[t]) / period
+        avg_loss = (avg_loss * (period - 1) + loss[t]) / period
+        out[t] = _rsi_from_averages(avg_gain, avg_loss)
+    return out
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    if kernels.NUMBA_AVAILABLE:
+        return kernels.true_range(_as_columns(high), _as_columns(low), _as_columns(close)).reshape(np.shape(close))
+    prev_close = shift(close)
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = ATR_PERIOD) -> np.ndarray:
+    """Average True Range as a simple average of true range"""
+    return rolling_mean(true_range(high, low, close), period)
+
+def macd(close: np.ndarray, fast: int = MACD_FAST, slow: int = MACD_SLOW,
+         signal: int = MACD_SIGNAL) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD line, signal line and histogram (line minus signal)"""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+class _IndicatorContext:
+    """Memoizes intermediates so a set of indicators shares one pass over the bars"""
+    
+    PARAMETRIC = re.compile(r'^(SMA|EMA|STD)_(\d+)$')
+    
+    def __init__(self, bars: ArrayMap):
+        self.bars = bars
+        self.values: Dict[str, np.ndarray] = {}
+    
+    def column(self, name: str) -> np.ndarray:
+        return np.asarray(self.bars[name], dtype=float)
+    
+    def get(self, name: str) -> np.ndarray:
+        if name not in self.values:
+            self.values[name] = self._compute(name)
+        return self.values[name]
+    
+    def _compute(self, name: str) -> np.ndarray:
+        match = self.PARAMETRIC.match(name)
+        if match:
+            kind, window = match.group(1), int(match.group(2))
+            close = self.column('Close')
+            if kind == 'SMA':
+                return rolling_mean(close, window)
+            if kind == 'EMA':
+                return ema(close, window)
+            return rolling_std(close, window)
+        
+        if name == 'MACD':
+            return self.get(f'EMA_{MACD_FAST}') - self.get(f'EMA_{MACD_SLOW}')
+        if name == 'Signal_Line':
+            return ema(self.get('MACD'), MACD_SIGNAL)
+        if name == 'MACD_Hist':
+            return self.get('MACD') - self.get('Signal_Line')
+        if name == 'RSI':
+            return rsi(self.column('Close'))
+        if name == 'RSI_Wilder':
+            return wilder_rsi(self.column('Close'))
+        if name == 'BB_middle':
+            return self.get(f'SMA_{BB_WINDOW}')
+        if name == 'BB_upper':
+            return self.get('BB_middle') + self.get(f'STD_{BB_WINDOW}') * BB_STD
+        if name == 'BB_lower':
+            return self.get('BB_middle') - self.get(f'STD_{BB_WINDOW}') * BB_STD
+        if name == 'Volume_SMA':
+            return rolling_mean(self.column('Volume'), VOLUME_WINDOW)
+        if name == 'Volume_Ratio':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return self.column('Volume') / self.get('Volume_SMA')
+        if name == 'ROC':
+            return pct_change(self.column('Close'), ROC_PERIOD) * 100
+        if name == 'MOM':
+            return diff(self.column('Close'), MOM_PERIOD)
+        if name == 'ATR':
+            return atr(self.column('High'), self.column('Low'), self.column('Close'))
+        if name == 'Returns':
+            return pct_change(self.column('Close'))
+        if name == 'Volatility':
+            return rolling_std(self.get('Returns'), VOLATILITY_WINDOW)
+        
+        raise ValueError(f"Unknown indicator: {name}")
+
+def compute_indicators(bars: Union[pd.DataFrame, ArrayMap],
+                       names: Iterable[str] = DEFAULT_INDICATORS) -> Dict[str, np.ndarray]:
+    """Compute a declared set of indicators over OHLCV columns"""
+    context = _IndicatorContext(bars)
+    return {name: context.get(name) for name in names}
+
+# Indicators the panel API computes by default
+PANEL_INDICATORS = (
+    'SMA_20', 'SMA_50', 'EMA_12', 'EMA_26', 'MACD', 'Signal_Line', 'RSI',
+    'BB_middle', 'BB_upper', 'BB_lower', 'ATR', 'ROC', 'MOM'
+)
+
+class IndicatorPanel:
+    """Indicators for many symbols held in one (indicator x time x symbol) array"""
+    
+    __slots__ = ('names', 'symbols', 'index', 'values', '_names', '_symbols')
+    
+    def __init__(self, names: Tuple[str, ...], symbols: Tuple[str, ...], index: pd.Index, values: np.ndarray):
+        self.names = names
+        self.symbols = symbols
+        self.index = index
+        self.values = values
+        self._names = {name: i for i, name in enumerate(names)}
+        self._symbols = {symbol: i for i, symbol in enumerate(symbols)}
+    
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Get one indicator as a (time x symbol) view"""
+        return self.values[self._names[name]]
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+    
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+    
+    def latest(self) -> pd.DataFrame:
+        """Last row of every indicator as a (symbol x indicator) frame"""
+        return pd.DataFrame(self.values[:, -1, :].T, index=list(self.symbols), columns=list(self.names))
+    
+    def symbol_frame(self, symbol: str) -> pd.DataFrame:
+        """Indicators for one symbol as a (time x indicator) frame"""
+        column = self._symbols[symbol]
+        return pd.DataFrame(self.values[:, :, column].T, index=self.index, columns=list(self.names))
+
+def build_panel(frames: Mapping[str, pd.DataFrame],
+                fields: Iterable[str] = ('Open', 'High', 'Low', 'Close', 'Volume')) -> Tuple[pd.Index, Dict[str, np.ndarray]]:
+    """Align per-symbol bar frames into (time x symbol) arrays, one per field
+    
+    Rows are the union of all timestamps. Interior gaps are forward-filled
+    (volume as zero) so windowed indicators stay defined; rows before a
+    symbol's first bar stay NaN.
+    """
+    symbols = list(frames)
+    fields = [field for field in fields if all(field in frame.columns for frame in frames.values())]
+    aligned = pd.concat({symbol: frames[symbol][fields] for symbol in symbols}, axis=1).sort_index()
+    
+    panel = {}
+    for field in fields:
+        values = aligned.xs(field, axis=1, level=1)[symbols]
+        started = values.notna().cummax()
+        if field == 'Volume':
+            values = values.fillna(0.0).where(started)
+        else:
+            values = values.ffill()
+        panel[field] = values.to_numpy(dtype=float)
+    
+    return aligned.index, panel
+
+def compute_panel(bars: Union[Mapping[str, pd.DataFrame], ArrayMap], names: Iterable[str] = PANEL_INDICATORS,
+                  symbols: Optional[Iterable[str]] = None, index: Optional[pd.Index] = None) -> IndicatorPanel:
+    """Compute indicators for every symbol at once with column-wise kernels
+    
+    bars is either per-symbol frames or a mapping of field name to a
+    (time x symbol) array, in which case symbols labels its columns.
+    """
+    if bars and all(isinstance(frame, pd.DataFrame) for frame in bars.values()):
+        symbols = tuple(bars)
+        index, bars = build_panel(bars)
+    else:
+        symbols = tuple(symbols) if symbols is not None else tuple(range(np.shape(bars['Close'])[1]))
+        if index is None:
+            index = pd.RangeIndex(np.shape(bars['Close'])[0])
+    
+    names = tuple(names)
+    values = compute_indicators(bars, names)
+    stacked = np.stack([values[name] for name in names]) if names else np.empty((0, len(index), len(symbols)))
+    return IndicatorPanel(names, symbols, index, stacked)
+
+class IndicatorEngine:
+    """Computes indicator sets and caches them per (symbol, bar range, indicator spec)"""
+    
+    def __init__(self):
+        cache_config = cache_manager.config.get('cache', {})
+        self.cache = BarCache(
+            default_ttl=cache_config.get('indicators', 3600),
+            max_bytes=int(cache_config.get('indicator_cache_max_mb', 128)) * 1024 * 1024
+        )
+    
+    @staticmethod
+    def _cache_key(symbol: str, data: pd.DataFrame, names: Tuple[str, ...]) -> Hashable:
+        # The last bar may still be forming, so its close and volume are part of the range identity
+        last = data.iloc[-1]
+        return (symbol, data.index[0], data.index[-1], len(data),
+                float(last['Close']), float(last.get('Volume', np.nan)), names)
+    
+    def compute(self, data: pd.DataFrame, names: Iterable[str] = DEFAULT_INDICATORS,
+                symbol: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """Compute indicators for a bar frame, reusing a cached result for the same symbol and range"""
+        names = tuple(names)
+        if symbol is None or data.empty:
+            return compute_indicators(data, names)
+        
+        key = self._cache_key(symbol, data, names)
+        values = self.cache.get(key)
+        if values is None:
+            values = compute_indicators(data, names)
+            self.cache.set(key, values)
+        return values
+    
+    def add_indicators(self, data: pd.DataFrame, names: Iterable[str] = DEFAULT_INDICATORS,
+                       symbol: Optional[str] = None) -> pd.DataFrame:
+        """Attach indicator columns to a bar frame in place"""
+        for name, values in self.compute(data, names, symbol).items():
+            # Copy so the frame never aliases arrays held by the cache
+            data[name] = values.copy()
+        return data
+
+# Process-wide engine so every consumer shares one computation per refresh
+indicator_engine = IndicatorEngine()
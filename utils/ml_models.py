@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import MinMaxScaler
+from utils import indicators
+from utils.indicators import indicator_engine
 
 class QuantumPredictor:
     def __init__(self):
@@ -10,10 +12,10 @@ class QuantumPredictor:
         
     def prepare_data(self, data):
         # Add technical indicators
-        data['SMA_20'] = data['Close'].rolling(window=20).mean()
-        data['SMA_50'] = data['Close'].rolling(window=50).mean()
-        data['RSI'] = self.calculate_rsi(data['Close'])
-        data['MACD'] = self.calculate_macd(data['Close'])
+        indicator_engine.add_indicators(data, ('SMA_20', 'SMA_50', 'RSI', 'MACD', 'MACD_Hist'))
+        # The MACD feature is the histogram; the MACD line goes in MACD_Line
+        data['MACD_Line'] = data.pop('MACD')
+        data['MACD'] = data.pop('MACD_Hist')
         
         # Remove NaN values
         data = data.dropna()
@@ -21,18 +23,12 @@ class QuantumPredictor:
         return data
     
     def calculate_rsi(self, prices, period=14):
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
+        return pd.Series(indicators.rsi(prices.to_numpy(dtype=float), period), index=prices.index)
     
     def calculate_macd(self, prices, fast=12, slow=26, signal=9):
-        exp1 = prices.ewm(span=fast, adjust=False).mean()
-        exp2 = prices.ewm(span=slow, adjust=False).mean()
-        macd = exp1 - exp2
-        signal_line = macd.ewm(span=signal, adjust=False).mean()
-        return macd - signal_line
+        """MACD histogram (MACD line minus its signal line)"""
+        _, _, hist = indicators.macd(prices.to_numpy(dtype=float), fast, slow, signal)
+        return pd.Series(hist, index=prices.index)
     
     def get_predictions(self, symbols):
         predictions = []
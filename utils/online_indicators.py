@@ -0,0 +1,378 @@
+import math
+from collections import deque
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from utils.indicators import (
+    ATR_PERIOD, BB_STD, BB_WINDOW, DEFAULT_INDICATORS, MACD_FAST, MACD_SIGNAL, MACD_SLOW,
+    MOM_PERIOD, ROC_PERIOD, RSI_PERIOD, VOLUME_WINDOW
+)
+
+# Everything IndicatorState emits; each name matches the batch engine's column
+STREAMING_INDICATORS = DEFAULT_INDICATORS + ('MACD_Hist', 'RSI_Wilder')
+
+NAN = float('nan')
+
+class OnlineIndicator:
+    """Base for O(1) incremental indicators whose state can be checkpointed
+    
+    update() consumes one observation and returns the new value; peek()
+    returns the value the next update() would produce without changing state,
+    which lets a forming bar be evaluated on every tick.
+    """
+    
+    __slots__ = ()
+    
+    def state(self) -> dict:
+        """Snapshot the full state as plain Python values"""
+        snapshot = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if isinstance(value, OnlineIndicator):
+                snapshot[name] = value.state()
+            elif isinstance(value, np.ndarray):
+                snapshot[name] = value.tolist()
+            elif isinstance(value, deque):
+                snapshot[name] = list(value)
+            else:
+                snapshot[name] = value
+        return snapshot
+    
+    def load_state(self, snapshot: dict) -> None:
+        """Restore a snapshot taken by state()"""
+        for name in self.__slots__:
+            current = getattr(self, name)
+            value = snapshot[name]
+            if isinstance(current, OnlineIndicator):
+                current.load_state(value)
+            elif isinstance(current, np.ndarray):
+                setattr(self, name, np.asarray(value, dtype=float))
+            elif isinstance(current, deque):
+                setattr(self, name, deque(value, maxlen=current.maxlen))
+            else:
+                setattr(self, name, value)
+
+class EMA(OnlineIndicator):
+    """Exponential moving average matching ewm(span, adjust=False)"""
+    
+    __slots__ = ('span', 'alpha', 'value')
+    
+    def __init__(self, span: int):
+        self.span = span
+        self.alpha = 2 / (span + 1)
+        self.value = NAN
+    
+    def _next(self, x: float) -> float:
+        if math.isnan(x):
+            return self.value
+        if math.isnan(self.value):
+            return x
+        return self.alpha * x + (1 - self.alpha) * self.value
+    
+    def update(self, x: float) -> float:
+        self.value = self._next(x)
+        return self.value
+    
+    def peek(self, x: float) -> float:
+        return self._next(x)
+
+class RollingWindow(OnlineIndicator):
+    """Fixed-size ring buffer keeping running sums for mean and standard deviation
+    
+    Sums are taken relative to the first observation for numerical stability
+    and recomputed from the buffer each time it wraps, so rounding error
+    cannot accumulate.
+    """
+    
+    __slots__ = ('window', 'buffer', 'position', 'count', 'total', 'squares', 'missing', 'offset')
+    
+    def __init__(self, window: int):
+        self.window = window
+        self.buffer = np.full(window, np.nan)
+        self.position = 0
+        self.count = 0
+        self.total = 0.0
+        self.squares = 0.0
+        self.missing = 0
+        self.offset = NAN
+    
+    def _after(self, x: float) -> Tuple[float, float, int, int, float]:
+        """Sums, NaN count, length and offset as they would be after pushing x"""
+        total, squares, missing = self.total, self.squares, self.missing
+        offset = x if math.isnan(self.offset) else self.offset
+        
+        if self.count >= self.window:
+            oldest = float(self.buffer[self.position])
+            if math.isnan(oldest):
+                missing -= 1
+            else:
+                total -= oldest - offset
+                squares -= (oldest - offset) ** 2
+        
+        if math.isnan(x):
+            missing += 1
+        else:
+            total += x - offset
+            squares += (x - offset) ** 2
+        
+        return total, squares, missing, min(self.count + 1, self.window), offset
+    
+    def _stats(self, total: float, squares: float, missing: int, count: int,
+               offset: float, ddof: int = 1) -> Tuple[float, float]:
+        if count < self.window or missing:
+            return NAN, NAN
+        mean = offset + total / self.window
+        variance = (squares - total * total / self.window) / (self.window - ddof)
+        return mean, math.sqrt(max(variance, 0.0))
+    
+    def update(self, x: float) -> None:
+        self.total, self.squares, self.missing, self.count, self.offset = self._after(x)
+        self.buffer[self.position] = x
+        self.position = (self.position + 1) % self.window
+        if self.position == 0:
+            self._resync()
+    
+    def _resync(self) -> None:
+        values = self.buffer[~np.isnan(self.buffer)] - (0.0 if math.isnan(self.offset) else self.offset)
+        self.total = float(values.sum())
+        self.squares = float((values * values).sum())
+    
+    def mean(self) -> float:
+        return self._stats(self.total, self.squares, self.missing, self.count, self.offset)[0]
+    
+    def std(self) -> float:
+        return self._stats(self.total, self.squares, self.missing, self.count, self.offset)[1]
+    
+    def peek_stats(self, x: float) -> Tuple[float, float]:
+        """Mean and standard deviation if x were pushed"""
+        return self._stats(*self._after(x))
+
+class SMA(OnlineIndicator):
+    """Simple moving average"""
+    
+    __slots__ = ('values',)
+    
+    def __init__(self, window: int):
+        self.values = RollingWindow(window)
+    
+    def update(self, x: float) -> float:
+        self.values.update(x)
+        return self.values.mean()
+    
+    def peek(self, x: float) -> float:
+        return self.values.peek_stats(x)[0]
+
+def _rsi(gain: float, loss: float) -> float:
+    if math.isnan(gain) or math.isnan(loss):
+        return NAN
+    if loss == 0:
+        return NAN if gain == 0 else 100.0
+    return 100 - 100 / (1 + gain / loss)
+
+def _gain_loss(close: float, prev_close: float) -> Tuple[float, float]:
+    # A missing delta counts as no move, as in the batch kernels
+    delta = close - prev_close
+    if math.isnan(delta):
+        return 0.0, 0.0
+    return max(delta, 0.0), max(-delta, 0.0)
+
+class RSI(OnlineIndicator):
+    """Relative Strength Index from simple averages of gains and losses"""
+    
+    __slots__ = ('prev_close', 'gains', 'losses')
+    
+    def __init__(self, period: int = RSI_PERIOD):
+        self.prev_close = NAN
+        self.gains = RollingWindow(period)
+        self.losses = RollingWindow(period)
+    
+    def update(self, close: float) -> float:
+        gain, loss = _gain_loss(close, self.prev_close)
+        self.gains.update(gain)
+        self.losses.update(loss)
+        self.prev_close = close
+        return _rsi(self.gains.mean(), self.losses.mean())
+    
+    def peek(self, close: float) -> float:
+        gain, loss = _gain_loss(close, self.prev_close)
+        return _rsi(self.gains.peek_stats(gain)[0], self.losses.peek_stats(loss)[0])
+
+class WilderRSI(OnlineIndicator):
+    """Relative Strength Index with Wilder smoothing"""
+    
+    __slots__ = ('period', 'prev_close', 'bars', 'avg_gain', 'avg_loss')
+    
+    def __init__(self, period: int = RSI_PERIOD):
+        self.period = period
+        self.prev_close = NAN
+        self.bars = 0
+        # Sums while seeding, Wilder averages once bars > period
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+    
+    def _next(self, close: float) -> Tuple[float, float, float]:
+        if self.bars == 0:
+            return 0.0, 0.0, NAN
+        gain, loss = _gain_loss(close, self.prev_close)
+        if self.bars < self.period:
+            return self.avg_gain + gain, self.avg_loss + loss, NAN
+        if self.bars == self.period:
+            avg_gain = (self.avg_gain + gain) / self.period
+            avg_loss = (self.avg_loss + loss) / self.period
+        else:
+            avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        return avg_gain, avg_loss, _rsi(avg_gain, avg_loss)
+    
+    def update(self, close: float) -> float:
+        self.avg_gain, self.avg_loss, value = self._next(close)
+        self.prev_close = close
+        self.bars += 1
+        return value
+    
+    def peek(self, close: float) -> float:
+        return self._next(close)[2]
+
+class ATR(OnlineIndicator):
+    """Average True Range as a simple average of true range"""
+    
+    __slots__ = ('prev_close', 'ranges')
+    
+    def __init__(self, period: int = ATR_PERIOD):
+        self.prev_close = NAN
+        self.ranges = RollingWindow(period)
+    
+    def _true_range(self, high: float, low: float, close: float) -> float:
+        return float(np.fmax(np.fmax(high - low, abs(high - self.prev_close)), abs(low - self.prev_close)))
+    
+    def update(self, high: float, low: float, close: float) -> float:
+        self.ranges.update(self._true_range(high, low, close))
+        self.prev_close = close
+        return self.ranges.mean()
+    
+    def peek(self, high: float, low: float, close: float) -> float:
+        return self.ranges.peek_stats(self._true_range(high, low, close))[0]
+
+class MACD(OnlineIndicator):
+    """MACD line, signal line and histogram"""
+    
+    __slots__ = ('fast', 'slow', 'signal')
+    
+    def __init__(self, fast: int = MACD_FAST, slow: int = MACD_SLOW, signal: int = MACD_SIGNAL):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+    
+    def update(self, close: float) -> Tuple[float, float, float]:
+        line = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(line)
+        return line, signal, line - signal
+    
+    def peek(self, close: float) -> Tuple[float, float, float]:
+        line = self.fast.peek(close) - self.slow.peek(close)
+        signal = self.signal.peek(line)
+        return line, signal, line - signal
+
+class Lag(OnlineIndicator):
+    """Value observed n updates ago"""
+    
+    __slots__ = ('values',)
+    
+    def __init__(self, n: int):
+        self.values = deque(maxlen=n + 1)
+    
+    def update(self, x: float) -> float:
+        self.values.append(x)
+        return self.values[0] if len(self.values) == self.values.maxlen else NAN
+    
+    def peek(self, x: float) -> float:
+        n = self.values.maxlen - 1
+        return self.values[-n] if len(self.values) >= n else NAN
+
+class IndicatorState(OnlineIndicator):
+    """Every streaming indicator for one symbol, advanced one bar at a time
+    
+    Values match utils.indicators.compute_indicators over the same bars.
+    """
+    
+    __slots__ = ('sma_20', 'sma_50', 'macd', 'rsi', 'wilder_rsi', 'bollinger',
+                 'volume', 'atr', 'roc_lag', 'mom_lag', 'bars')
+    
+    def __init__(self):
+        self.sma_20 = SMA(20)
+        self.sma_50 = SMA(50)
+        self.macd = MACD()
+        self.rsi = RSI()
+        self.wilder_rsi = WilderRSI()
+        self.bollinger = RollingWindow(BB_WINDOW)
+        self.volume = RollingWindow(VOLUME_WINDOW)
+        self.atr = ATR()
+        self.roc_lag = Lag(ROC_PERIOD)
+        self.mom_lag = Lag(MOM_PERIOD)
+        self.bars = 0
+    
+    @classmethod
+    def from_history(cls, data: pd.DataFrame) -> 'IndicatorState':
+        """Build state by replaying a bar frame"""
+        state = cls()
+        for high, low, close, volume in zip(data['High'].to_numpy(dtype=float), data['Low'].to_numpy(dtype=float),
+                                            data['Close'].to_numpy(dtype=float), data['Volume'].to_numpy(dtype=float)):
+            state.update(high, low, close, volume)
+        return state
+    
+    @classmethod
+    def from_state(cls, snapshot: dict) -> 'IndicatorState':
+        state = cls()
+        state.load_state(snapshot)
+        return state
+    
+    @staticmethod
+    def _values(sma_20, sma_50, macd, rsi, wilder_rsi, bollinger, volume_sma, volume, atr,
+                close, roc_base, mom_base) -> Dict[str, float]:
+        middle, std = bollinger
+        (ema_12, ema_26), signal, hist = macd
+        return {
+            'SMA_20': sma_20,
+            'SMA_50': sma_50,
+            'EMA_12': ema_12,
+            'EMA_26': ema_26,
+            'MACD': ema_12 - ema_26,
+            'Signal_Line': signal,
+            'MACD_Hist': hist,
+            'RSI': rsi,
+            'RSI_Wilder': wilder_rsi,
+            'BB_middle': middle,
+            'BB_upper': middle + std * BB_STD,
+            'BB_lower': middle - std * BB_STD,
+            'Volume_SMA': volume_sma,
+            'Volume_Ratio': volume / volume_sma if volume_sma else NAN,
+            'ROC': (close / roc_base - 1) * 100 if roc_base else NAN,
+            'MOM': close - mom_base,
+            'ATR': atr
+        }
+    
+    def update(self, high: float, low: float, close: float, volume: float = NAN) -> Dict[str, float]:
+        """Commit a closed bar and return every indicator for it"""
+        _, signal, hist = self.macd.update(close)
+        self.bollinger.update(close)
+        self.volume.update(volume)
+        self.bars += 1
+        return self._values(
+            self.sma_20.update(close), self.sma_50.update(close),
+            ((self.macd.fast.value, self.macd.slow.value), signal, hist),
+            self.rsi.update(close), self.wilder_rsi.update(close),
+            (self.bollinger.mean(), self.bollinger.std()),
+            self.volume.mean(), volume, self.atr.update(high, low, close),
+            close, self.roc_lag.update(close), self.mom_lag.update(close)
+        )
+    
+    def peek(self, high: float, low: float, close: float, volume: float = NAN) -> Dict[str, float]:
+        """Indicators for a bar that is still forming, leaving state untouched"""
+        _, signal, hist = self.macd.peek(close)
+        return self._values(
+            self.sma_20.peek(close), self.sma_50.peek(close),
+            ((self.macd.fast.peek(close), self.macd.slow.peek(close)), signal, hist),
+            self.rsi.peek(close), self.wilder_rsi.peek(close),
+            self.bollinger.peek_stats(close), self.volume.peek_stats(volume)[0], volume,
+            self.atr.peek(high, low, close), close, self.roc_lag.peek(close), self.mom_lag.peek(close)
+        )
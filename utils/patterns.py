@@ -0,0 +1,228 @@
+"""Chart pattern detection over bar arrays
+
+Pivots and moving-average crosses are found with sliding-window operations
+on (time x symbol) arrays, so symbols that share a calendar are processed in
+one pass. The per-symbol steps that follow (clustering pivots into levels,
+pairing them into double tops and bottoms, checking RSI divergences) only
+look at the few dozen pivots each symbol has.
+"""
+import logging
+from typing import Dict, Hashable, List, Mapping, Optional, Tuple
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from utils.cache_manager import BarCache, cache_manager
+from utils.indicators import rolling_mean, rsi, shift
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bars on each side a pivot must dominate
+PIVOT_ORDER = 5
+# Pivots within this relative distance belong to the same support/resistance level
+LEVEL_TOLERANCE = 0.015
+# The two peaks (or troughs) of a double top (bottom) must be this close
+DOUBLE_TOLERANCE = 0.02
+# ... and the trough (peak) between them this far away
+DOUBLE_MIN_DEPTH = 0.03
+CROSS_FAST = 50
+CROSS_SLOW = 200
+# Patterns completed more than this many bars ago are no longer reported
+PATTERN_LOOKBACK = 60
+
+def pivots(high: np.ndarray, low: np.ndarray, order: int = PIVOT_ORDER) -> Tuple[np.ndarray, np.ndarray]:
+    """Boolean masks of pivot highs and lows along axis 0
+    
+    A pivot high is the strict maximum of the order bars before it and at least
+    the maximum of the order bars after it, so a flat top yields one pivot. The
+    last order bars cannot be confirmed yet and are never pivots.
+    """
+    high = np.where(np.isnan(high), -np.inf, high)
+    low = np.where(np.isnan(low), np.inf, low)
+    width = [(order, order)] + [(0, 0)] * (high.ndim - 1)
+    before = sliding_window_view(np.pad(high, width, constant_values=-np.inf), order, axis=0)
+    after = before[order + 1:]
+    before = before[:len(high)]
+    is_high = (high > before.max(axis=-1)) & (high >= after.max(axis=-1))
+    
+    before = sliding_window_view(np.pad(low, width, constant_values=np.inf), order, axis=0)
+    after = before[order + 1:]
+    before = before[:len(low)]
+    is_low = (low < before.min(axis=-1)) & (low <= after.min(axis=-1))
+    
+    is_high[len(high) - order:] = False
+    is_low[len(low) - order:] = False
+    is_high &= np.isfinite(high)
+    is_low &= np.isfinite(low)
+    return is_high, is_low
+
+def crosses(fast: np.ndarray, slow: np.ndarray) -> np.ndarray:
+    """+1 where fast crosses above slow, -1 where it crosses below, 0 elsewhere"""
+    with np.errstate(invalid='ignore'):
+        spread = fast - slow
+        # Touching counts as not above, so a cross through equality is still seen once
+        above = np.where(np.isnan(spread), np.nan, spread > 0)
+    previous = shift(above)
+    return np.where((above == 1) & (previous == 0), 1, np.where((above == 0) & (previous == 1), -1, 0))
+
+def cluster_levels(prices: np.ndarray, tolerance: float = LEVEL_TOLERANCE) -> List[Tuple[float, int]]:
+    """Group nearby pivot prices into (level, touches), strongest first"""
+    prices = np.sort(prices[np.isfinite(prices)])
+    if len(prices) == 0:
+        return []
+    starts = np.flatnonzero(np.r_[True, np.diff(prices) / prices[:-1] > tolerance])
+    touches = np.diff(np.r_[starts, len(prices)])
+    levels = np.add.reduceat(prices, starts) / touches
+    order = np.lexsort((levels, -touches))
+    return [(float(levels[i]), int(touches[i])) for i in order]
+
+def _double_patterns(index: pd.Index, close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                     peaks: np.ndarray, troughs: np.ndarray) -> List[Dict]:
+    """Double tops from consecutive pivot highs, double bottoms from consecutive pivot lows"""
+    found = []
+    for positions, prices, opposite, kind in ((peaks, high, low, 'Double Top'),
+                                             (troughs, low, high, 'Double Bottom')):
+        if len(positions) < 2:
+            continue
+        first, second = positions[:-1], positions[1:]
+        a, b = prices[first], prices[second]
+        similar = np.abs(a - b) / np.maximum(a, b) <= DOUBLE_TOLERANCE
+        for i, j in zip(first[similar], second[similar]):
+            between = opposite[i:j + 1]
+            neckline = between.min() if kind == 'Double Top' else between.max()
+            level = max(prices[i], prices[j]) if kind == 'Double Top' else min(prices[i], prices[j])
+            depth = abs(level - neckline) / level
+            if depth < DOUBLE_MIN_DEPTH:
+                continue
+            after = close[j:]
+            broken = bool((after < neckline).any() if kind == 'Double Top' else (after > neckline).any())
+            found.append({
+                'pattern': kind,
+                'date': index[j],
+                'price': float(level),
+                'neckline': float(neckline),
+                'signal': 'Sell' if kind == 'Double Top' else 'Buy',
+                'reliability': 'High' if broken else 'Medium',
+                'position': int(j)
+            })
+    return found
+
+def _divergences(index: pd.Index, close: np.ndarray, rsi_values: np.ndarray,
+                 peaks: np.ndarray, troughs: np.ndarray) -> List[Dict]:
+    """RSI divergence between the last two pivots: price and RSI moving in opposite directions"""
+    found = []
+    if len(peaks) >= 2:
+        i, j = peaks[-2:]
+        if close[j] > close[i] and rsi_values[j] < rsi_values[i]:
+            found.append({'pattern': 'Bearish RSI Divergence', 'date': index[j], 'price': float(close[j]),
+                          'signal': 'Sell', 'reliability': 'Medium', 'position': int(j)})
+    if len(troughs) >= 2:
+        i, j = troughs[-2:]
+        if close[j] < close[i] and rsi_values[j] > rsi_values[i]:
+            found.append({'pattern': 'Bullish RSI Divergence', 'date': index[j], 'price': float(close[j]),
+                          'signal': 'Buy', 'reliability': 'Medium', 'position': int(j)})
+    return found
+
+def detect_patterns(index: pd.Index, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                    rsi_values: Optional[np.ndarray] = None) -> List[Dict]:
+    """Detect levels and patterns for every column of (time x symbol) bar arrays
+    
+    rsi_values is the RSI to test divergences against and is computed from close
+    when not given. Returns one result per column.
+    """
+    if rsi_values is None:
+        rsi_values = rsi(close)
+    is_high, is_low = pivots(high, low)
+    cross = crosses(rolling_mean(close, CROSS_FAST), rolling_mean(close, CROSS_SLOW))
+    cutoff = len(index) - PATTERN_LOOKBACK
+    
+    results = []
+    for column in range(close.shape[1]):
+        c, h, l, s = close[:, column], high[:, column], low[:, column], rsi_values[:, column]
+        peaks, troughs = np.flatnonzero(is_high[:, column]), np.flatnonzero(is_low[:, column])
+        last = float(c[-1])
+        
+        levels = cluster_levels(np.concatenate([h[peaks], l[troughs]]))
+        resistance = sorted((level for level in levels if level[0] > last), key=lambda level: level[0])
+        support = sorted((level for level in levels if level[0] <= last), key=lambda level: -level[0])
+        
+        found = _double_patterns(index, c, h, l, peaks, troughs) + _divergences(index, c, s, peaks, troughs)
+        for position in np.flatnonzero(cross[:, column]):
+            golden = cross[position, column] > 0
+            found.append({
+                'pattern': 'Golden Cross' if golden else 'Death Cross',
+                'date': index[position],
+                'price': float(c[position]),
+                'signal': 'Buy' if golden else 'Sell',
+                'reliability': 'Medium',
+                'position': int(position)
+            })
+        found = sorted((pattern for pattern in found if pattern['position'] >= cutoff),
+                       key=lambda pattern: pattern['position'], reverse=True)
+        
+        results.append({
+            'pivot_highs': [(index[i], float(h[i])) for i in peaks],
+            'pivot_lows': [(index[i], float(l[i])) for i in troughs],
+            'support': [{'price': level, 'touches': touches} for level, touches in support],
+            'resistance': [{'price': level, 'touches': touches} for level, touches in resistance],
+            'patterns': found
+        })
+    return results
+
+class PatternEngine:
+    """Detects patterns per symbol, memoized per (symbol, bar range) and batched by calendar"""
+
+    def __init__(self):
+        cache_config = cache_manager.config.get('cache', {})
+        self.cache = BarCache(
+            default_ttl=cache_config.get('indicators', 3600),
+            max_bytes=int(cache_config.get('indicator_cache_max_mb', 128)) * 1024 * 1024
+        )
+    
+    @staticmethod
+    def _cache_key(symbol: str, data: pd.DataFrame) -> Hashable:
+        # The last bar may still be forming, so its close is part of the range identity
+        return (symbol, data.index[0], data.index[-1], len(data), float(data['Close'].iloc[-1]))
+    
+    def detect(self, symbol: str, data: pd.DataFrame) -> Dict:
+        """Patterns for one symbol's bars"""
+        return self.detect_many({symbol: data}).get(symbol, {})
+    
+    def detect_many(self, frames: Mapping[str, pd.DataFrame]) -> Dict[str, Dict]:
+        """Patterns for many symbols; cache misses sharing a calendar are detected in one pass"""
+        results = {}
+        groups: Dict[Hashable, List[Tuple[str, Hashable, pd.DataFrame]]] = {}
+        for symbol, data in frames.items():
+            if data is None or data.empty:
+                continue
+            key = self._cache_key(symbol, data)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[symbol] = cached
+            else:
+                groups.setdefault((data.index[0], data.index[-1], len(data)), []).append((symbol, key, data))
+        
+        for members in groups.values():
+            try:
+                index = members[0][2].index
+                high, low, close, rsi_values = (
+                    np.column_stack([self._column(data, field) for _, _, data in members])
+                    for field in ('High', 'Low', 'Close', 'RSI')
+                )
+                for (symbol, key, _), result in zip(members, detect_patterns(index, high, low, close, rsi_values)):
+                    self.cache.set(key, result)
+                    results[symbol] = result
+            except Exception as e:
+                logger.error(f"Error detecting patterns for {[symbol for symbol, _, _ in members]}: {e}")
+        
+        return results
+    
+    @staticmethod
+    def _column(data: pd.DataFrame, field: str) -> np.ndarray:
+        if field in data:
+            return data[field].to_numpy(dtype=float)
+        close = data['Close'].to_numpy(dtype=float)
+        return rsi(close) if field == 'RSI' else close
+
+# Process-wide engine so repeated page renders reuse one detection per bar range
+pattern_engine = PatternEngine()
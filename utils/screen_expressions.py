@@ -0,0 +1,213 @@
+"""Compile declarative screen filters into vectorized NumPy evaluators
+
+A filter such as ``RSI<30 & Close>SMA_50 & Volume_Ratio>2`` is parsed
+once into a tree of closures. Evaluating it takes a mapping of field name
+to a 1-D array (one value per symbol) and returns a boolean mask, so
+screening a universe costs a handful of array operations however many
+symbols it holds.
+
+Grammar, loosest binding first::
+
+    or      := and (('|' | 'or') and)*
+    and     := not (('&' | 'and') not)*
+    not     := ('~' | 'not') not | compare
+    compare := sum (('<' | '<=' | '>' | '>=' | '==' | '!=') sum)?
+    sum     := product (('+' | '-') product)*
+    product := unary (('*' | '/') unary)*
+    unary   := '-' unary | atom
+    atom    := NUMBER | FIELD | '(' or ')'
+
+Comparisons bind tighter than ``&`` and ``|``, unlike Python, so no
+parentheses are needed around each condition. Comparisons against NaN
+are False, so symbols without enough history never match.
+"""
+from functools import lru_cache
+from typing import Callable, FrozenSet, List, Mapping, Tuple
+import operator
+import re
+import numpy as np
+
+Values = Mapping[str, np.ndarray]
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<op><=|>=|==|!=|<|>|&|\||~|\(|\)|\+|-|\*|/)
+    )""", re.VERBOSE)
+
+_KEYWORDS = {'and': '&', 'or': '|', 'not': '~'}
+
+_COMPARISONS = {
+    '<': operator.lt, '<=': operator.le, '>': operator.gt,
+    '>=': operator.ge, '==': operator.eq, '!=': operator.ne
+}
+
+_ARITHMETIC = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv}
+
+def _tokenize(source: str) -> List[Tuple[str, str, int]]:
+    tokens = []
+    position = 0
+    source = source.rstrip()
+    while position < len(source):
+        match = _TOKEN.match(source, position)
+        if match is None:
+            position += len(source[position:]) - len(source[position:].lstrip())
+            raise ValueError(f"Unexpected character {source[position]!r} at position {position} in {source!r}")
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'name' and text.lower() in _KEYWORDS:
+            kind, text = 'op', _KEYWORDS[text.lower()]
+        tokens.append((kind, text, match.start(kind)))
+        position = match.end()
+    return tokens
+
+class _Parser:
+    """Recursive-descent parser producing (evaluator, is_boolean) pairs"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.tokens = _tokenize(source)
+        self.position = 0
+        self.fields = set()
+    
+    def parse(self) -> Tuple[Callable[[Values], np.ndarray], bool]:
+        if not self.tokens:
+            raise ValueError("Empty screen expression")
+        node = self._or()
+        if self.position < len(self.tokens):
+            self._fail("Unexpected token")
+        return node
+    
+    def _peek(self) -> Tuple[str, str, int]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else ('end', '', len(self.source))
+    
+    def _accept(self, *ops: str):
+        kind, text, _ = self._peek()
+        if kind == 'op' and text in ops:
+            self.position += 1
+            return text
+        return None
+    
+    def _fail(self, message: str):
+        _, text, position = self._peek()
+        found = repr(text) if text else 'end of expression'
+        raise ValueError(f"{message} ({found} at position {position}) in {self.source!r}")
+    
+    def _boolean(self, node):
+        if not node[1]:
+            self._fail("Expected a condition such as RSI<30")
+        return node[0]
+    
+    def _numeric(self, node):
+        if node[1]:
+            self._fail("Conditions cannot be used as numbers")
+        return node[0]
+    
+    def _or(self):
+        node = self._and()
+        while self._accept('|'):
+            left, right = self._boolean(node), self._boolean(self._and())
+            node = (lambda values, left=left, right=right: left(values) | right(values), True)
+        return node
+    
+    def _and(self):
+        node = self._not()
+        while self._accept('&'):
+            left, right = self._boolean(node), self._boolean(self._not())
+            node = (lambda values, left=left, right=right: left(values) & right(values), True)
+        return node
+    
+    def _not(self):
+        if self._accept('~'):
+            operand = self._boolean(self._not())
+            return lambda values: ~operand(values), True
+        return self._compare()
+    
+    def _compare(self):
+        node = self._sum()
+        op = self._accept(*_COMPARISONS)
+        if op is None:
+            return node
+        left, right = self._numeric(node), self._numeric(self._sum())
+        compare = _COMPARISONS[op]
+        
+        def evaluate(values):
+            with np.errstate(invalid='ignore'):
+                return np.asarray(compare(left(values), right(values)), dtype=bool)
+        
+        return evaluate, True
+    
+    def _sum(self):
+        node = self._product()
+        while True:
+            op = self._accept('+', '-')
+            if op is None:
+                return node
+            node = self._binary(node, self._product(), _ARITHMETIC[op])
+    
+    def _product(self):
+        node = self._unary()
+        while True:
+            op = self._accept('*', '/')
+            if op is None:
+                return node
+            node = self._binary(node, self._unary(), _ARITHMETIC[op])
+    
+    def _binary(self, left, right, apply):
+        left, right = self._numeric(left), self._numeric(right)
+        
+        def evaluate(values):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return apply(left(values), right(values))
+        
+        return evaluate, False
+    
+    def _unary(self):
+        if self._accept('-'):
+            operand = self._numeric(self._unary())
+            return lambda values: -operand(values), False
+        return self._atom()
+    
+    def _atom(self):
+        kind, text, _ = self._peek()
+        if kind == 'number':
+            self.position += 1
+            number = float(text)
+            return lambda values: number, False
+        if kind == 'name':
+            self.position += 1
+            self.fields.add(text)
+            return lambda values: values[text], False
+        if self._accept('('):
+            node = self._or()
+            if not self._accept(')'):
+                self._fail("Expected ')'")
+            return node
+        self._fail("Expected a number, field or '('")
+
+class ScreenExpression:
+    """A compiled filter or ranking expression over per-symbol field arrays"""
+
+    __slots__ = ('source', 'fields', 'is_condition', '_evaluate')
+    
+    def __init__(self, source: str):
+        parser = _Parser(source)
+        self._evaluate, self.is_condition = parser.parse()
+        self.source = source
+        self.fields: FrozenSet[str] = frozenset(parser.fields)
+    
+    def __call__(self, values: Values) -> np.ndarray:
+        """Evaluate over arrays of equal length, one element per symbol"""
+        length = len(next(iter(values.values()))) if values else 0
+        result = self._evaluate(values)
+        # A constant expression still yields one value per symbol
+        return np.broadcast_to(result, (length,)) if np.ndim(result) == 0 else result
+    
+    def __repr__(self) -> str:
+        return f"ScreenExpression({self.source!r})"
+
+@lru_cache(maxsize=256)
+def compile_expression(source: str) -> ScreenExpression:
+    """Compile an expression once; later calls with the same text reuse it"""
+    return ScreenExpression(source)
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Set, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Deduplicate concurrent fetches so each key has at most one call in flight
+    
+    The first caller for a key runs the fetch; callers arriving while it is
+    running wait for that result instead of issuing their own request.
+    
+    An async caller's fetch may need threads from a bounded pool to finish. A
+    sync caller running on that same pool must not block on it, or enough of
+    them can hold every thread while the fetch waits for one; such callers
+    pass wait_for_async=False and fetch those keys themselves.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        # Keys whose in-flight call belongs to an async caller
+        self._async_keys: Set[Hashable] = set()
+        self.leaders = 0
+        self.followers = 0
+    
+    def do(self, key: Hashable, fn: Callable[[], Any], wait_for_async: bool = True) -> Any:
+        """Run fn for key, or wait for the call already in flight for it"""
+        return self.do_batch([key], lambda keys: {key: fn()}, wait_for_async)[key]
+    
+    def do_batch(self, keys: Iterable[Hashable], fn: Callable[[List[Hashable]], Dict[Hashable, Any]],
+                 wait_for_async: bool = True) -> Dict[Hashable, Any]:
+        """Run fn once for the keys nobody is fetching and wait on the rest
+        
+        fn receives the keys this caller fetches and returns a dict of results;
+        keys missing from that dict resolve to None. Without wait_for_async,
+        keys an async caller is fetching are fetched again rather than waited on.
+        """
+        owned, waiting, bypassed = self._claim(keys, wait_for_async=wait_for_async)
+        
+        results = {}
+        if owned or bypassed:
+            try:
+                values = fn(owned + bypassed) or {}
+            except BaseException as e:
+                self._fail(owned, e)
+                raise
+            results.update(self._resolve(owned, values))
+            results.update({key: values.get(key) for key in bypassed})
+        
+        for key, future in waiting.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                logger.error(f"Shared fetch for {key} failed: {e}")
+                results[key] = None
+        
+        return results
+    
+    async def do_batch_async(self, keys: Iterable[Hashable],
+                             fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]) -> Dict[Hashable, Any]:
+        """Async variant of do_batch; shares in-flight calls with sync callers"""
+        owned, waiting, _ = self._claim(keys, is_async=True)
+        
+        results = {}
+        if owned:
+            try:
+                values = await fn(owned) or {}
+            except BaseException as e:
+                self._fail(owned, e)
+                raise
+            results.update(self._resolve(owned, values))
+        
+        for key, future in waiting.items():
+            try:
+                results[key] = await asyncio.wrap_future(future)
+            except Exception as e:
+                logger.error(f"Shared fetch for {key} failed: {e}")
+                results[key] = None
+        
+        return results
+    
+    def _claim(self, keys: Iterable[Hashable], is_async: bool = False,
+               wait_for_async: bool = True) -> Tuple[List[Hashable], Dict[Hashable, Future], List[Hashable]]:
+        """Split keys into ones this caller must fetch, ones to wait on, and ones to fetch without sharing"""
+        owned = []
+        waiting = {}
+        bypassed = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if key not in self._calls:
+                    self._calls[key] = Future()
+                    if is_async:
+                        self._async_keys.add(key)
+                    owned.append(key)
+                elif wait_for_async or key not in self._async_keys:
+                    waiting[key] = self._calls[key]
+                else:
+                    bypassed.append(key)
+            self.leaders += len(owned) + len(bypassed)
+            self.followers += len(waiting)
+        return owned, waiting, bypassed
+    
+    def _resolve(self, owned: List[Hashable], values: Dict[Hashable, Any]) -> Dict[Hashable, Any]:
+        with self._lock:
+            futures = [self._calls.pop(key) for key in owned]
+            self._async_keys.difference_update(owned)
+        results = {}
+        for key, future in zip(owned, futures):
+            results[key] = values.get(key)
+            future.set_result(results[key])
+        return results
+    
+    def _fail(self, owned: List[Hashable], error: BaseException) -> None:
+        with self._lock:
+            futures = [self._calls.pop(key) for key in owned]
+            self._async_keys.difference_update(owned)
+        for future in futures:
+            future.set_exception(error)
+    
+    def stats(self) -> Dict[str, int]:
+        """Get how many keys were fetched versus served from another caller's fetch"""
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'fetched': self.leaders,
+                'coalesced': self.followers
+            }
@@ -1,22 +1,28 @@
 import pandas as pd
 import numpy as np
 import yfinance as yf
+from services.data_providers import get_provider
+from utils import indicators
+from utils.indicators import indicator_engine
+
+STOCK_INDICATORS = ('SMA_20', 'SMA_50', 'RSI', 'MACD', 'MACD_Hist')
 
 class StockDataFetcher:
-    def __init__(self):
-        pass
+    def __init__(self, provider=None):
+        self.provider = provider or get_provider()
         
     def get_stock_data(self, symbol, period='1y'):
         try:
-            # Fetch data from Yahoo Finance
-            stock = yf.Ticker(symbol)
-            data = stock.history(period=period)
+            # Fetch data from the configured market data provider
+            data = self.provider.get_bars([symbol], period=period).get(symbol)
+            if data is None:
+                return None
             
             # Calculate technical indicators
-            data['SMA_20'] = data['Close'].rolling(window=20).mean()
-            data['SMA_50'] = data['Close'].rolling(window=50).mean()
-            data['RSI'] = self.calculate_rsi(data['Close'])
-            data['MACD'] = self.calculate_macd(data['Close'])
+            indicator_engine.add_indicators(data, STOCK_INDICATORS, symbol)
+            # MACD here has always been the histogram; the MACD line goes in MACD_Line
+            data['MACD_Line'] = data.pop('MACD')
+            data['MACD'] = data.pop('MACD_Hist')
             
             return data
         except Exception as e:
@@ -24,18 +30,12 @@ class StockDataFetcher:
             return None
     
     def calculate_rsi(self, prices, period=14):
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
+        return pd.Series(indicators.rsi(prices.to_numpy(dtype=float), period), index=prices.index)
     
     def calculate_macd(self, prices, fast=12, slow=26, signal=9):
-        exp1 = prices.ewm(span=fast, adjust=False).mean()
-        exp2 = prices.ewm(span=slow, adjust=False).mean()
-        macd = exp1 - exp2
-        signal_line = macd.ewm(span=signal, adjust=False).mean()
-        return macd - signal_line
+        """MACD histogram (MACD line minus its signal line)"""
+        _, _, hist = indicators.macd(prices.to_numpy(dtype=float), fast, slow, signal)
+        return pd.Series(hist, index=prices.index)
     
     def get_company_info(self, symbol):
         try: